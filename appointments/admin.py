@@ -1,8 +1,10 @@
 # appointments/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils import timezone
 
-from .models import Client, Employer, Service, Appointment, Availability, Notification, User
+from . import notifications
+from .models import Client, Employer, Service, Appointment, Availability, Notification, NotificationHistory, NotificationOutbox, User
 
 
 # ----------------------------
@@ -241,10 +243,56 @@ class NotificationAdmin(admin.ModelAdmin):
 
     actions = ["mark_read", "mark_unread"]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # is_read modifié à la main : compteur du destinataire recalculé
+        if change and "is_read" in form.changed_data:
+            notifications.reconcile([obj.recipient_id])
+
     @admin.action(description="Marquer comme lue")
     def mark_read(self, request, queryset):
-        queryset.update(is_read=True)
+        self._set_read(queryset, True)
 
     @admin.action(description="Marquer comme non lue")
     def mark_unread(self, request, queryset):
-        queryset.update(is_read=False)
\ No newline at end of file
+        self._set_read(queryset, False)
+
+    def _set_read(self, queryset, value):
+        recipients = set(queryset.values_list("recipient_id", flat=True))
+        queryset.update(is_read=value)
+        notifications.reconcile(recipients)
+
+
+@admin.register(NotificationHistory)
+class NotificationHistoryAdmin(admin.ModelAdmin):
+    """Lecture seule : alimentée par `purge_notifications`."""
+
+    list_display = ("id", "recipient", "notification_type", "title", "created_at", "moved_at")
+    list_filter = ("notification_type",)
+    search_fields = ("recipient__username", "recipient__email", "title")
+    autocomplete_fields = ("recipient",)
+    list_select_related = ("recipient",)
+    list_per_page = 25
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "recipient", "notification_type", "status", "attempts", "next_attempt_at", "created_at")
+    list_filter = ("status", "notification_type")
+    search_fields = ("recipient__username", "recipient__email", "title", "last_error")
+    readonly_fields = ("created_at", "notification", "last_error")
+    autocomplete_fields = ("recipient", "appointment")
+    list_select_related = ("recipient",)
+    list_per_page = 25
+
+    actions = ["retry_now"]
+
+    @admin.action(description="Réessayer maintenant")
+    def retry_now(self, request, queryset):
+        queryset.update(status="pending", attempts=0, next_attempt_at=timezone.now())
\ No newline at end of file
@@ -0,0 +1,153 @@
+# appointments/assignment.py
+"""
+Affectation automatique d'un prestataire quand le client n'en choisit pas.
+
+`candidates` construit UNE requête annotée sur les prestataires actifs du
+service :
+- `upcoming_bookings` : rendez-vous actifs à venir (charge) ;
+- si une date est donnée, exclusion des prestataires occupés sur
+  [date, date + durée[ (booking.busy_subquery) ou hors de leurs horaires
+  hebdomadaires (sans horaires renseignés : BOOKING_DEFAULT_WORKING_HOURS,
+  comme les créneaux proposés par slots.py) ;
+- tri selon une stratégie interchangeable (BOOKING_ASSIGNMENT_STRATEGY).
+
+La réservation elle-même reste protégée par booking.reserve : si deux
+demandes choisissent le même prestataire, la seconde est refusée.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, ExpressionWrapper, F, FloatField, Max, OuterRef, Q, Value
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import booking, slots
+from .models import Availability, Employer
+
+
+class AssignmentStrategy:
+    """Ordonne le queryset de candidats (déjà annoté avec `upcoming_bookings`)."""
+
+    name = None
+
+    def order(self, queryset):
+        raise NotImplementedError
+
+
+class LeastLoadedStrategy(AssignmentStrategy):
+    """Le moins de rendez-vous à venir d'abord."""
+
+    name = "least_loaded"
+
+    def order(self, queryset):
+        return queryset.order_by("upcoming_bookings", "id")
+
+
+class RatingWeightedStrategy(AssignmentStrategy):
+    """
+    Note bayésienne (les prestataires avec peu d'avis sont ramenés vers
+    `prior_rating`), puis la charge.
+    """
+
+    name = "rating_weighted"
+    prior_rating = 3.5
+    prior_weight = 5
+
+    def order(self, queryset):
+        score = ExpressionWrapper(
+            (F("average_rating") * F("total_reviews") + Value(self.prior_rating * self.prior_weight))
+            / (F("total_reviews") + Value(float(self.prior_weight))),
+            output_field=FloatField(),
+        )
+        return queryset.annotate(assignment_score=score).order_by("-assignment_score", "upcoming_bookings", "id")
+
+
+class RoundRobinStrategy(AssignmentStrategy):
+    """Le prestataire dont la dernière réservation est la plus ancienne."""
+
+    name = "round_robin"
+
+    def order(self, queryset):
+        return queryset.annotate(last_booked_at=Max("employer_appointments__created_at")).order_by(
+            F("last_booked_at").asc(nulls_first=True), "id"
+        )
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (LeastLoadedStrategy, RatingWeightedStrategy, RoundRobinStrategy)
+}
+
+
+def get_strategy(strategy=None):
+    """Nom enregistré, chemin pointé vers une classe, classe ou instance."""
+    strategy = strategy or getattr(settings, "BOOKING_ASSIGNMENT_STRATEGY", LeastLoadedStrategy.name)
+    if isinstance(strategy, str):
+        strategy = STRATEGIES.get(strategy) or import_string(strategy)
+    if isinstance(strategy, type):
+        strategy = strategy()
+    return strategy
+
+
+def _within_working_hours(start, end):
+    """
+    Q : [start, end[ (même jour local) est couvert par une disponibilité
+    ouverte et ne touche aucune plage bloquée, ou l'employeur n'a aucun horaire
+    et [start, end[ tient dans les horaires par défaut.
+    """
+    tz = timezone.get_default_timezone()
+    local_start, local_end = start.astimezone(tz), end.astimezone(tz)
+    rules = Availability.objects.filter(employer_id=OuterRef("pk"))
+    default_start, default_end = slots.default_working_hours()
+    same_day = local_start.date() == local_end.date()
+    if same_day and default_start <= local_start.time() and local_end.time() <= default_end:
+        no_rules = ~Q(Exists(rules))
+    else:
+        no_rules = Q(pk__in=[])
+    if not same_day:
+        return no_rules
+
+    day = local_start.weekday()
+    covered = rules.filter(
+        day_of_week=day,
+        is_available=True,
+        start_time__lte=local_start.time(),
+        end_time__gte=local_end.time(),
+    )
+    blocked = rules.filter(
+        day_of_week=day,
+        is_available=False,
+        start_time__lt=local_end.time(),
+        end_time__gt=local_start.time(),
+    )
+    return (Q(Exists(covered)) & ~Q(Exists(blocked))) | no_rules
+
+
+def filter_free(queryset, start, duration=None):
+    """Prestataires libres sur [start, start + durée[ (horaires + rendez-vous)."""
+    end = start + timedelta(minutes=duration or booking.default_duration())
+    return queryset.filter(_within_working_hours(start, end)).exclude(booking.busy_subquery(start, end))
+
+
+def candidates(service_id, start=None, duration=None, strategy=None, now=None):
+    """
+    Queryset (une requête) des prestataires actifs du service, libres à
+    `start` si fourni, ordonnés par la stratégie.
+    """
+    now = now or timezone.now()
+    qs = Employer.objects.filter(service_id=service_id, is_active=True).annotate(
+        upcoming_bookings=Count(
+            "employer_appointments",
+            filter=Q(employer_appointments__date__gte=now)
+            & ~Q(employer_appointments__status__in=booking.RELEASED_STATUSES),
+        )
+    )
+    if start is not None:
+        qs = filter_free(qs, start, duration)
+    return get_strategy(strategy).order(qs)
+
+
+def pick_employer(service_id, start=None, duration=None, strategy=None):
+    """Meilleur candidat, ou None."""
+    return candidates(service_id, start, duration, strategy).first()
@@ -0,0 +1,162 @@
+# appointments/authentication.py
+"""
+Jetons JWT portant le rôle et les profils de l'utilisateur.
+
+`get_tokens_for_user` émet des ProfileRefreshToken : le refresh et l'access
+contiennent `role`, `client_id`, `employer_id` et `claims_at` (date du
+calcul). ClaimsJWTAuthentication construit alors l'utilisateur à partir du
+jeton, sans requête :
+- User partiel (id, role, is_active...) : les autres champs sont différés,
+  chargés en base seulement s'ils sont lus (email, unread_notifications...) ;
+- user.client / user.employer : objet partiel (id seul) ou absent, donc
+  hasattr(user, "client") et user.client.id ne coûtent rien. `load_profile`
+  charge le profil complet quand une vue en a besoin.
+
+Repli sur le chargement en base (JWTAuthentication) :
+- jeton sans claims (émis avant) ;
+- staff / superuser ou compte inactif : jamais de claims à l'émission, et un
+  jeton qui en porterait est quand même relu en base ;
+- profil modifié après l'émission du jeton : création / suppression d'un
+  Client ou Employer, changement de rôle, désactivation... (signals.py →
+  `claims_changed`, date notée dans le cache pour ACCESS_TOKEN_LIFETIME) ;
+- cache propre au processus (LocMemCache, DummyCache) : une invalidation ne
+  serait pas vue des autres workers, les claims sont donc ignorés. Un cache
+  partagé (Redis, Memcached, DatabaseCache) via CACHES les active ; un
+  déploiement à un seul processus peut garder LocMemCache avec
+  AUTH_CLAIMS_SINGLE_PROCESS=True.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Client, Employer, User
+
+PROFILES = {"client": Client, "employer": Employer}
+CACHE_PREFIX = "auth:claims-changed:"
+# Champs de User connus d'après le jeton ; les autres sont différés
+USER_FIELDS = ["id", "role", "is_active", "is_staff", "is_superuser"]
+FLAG_CLAIMS = ["is_active", "is_staff", "is_superuser"]
+# Cache propre au processus ; DummyCache ne retient rien, même dans le processus
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+DUMMY_CACHE = "django.core.cache.backends.dummy.DummyCache"
+
+
+def profile_claims(user):
+    """Claims de profil de `user` ({} pour le staff : toujours relu en base)."""
+    if user.is_staff or user.is_superuser or not user.is_active:
+        return {}
+    claims = {"role": user.role, "claims_at": time.time()}
+    claims.update((flag, getattr(user, flag)) for flag in FLAG_CLAIMS)
+    for name in PROFILES:
+        profile = getattr(user, name, None)
+        claims[f"{name}_id"] = profile.pk if profile is not None else None
+    return claims
+
+
+class ProfileRefreshToken(RefreshToken):
+    """Refresh token dont les claims de profil sont recopiés dans l'access token."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in profile_claims(user).items():
+            token[claim] = value
+        return token
+
+
+# -----------------------------
+# Invalidation
+# -----------------------------
+def claims_changed(user_id):
+    """Les jetons émis avant maintenant pour `user_id` repassent par la base."""
+    timeout = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()) + 1
+    cache.set(f"{CACHE_PREFIX}{user_id}", time.time(), timeout)
+
+
+def claims_trusted():
+    """Les invalidations (`claims_changed`) sont-elles vues de tous les processus ?"""
+    backend = settings.CACHES.get(DEFAULT_CACHE_ALIAS, {}).get("BACKEND", "")
+    if backend == DUMMY_CACHE:
+        return False
+    return backend != LOCMEM_CACHE or getattr(settings, "AUTH_CLAIMS_SINGLE_PROCESS", False)
+
+
+def claims_stale(user_id, claims_at):
+    changed_at = cache.get(f"{CACHE_PREFIX}{user_id}")
+    return changed_at is not None and changed_at >= claims_at
+
+
+# -----------------------------
+# Authentification
+# -----------------------------
+def claims_user(validated_token):
+    """User partiel construit depuis le jeton, ou None (repli en base)."""
+    if not claims_trusted():
+        return None
+    try:
+        # simplejwt écrit l'identifiant en chaîne : converti pour que user.pk == client.user_id
+        user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        role = validated_token["role"]
+        claims_at = validated_token["claims_at"]
+        is_active, is_staff, is_superuser = (validated_token[flag] for flag in FLAG_CLAIMS)
+    except KeyError:
+        return None
+    # Staff et comptes inactifs : toujours relus en base (permissions, admin)
+    if not is_active or is_staff or is_superuser or claims_stale(user_id, claims_at):
+        return None
+
+    db = router.db_for_read(User)
+    user = User.from_db(db, USER_FIELDS, [user_id, role, is_active, is_staff, is_superuser])
+    for name, model in PROFILES.items():
+        profile_id = validated_token.get(f"{name}_id")
+        profile = None
+        if profile_id is not None:
+            profile = model.from_db(router.db_for_read(model), ["id", "user_id"], [profile_id, user_id])
+            model._meta.get_field("user").set_cached_value(profile, user)
+        # None en cache : hasattr(user, name) est faux sans requête
+        User._meta.get_field(name).set_cached_value(user, profile)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication sans requête quand le jeton porte des claims à jour."""
+
+    def get_user(self, validated_token):
+        user = claims_user(validated_token)
+        if user is None:
+            return super().get_user(validated_token)
+        return user
+
+
+def load_profile(user, name):
+    """
+    Profil complet (`name` : "client" ou "employer") ou None ; le profil
+    partiel issu du jeton est remplacé par l'objet chargé (une requête).
+    """
+    profile = getattr(user, name, None)
+    if profile is None or not profile.get_deferred_fields():
+        return profile
+    model = PROFILES[name]
+    profile = model.objects.filter(pk=profile.pk).first()
+    if profile is not None:
+        model._meta.get_field("user").set_cached_value(profile, user)
+    User._meta.get_field(name).set_cached_value(user, profile)
+    return profile
+
+
+def load_user(user):
+    """Utilisateur complet (une requête si `user` est l'utilisateur partiel du jeton)."""
+    if not user.get_deferred_fields():
+        return user
+    full = User.objects.get(pk=user.pk)
+    for name in PROFILES:
+        field = User._meta.get_field(name)
+        if field.is_cached(user):
+            field.set_cached_value(full, field.get_cached_value(user))
+    return full
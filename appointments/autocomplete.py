@@ -0,0 +1,231 @@
+# appointments/autocomplete.py
+"""
+Autocomplétion de la barre de recherche (/autocomplete/?q=).
+
+Index en mémoire du processus : deux tableaux triés de clés
+(texte replié, type, libellé, id) interrogés par dichotomie (bisect), l'un
+pour le début des libellés, l'autre pour les mots suivants ("plom" et
+"dupont" trouvent tous deux "Plomberie Dupont", le début du libellé passe
+en premier). Les clés sont repliées en minuscules sans accents comme la
+recherche plein texte (search.fold).
+
+Suggestions indexées :
+- "service"  : nom des services actifs ;
+- "category" / "city" : catégories et villes des services actifs
+  (compteur de références : une ville disparaît avec son dernier service) ;
+- "employer" : nom des prestataires actifs et vérifiés.
+
+L'index est construit à la première requête, puis tenu à jour par les
+signaux post_save / post_delete de Service et Employer (après commit, voir
+signals.py). Les écritures de masse (update, bulk_create) et les écritures
+des autres processus ne passent pas par ces signaux : l'index est reconstruit
+au plus tard après AUTOCOMPLETE_MAX_AGE secondes.
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .models import Employer, Service
+from .search import TERM_RE, fold
+
+KINDS = ("service", "category", "city", "employer")
+# Après le dernier caractère possible : borne haute exclusive d'un préfixe
+PREFIX_UPPER = "\U0010ffff"
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+
+def _keys(label):
+    """Clés repliées d'un libellé : (tableau, clé) pour le libellé entier puis à partir de chaque mot."""
+    folded = " ".join(TERM_RE.findall(fold(label)))
+    if not folded:
+        return []
+    keys = [(0, folded)]
+    for position, char in enumerate(folded):
+        if char == " ":
+            keys.append((1, folded[position + 1 :]))
+    return keys
+
+
+def _service_entries(name, category, city):
+    entries = [("service", name)]
+    if category:
+        entries.append(("category", category.strip()))
+    if city:
+        entries.append(("city", city.strip()))
+    return entries
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # [débuts de libellé, mots suivants]
+        self._keys = ([], [])
+        # (type, libellé, id) -> nombre de références ; id = None pour ville / catégorie
+        self._refs = {}
+        # ("service" | "employer", pk) -> suggestions apportées par cet objet
+        self._sources = {}
+        # Chargement initial : ajout en fin de tableau puis un seul tri (voir build_index)
+        self._bulk = False
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._refs)
+
+    # -----------------------------
+    # Mise à jour
+    # -----------------------------
+    def _add(self, suggestion):
+        count = self._refs.get(suggestion, 0)
+        self._refs[suggestion] = count + 1
+        if count == 0:
+            kind, label, pk = suggestion
+            add = list.append if self._bulk else insort
+            for array, key in _keys(label):
+                add(self._keys[array], (key, KINDS.index(kind), label, pk or 0))
+
+    def _remove(self, suggestion):
+        count = self._refs.get(suggestion, 0)
+        if count > 1:
+            self._refs[suggestion] = count - 1
+            return
+        self._refs.pop(suggestion, None)
+        if count == 1:
+            kind, label, pk = suggestion
+            for array, key in _keys(label):
+                keys = self._keys[array]
+                entry = (key, KINDS.index(kind), label, pk or 0)
+                position = bisect_left(keys, entry)
+                if position < len(keys) and keys[position] == entry:
+                    del keys[position]
+
+    def _set_source(self, source, suggestions):
+        old = self._sources.pop(source, [])
+        for suggestion in old:
+            self._remove(suggestion)
+        for suggestion in suggestions:
+            self._add(suggestion)
+        if suggestions:
+            self._sources[source] = suggestions
+
+    def set_service(self, pk, name, category="", city="", active=True):
+        suggestions = []
+        if active:
+            suggestions = [
+                (kind, label, pk if kind == "service" else None)
+                for kind, label in _service_entries(name, category, city)
+                if label
+            ]
+        with self._lock:
+            self._set_source(("service", pk), suggestions)
+
+    def set_employer(self, pk, name, visible=True):
+        suggestions = [("employer", name, pk)] if visible and name else []
+        with self._lock:
+            self._set_source(("employer", pk), suggestions)
+
+    def remove_service(self, pk):
+        with self._lock:
+            self._set_source(("service", pk), [])
+
+    def remove_employer(self, pk):
+        with self._lock:
+            self._set_source(("employer", pk), [])
+
+    # -----------------------------
+    # Recherche
+    # -----------------------------
+    def lookup(self, query, limit=DEFAULT_LIMIT):
+        """
+        Au plus `limit` suggestions dont un mot commence par `query` : débuts
+        de libellé d'abord, puis mots suivants, chacun dans l'ordre des clés.
+        """
+        prefix = " ".join(TERM_RE.findall(fold(query)))
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            for keys in self._keys:
+                position = bisect_left(keys, (prefix,))
+                end = bisect_left(keys, (prefix + PREFIX_UPPER,), position)
+                while position < end and len(results) < limit:
+                    _, kind, label, pk = keys[position]
+                    position += 1
+                    # "Paris" et "paris" (deux services) : une seule suggestion
+                    identity = (kind, label.lower(), pk)
+                    if identity in seen:
+                        continue
+                    seen.add(identity)
+                    item = {"type": KINDS[kind], "label": label}
+                    if pk:
+                        item["id"] = pk
+                    results.append(item)
+        return results
+
+
+def build_index():
+    index = AutocompleteIndex()
+    index._bulk = True
+    services = Service.objects.filter(is_active=True).values_list("id", "name", "category", "city")
+    for pk, name, category, city in services.iterator(chunk_size=2000):
+        index.set_service(pk, name, category, city)
+    employers = Employer.objects.filter(is_active=True, is_verified=True).values_list("id", "name")
+    for pk, name in employers.iterator(chunk_size=2000):
+        index.set_employer(pk, name)
+    for keys in index._keys:
+        keys.sort()
+    index._bulk = False
+    return index
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def get_index():
+    """Index du processus, construit à la première utilisation (et après AUTOCOMPLETE_MAX_AGE)."""
+    global _index
+    max_age = getattr(settings, "AUTOCOMPLETE_MAX_AGE", 300)
+    index = _index
+    if index is None or (max_age and time.monotonic() - index.built_at > max_age):
+        with _build_lock:
+            if _index is index:
+                _index = build_index()
+            index = _index
+    return index
+
+
+def reset_index(**kwargs):
+    # Reconstruction à la prochaine requête (tests, post_migrate)
+    global _index
+    _index = None
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    return get_index().lookup(query, max(1, min(limit, MAX_LIMIT)))
+
+
+# -----------------------------
+# Mises à jour incrémentales (signaux)
+# -----------------------------
+def service_changed(service):
+    if _index is not None:
+        _index.set_service(service.pk, service.name, service.category, service.city, service.is_active)
+
+
+def service_removed(service_id):
+    if _index is not None:
+        _index.remove_service(service_id)
+
+
+def employer_changed(employer):
+    if _index is not None:
+        _index.set_employer(employer.pk, employer.name, employer.is_active and employer.is_verified)
+
+
+def employer_removed(employer_id):
+    if _index is not None:
+        _index.remove_employer(employer_id)
@@ -0,0 +1,158 @@
+# appointments/booking.py
+"""
+Moteur de réservation : détection de chevauchement et réservation sans course.
+
+Un rendez-vous occupe l'intervalle [date, date + durée[. La durée vient de
+`estimated_duration`, sinon de `service.duration`, sinon de
+BOOKING_DEFAULT_DURATION_MINUTES. Les rendez-vous annulés / refusés ne
+bloquent pas le créneau.
+
+Deux intervalles [s, e[ et [S, E[ se chevauchent si s < E et e > S. Les durées
+étant bornées par BOOKING_MAX_DURATION_MINUTES (M), seuls les rendez-vous
+avec S - M < s < E peuvent chevaucher : c'est une requête de plage sur
+l'index (employer, date), suivie d'un contrôle exact en mémoire.
+
+`reserve` sérialise les réservations d'un même prestataire : la transaction
+commence par un UPDATE de la ligne Employer (verrou de ligne sur PostgreSQL /
+MySQL, verrou d'écriture sur SQLite), puis revérifie le créneau avant
+d'insérer. Deux requêtes concurrentes ne peuvent donc pas réserver le même
+créneau.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DurationField, Exists, ExpressionWrapper, F, IntegerField, OuterRef, Value
+from django.db.models.functions import Coalesce, Greatest, Least, NullIf
+
+from .models import Appointment, Employer
+
+# Statuts qui libèrent le créneau
+RELEASED_STATUSES = ("annulé", "refusé")
+
+
+class BookingConflict(Exception):
+    """Le créneau demandé chevauche un rendez-vous existant."""
+
+    default_message = "L'employeur n'est pas disponible à cette date."
+
+    def __init__(self, message=None):
+        self.message = message or self.default_message
+        super().__init__(self.message)
+
+
+def default_duration():
+    return getattr(settings, "BOOKING_DEFAULT_DURATION_MINUTES", 60)
+
+
+def max_duration():
+    return getattr(settings, "BOOKING_MAX_DURATION_MINUTES", 12 * 60)
+
+
+def resolve_duration(estimated_duration=None, service=None):
+    """Durée effective (minutes), bornée à BOOKING_MAX_DURATION_MINUTES."""
+    minutes = estimated_duration or getattr(service, "duration", None) or default_duration()
+    return max(1, min(int(minutes), max_duration()))
+
+
+def overlap_candidates(employer_id, start, end, exclude_id=None):
+    """
+    Rendez-vous actifs de l'employeur pouvant chevaucher [start, end[ :
+    requête de plage sur l'index (employer, date).
+    """
+    qs = (
+        Appointment.objects.filter(
+            employer_id=employer_id,
+            date__gt=start - timedelta(minutes=max_duration()),
+            date__lt=end,
+        )
+        .exclude(status__in=RELEASED_STATUSES)
+        .order_by()
+    )
+    if exclude_id is not None:
+        qs = qs.exclude(pk=exclude_id)
+    return qs
+
+
+def booked_intervals(employer_id, start, end, exclude_id=None):
+    """Intervalles (début, fin) exacts des rendez-vous chevauchant potentiellement [start, end[."""
+    qs = overlap_candidates(employer_id, start, end, exclude_id)
+    fallback = default_duration()
+    cap = max_duration()
+    intervals = []
+    for date, estimated, service_duration in qs.values_list("date", "estimated_duration", "service__duration"):
+        minutes = max(1, min(int(estimated or service_duration or fallback), cap))
+        intervals.append((date, date + timedelta(minutes=minutes)))
+    return intervals
+
+
+def duration_expression():
+    """Équivalent SQL de resolve_duration (minutes) pour une ligne Appointment."""
+    minutes = Coalesce(
+        NullIf("estimated_duration", 0),
+        "service__duration",
+        Value(default_duration()),
+        output_field=IntegerField(),
+    )
+    return Greatest(Least(minutes, Value(max_duration())), Value(1))
+
+
+def end_expression():
+    """Fin du rendez-vous (date + durée), calculée en base."""
+    return ExpressionWrapper(
+        F("date") + ExpressionWrapper(duration_expression() * Value(timedelta(minutes=1)), output_field=DurationField()),
+        output_field=Appointment._meta.get_field("date"),
+    )
+
+
+def busy_subquery(start, end, employer_ref="pk"):
+    """
+    Exists() : l'employeur de la requête externe (OuterRef(employer_ref)) a un
+    rendez-vous actif chevauchant [start, end[. Même plage indexée que
+    overlap_candidates, puis contrôle exact de la fin en SQL.
+    """
+    candidates = (
+        Appointment.objects.filter(
+            employer_id=OuterRef(employer_ref),
+            date__gt=start - timedelta(minutes=max_duration()),
+            date__lt=end,
+        )
+        .exclude(status__in=RELEASED_STATUSES)
+        .alias(end=end_expression())
+        .filter(end__gt=start)
+    )
+    return Exists(candidates)
+
+
+def has_conflict(employer_id, start, duration, exclude_id=None):
+    end = start + timedelta(minutes=duration)
+    return any(
+        booked_start < end and booked_end > start
+        for booked_start, booked_end in booked_intervals(employer_id, start, end, exclude_id)
+    )
+
+
+def is_slot_free(employer_id, start, duration=None, exclude_id=None):
+    duration = duration or default_duration()
+    return not has_conflict(employer_id, start, duration, exclude_id=exclude_id)
+
+
+def lock_employer(employer_id):
+    """
+    Verrou de réservation par prestataire, à appeler dans une transaction :
+    l'UPDATE prend le verrou d'écriture jusqu'au commit.
+    """
+    Employer.objects.filter(pk=employer_id).update(booking_version=F("booking_version") + 1)
+
+
+def reserve(employer_id, start, duration, create):
+    """
+    Revérifie le créneau sous verrou puis appelle `create()` (qui insère le
+    rendez-vous). Lève BookingConflict si le créneau a été pris entre-temps.
+    """
+    with transaction.atomic():
+        lock_employer(employer_id)
+        if has_conflict(employer_id, start, duration):
+            raise BookingConflict()
+        return create()
@@ -0,0 +1,130 @@
+# appointments/employer_search.py
+"""
+Filtres et tris de EmployerList (/employers/).
+
+    ?service=3            prestataires d'un service
+    ?min_rate=&max_rate=  tarif horaire (hourly_rate)
+    ?min_rating=4         note moyenne minimale
+    ?verified=1           prestataires vérifiés uniquement
+    ?city=&category=      ville / catégorie du service (insensible à la casse)
+    ?free_at=<ISO>        libres à cette date (horaires + rendez-vous), ?duration= minutes
+    ?sort=rating|price|-price|reviews   (défaut: id)
+
+Chaque combinaison reste indexée : les index partiels Employer (WHERE
+is_active) couvrent le service, la note et le tarif ; ville / catégorie
+passent par une sous-requête sur les index LOWER(city) / LOWER(category) de
+Service ; "libre à" par les sous-requêtes Exists de booking / assignment.
+Le tri choisi devient l'ordre keyset du paginateur.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import assignment, booking
+from .models import Service
+
+# sort -> ordre keyset (champs non NULL, clé unique en dernier)
+SORTS = {
+    "id": ("id",),
+    "rating": ("-average_rating", "-total_reviews", "id"),
+    "reviews": ("-total_reviews", "id"),
+    "price": ("hourly_rate", "id"),
+    "-price": ("-hourly_rate", "id"),
+}
+DEFAULT_SORT = "id"
+
+TRUE_VALUES = {"1", "true", "yes", "y", "on", "oui"}
+FALSE_VALUES = {"0", "false", "no", "n", "off", "non"}
+
+
+def _decimal(params, name):
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        return Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: ["Nombre attendu."]})
+
+
+def _boolean(params, name):
+    raw = (params.get(name) or "").strip().lower()
+    if not raw:
+        return None
+    if raw in TRUE_VALUES:
+        return True
+    if raw in FALSE_VALUES:
+        return False
+    raise ValidationError({name: ["Booléen attendu (true / false)."]})
+
+
+def _datetime(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    value = parse_datetime(raw.replace(" ", "+"))
+    if value is None:
+        raise ValidationError({name: ["Date/heure ISO 8601 attendue."]})
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.get_current_timezone())
+    return value
+
+
+def get_sort(params):
+    sort = params.get("sort") or DEFAULT_SORT
+    if sort not in SORTS:
+        raise ValidationError({"sort": [f"Valeurs possibles : {', '.join(SORTS)}."]})
+    return sort
+
+
+def services_matching(city=None, category=None):
+    """Sous-requête des services actifs d'une ville / catégorie (index LOWER())."""
+    qs = Service.objects.filter(is_active=True)
+    if city:
+        qs = qs.alias(city_lower=Lower("city")).filter(city_lower=city.strip().lower())
+    if category:
+        qs = qs.alias(category_lower=Lower("category")).filter(category_lower=category.strip().lower())
+    return qs.values("id")
+
+
+def filter_employers(queryset, params):
+    """Applique les filtres de `params` (QueryDict) à un queryset d'Employer actifs."""
+    service_id = params.get("service")
+    if service_id:
+        queryset = queryset.filter(service_id=service_id)
+
+    min_rate, max_rate = _decimal(params, "min_rate"), _decimal(params, "max_rate")
+    if min_rate is not None:
+        queryset = queryset.filter(hourly_rate__gte=min_rate)
+    if max_rate is not None:
+        queryset = queryset.filter(hourly_rate__lte=max_rate)
+
+    min_rating = _decimal(params, "min_rating")
+    if min_rating is not None:
+        queryset = queryset.filter(average_rating__gte=float(min_rating))
+
+    verified = _boolean(params, "verified")
+    if verified is not None:
+        queryset = queryset.filter(is_verified=verified)
+
+    city, category = params.get("city"), params.get("category")
+    if city or category:
+        queryset = queryset.filter(service_id__in=services_matching(city, category))
+
+    free_at = _datetime(params, "free_at")
+    if free_at is not None:
+        try:
+            duration = booking.resolve_duration(int(params.get("duration") or 0))
+        except ValueError:
+            raise ValidationError({"duration": ["Entier attendu (minutes)."]})
+        queryset = assignment.filter_free(queryset, free_at, duration)
+
+    if get_sort(params) in ("price", "-price"):
+        # Tri keyset sur le tarif : les prestataires sans tarif sont exclus
+        queryset = queryset.filter(hourly_rate__isnull=False)
+
+    return queryset
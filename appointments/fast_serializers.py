@@ -0,0 +1,332 @@
+# appointments/fast_serializers.py
+"""
+Chemin de lecture "compilé" pour les listes à fort trafic.
+
+Un ModelSerializer DRF instancie ses champs puis appelle get_attribute /
+to_representation champ par champ, objet par objet. Pour les listes en lecture
+seule (AppointmentList, EmployerList), `compile_reader` analyse une seule fois
+l'arbre du serializer et produit un `CompiledReader` qui :
+- lit les lignes via QuerySet.values() (pas d'instances de modèles) ;
+- construit chaque dict avec des accesseurs précalculés (clé de colonne +
+  conversion), et des tables de libellés pour les get_<champ>_display ;
+- charge les relations multiples (ex: availabilities) avec une requête par
+  relation, regroupée en mémoire.
+
+Le JSON produit est identique à celui du serializer d'origine (voir les tests
+de parité). Si un champ n'est pas compilable (SerializerMethodField, source
+pointée...), `compile_reader` renvoie None et la vue garde le chemin DRF.
+"""
+
+import re
+import threading
+from collections import OrderedDict, defaultdict
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.response import Response
+
+DISPLAY_SOURCE_RE = re.compile(r"^get_(\w+)_display$")
+
+# Champs DRF dont to_representation est l'identité pour les valeurs lues en base
+IDENTITY_FIELDS = (
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+_COLUMN, _NESTED, _MANY = 0, 1, 2
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def _identity(value):
+    return value
+
+
+def _file_converter(model_field, drf_field):
+    """
+    Équivalent de FileField/ImageField.to_representation à partir du nom stocké.
+    Dépend de la requête (URL absolue) : fabrique appelée une fois par rendu.
+    """
+    storage = model_field.storage
+    use_url = getattr(drf_field, "use_url", True)
+
+    def factory(request):
+        def convert(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return convert
+
+    return factory
+
+
+def _display_converter(model_field):
+    labels = {key: str(label) for key, label in model_field.flatchoices}
+
+    def convert(value):
+        return labels.get(value, str(value))
+
+    return convert
+
+
+def _converter(drf_field, model_field):
+    if isinstance(model_field, models.FileField):
+        return None, _file_converter(model_field, drf_field)
+    if isinstance(drf_field, IDENTITY_FIELDS):
+        return _identity, None
+    if isinstance(drf_field, serializers.FloatField):
+        return float, None
+    if isinstance(drf_field, serializers.ReadOnlyField):
+        return _identity, None
+    return drf_field.to_representation, None
+
+
+class _Node:
+    """Plan compilé d'un serializer : entrées (nom, type, clé, cible)."""
+
+    def __init__(self, model):
+        self.model = model
+        self.entries = []
+        self.columns = []  # colonnes values() (uniquement pour un noeud racine)
+        self.many = []  # relations multiples à charger avant le rendu
+
+    def add_column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+
+
+class _ManyRelation:
+    """Relation inverse chargée en une requête ; `flat` : liste de clés primaires."""
+
+    def __init__(self, node, fk_name, flat=False):
+        self.node = node
+        self.fk_name = fk_name
+        self.flat = flat
+
+
+class _RequestBound:
+    """Convertisseur dépendant de la requête (URL de fichiers)."""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+
+def _compile(serializer, model, prefix="", root=None):
+    """
+    `root` est le noeud qui porte la requête values() : les colonnes et les
+    relations multiples des serializers imbriqués (FK) y sont ajoutées.
+    """
+    node = _Node(model)
+    root = root or node
+    pk_column = f"{prefix}{model._meta.pk.name}"
+    root.add_column(pk_column)
+
+    for field in serializer._readable_fields:
+        source = field.source
+        if source == "*" or "." in source:
+            raise NotCompilable(field.field_name)
+
+        display = DISPLAY_SOURCE_RE.match(source)
+        try:
+            model_field = model._meta.get_field(display.group(1) if display else source)
+        except Exception:
+            raise NotCompilable(field.field_name)
+
+        if display:
+            path = f"{prefix}{model_field.name}"
+            root.add_column(path)
+            node.entries.append((field.field_name, _COLUMN, path, _display_converter(model_field)))
+
+        elif isinstance(field, serializers.ListSerializer):
+            if not model_field.one_to_many:
+                raise NotCompilable(field.field_name)
+            child = _compile(field.child, model_field.related_model)
+            child.add_column(model_field.field.name)
+            relation = _ManyRelation(child, model_field.field.name)
+            root.many.append((relation, pk_column))
+            node.entries.append((field.field_name, _MANY, pk_column, relation))
+
+        elif isinstance(field, serializers.BaseSerializer):
+            if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+                raise NotCompilable(field.field_name)
+            related_model = model_field.related_model
+            nested_prefix = f"{prefix}{model_field.name}__"
+            nested = _compile(field, related_model, nested_prefix, root)
+            pk_path = f"{nested_prefix}{related_model._meta.pk.name}"
+            node.entries.append((field.field_name, _NESTED, pk_path, nested))
+
+        elif isinstance(field, serializers.ManyRelatedField):
+            if not model_field.one_to_many or not isinstance(field.child_relation, serializers.PrimaryKeyRelatedField):
+                raise NotCompilable(field.field_name)
+            child = _Node(model_field.related_model)
+            child.add_column(model_field.related_model._meta.pk.name)
+            child.add_column(model_field.field.name)
+            relation = _ManyRelation(child, model_field.field.name, flat=True)
+            root.many.append((relation, pk_column))
+            node.entries.append((field.field_name, _MANY, pk_column, relation))
+
+        else:
+            if not model_field.concrete:
+                raise NotCompilable(field.field_name)
+            if model_field.is_relation and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                raise NotCompilable(field.field_name)
+
+            path = f"{prefix}{model_field.name}"
+            root.add_column(path)
+            convert, factory = _converter(field, model_field)
+            target = _RequestBound(factory) if factory is not None else convert
+            node.entries.append((field.field_name, _COLUMN, path, target))
+
+    return node
+
+
+def _shape(serializer):
+    """Clé de cache : noms et types des champs, récursivement."""
+    shape = []
+    for name, field in serializer.fields.items():
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        sub = _shape(nested) if isinstance(nested, serializers.BaseSerializer) else None
+        shape.append((name, type(field), sub))
+    return tuple(shape)
+
+
+class CompiledReader:
+    def __init__(self, root):
+        self.root = root
+
+    @property
+    def columns(self):
+        return list(self.root.columns)
+
+    def values(self, queryset, extra=()):
+        """Queryset .values() des colonnes nécessaires (+ `extra`, ex: tri du paginateur)."""
+        columns = self.columns
+        for name in extra:
+            name = name.lstrip("-")
+            if name not in columns:
+                columns.append(name)
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .defer(None)
+            .values(*columns)
+        )
+
+    def render(self, rows, request=None):
+        rows = list(rows)
+        return self._render_node(self.root, rows, request)
+
+    def _render_node(self, node, rows, request):
+        many = {}
+        for relation, owner_column in node.many:
+            owners = {row[owner_column] for row in rows}
+            owners.discard(None)
+            many[relation] = self._load_many(relation, owners, request)
+
+        bound = self._bind(node.entries, request)
+        return [self._render_row(bound, row, many) for row in rows]
+
+    def _load_many(self, relation, owners, request):
+        if not owners:
+            return {}
+        child = relation.node
+        rows = list(
+            child.model._default_manager.filter(**{f"{relation.fk_name}__in": owners}).values(*child.columns)
+        )
+        if relation.flat:
+            pk_name = child.model._meta.pk.name
+            rendered = [row[pk_name] for row in rows]
+        else:
+            rendered = self._render_node(child, rows, request)
+        grouped = defaultdict(list)
+        for row, item in zip(rows, rendered):
+            grouped[row[relation.fk_name]].append(item)
+        return grouped
+
+    def _bind(self, entries, request):
+        bound = []
+        for name, kind, key, target in entries:
+            if kind == _COLUMN and isinstance(target, _RequestBound):
+                target = target.factory(request)
+            elif kind == _NESTED:
+                target = self._bind(target.entries, request)
+            bound.append((name, kind, key, target))
+        return bound
+
+    def _render_row(self, bound, row, many):
+        out = {}
+        for name, kind, key, target in bound:
+            value = row[key]
+            if value is None:
+                out[name] = [] if kind == _MANY else None
+            elif kind == _COLUMN:
+                out[name] = target(value)
+            elif kind == _NESTED:
+                out[name] = self._render_row(target, row, many)
+            else:
+                out[name] = many[target].get(value, [])
+        return out
+
+
+# Formes de serializer -> CompiledReader ; ?fields= / ?expand= sont choisis par
+# le client : cache borné, les formes les moins récentes sortent en premier
+READER_CACHE_SIZE = 256
+_READER_CACHE = OrderedDict()
+_READER_CACHE_LOCK = threading.Lock()
+
+
+def compile_reader(serializer):
+    """
+    Compile `serializer` (classe ou instance, éventuellement restreinte par
+    ?fields= / ?expand=) en CompiledReader, ou None s'il n'est pas compilable.
+    Le résultat est mis en cache par forme de serializer (READER_CACHE_SIZE formes).
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    key = (type(serializer), _shape(serializer))
+    with _READER_CACHE_LOCK:
+        if key in _READER_CACHE:
+            _READER_CACHE.move_to_end(key)
+            return _READER_CACHE[key]
+
+    try:
+        reader = CompiledReader(_compile(serializer, serializer.Meta.model))
+    except NotCompilable:
+        reader = None
+    with _READER_CACHE_LOCK:
+        _READER_CACHE[key] = reader
+        while len(_READER_CACHE) > READER_CACHE_SIZE:
+            _READER_CACHE.popitem(last=False)
+    return reader
+
+
+class CompiledListMixin:
+    """
+    list() servi par le CompiledReader quand le serializer est compilable ;
+    sinon repli sur le chemin DRF standard.
+    """
+
+    def list(self, request, *args, **kwargs):
+        reader = compile_reader(self.get_serializer())
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = reader.values(queryset, extra=getattr(self.paginator, "ordering", ()))
+
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(reader.render(rows, request))
+        return self.get_paginated_response(reader.render(page, request))
@@ -0,0 +1,139 @@
+# appointments/geo.py
+"""
+Recherche de proximité ("autour de moi") sans extension géographique.
+
+Services et prestataires portent latitude / longitude (optionnelles) et un
+geohash dérivé, indexé. Une recherche dans un rayon R :
+1. choisit la précision de geohash dont la cellule est au moins aussi grande
+   que R, puis prend la cellule du centre et ses 8 voisines : tout point à
+   moins de R du centre tombe dans l'une d'elles ;
+2. préfiltre en base par plages sur l'index geohash (geohash >= préfixe AND
+   geohash < préfixe + "{"), plus la boîte englobante lat/lng ;
+3. calcule la distance exacte (haversine) des candidats en une seule passe
+   et trie par distance.
+"""
+
+import math
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_MAX_LENGTH = 9
+# Caractère suivant "z" : borne haute exclusive d'un préfixe
+GEOHASH_UPPER = "{"
+
+
+def encode_geohash(latitude, longitude, length=GEOHASH_MAX_LENGTH):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < length:
+        rng, coord = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def cell_size(length):
+    """(hauteur, largeur) en degrés d'une cellule de geohash de `length` caractères."""
+    total = 5 * length
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def radius_in_degrees(latitude, radius_km):
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlng = min(radius_km / (KM_PER_DEGREE * cos_lat), 360.0)
+    return dlat, dlng
+
+
+def bounding_box(latitude, longitude, radius_km):
+    dlat, dlng = radius_in_degrees(latitude, radius_km)
+    return latitude - dlat, latitude + dlat, longitude - dlng, longitude + dlng
+
+
+def covering_prefixes(latitude, longitude, radius_km):
+    """Préfixes geohash (cellule du centre + voisines) couvrant le cercle, ou [] si trop grand."""
+    dlat, dlng = radius_in_degrees(latitude, radius_km)
+    length = 0
+    for candidate in range(1, GEOHASH_MAX_LENGTH + 1):
+        height, width = cell_size(candidate)
+        if height < dlat or width < dlng:
+            break
+        length = candidate
+    if length == 0:
+        return []
+
+    height, width = cell_size(length)
+    prefixes = set()
+    for dy in (-1, 0, 1):
+        lat = min(max(latitude + dy * height, -90.0), 90.0)
+        for dx in (-1, 0, 1):
+            lng = (longitude + dx * width + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(lat, lng, length))
+    return sorted(prefixes)
+
+
+def prefilter(latitude, longitude, radius_km):
+    """Q sur geohash (plages indexées) + boîte englobante."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    condition = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+    if max_lng - min_lng < 360.0:
+        if min_lng < -180.0:
+            condition &= Q(longitude__gte=min_lng + 360.0) | Q(longitude__lte=max_lng)
+        elif max_lng > 180.0:
+            condition &= Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360.0)
+        else:
+            condition &= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+
+    # geohash != "" reprend la condition des index partiels (sinon ignorés)
+    condition &= ~Q(geohash="")
+    cells = Q()
+    for prefix in covering_prefixes(latitude, longitude, radius_km):
+        cells |= Q(geohash__gte=prefix, geohash__lt=prefix + GEOHASH_UPPER)
+    return condition & cells if cells else condition
+
+
+def distances_km(latitude, longitude, points):
+    """Distances haversine (km) de (latitude, longitude) à chaque (lat, lng) de `points`, en une passe."""
+    lat0 = math.radians(latitude)
+    lng0 = math.radians(longitude)
+    cos_lat0 = math.cos(lat0)
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    result = []
+    for lat, lng in points:
+        lat1 = radians(lat)
+        a = sin((lat1 - lat0) / 2) ** 2 + cos_lat0 * cos(lat1) * sin((radians(lng) - lng0) / 2) ** 2
+        result.append(2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a))))
+    return result
+
+
+def nearby(queryset, latitude, longitude, radius_km, limit=None):
+    """
+    [(pk, distance_km)] des lignes de `queryset` à moins de `radius_km`,
+    triées par distance croissante.
+    """
+    rows = list(
+        queryset.filter(prefilter(latitude, longitude, radius_km))
+        .order_by()
+        .values_list("pk", "latitude", "longitude")
+    )
+    distances = distances_km(latitude, longitude, [(lat, lng) for _, lat, lng in rows])
+    hits = sorted(
+        ((row[0], distance) for row, distance in zip(rows, distances) if distance <= radius_km),
+        key=lambda hit: (hit[1], hit[0]),
+    )
+    return hits[:limit] if limit else hits
@@ -0,0 +1,233 @@
+# appointments/idempotency.py
+"""
+Clés d'idempotence (en-tête Idempotency-Key) des POST de réservation et de
+paiement : CreateAppointment ("booking"), AppointmentPayment et
+ProcessPayment ("payment").
+
+Le client envoie une clé unique par action (UUID) et la renvoie telle quelle
+à chaque nouvelle tentative. La première requête réserve la clé (ligne
+IdempotencyKey, unique par utilisateur + scope + clé), exécute la vue puis
+enregistre sa réponse. Jusqu'à expires_at (IDEMPOTENCY_TTL_SECONDS) :
+- même clé, même requête, réponse enregistrée : réponse rejouée, sans
+  exécuter la vue (en-tête Idempotent-Replayed: true) ; avec
+  ReplayBeforeThrottleMixin, elle est rejouée avant les throttles et ne
+  consomme pas de jeton ;
+- même clé, requête en cours (doublon concurrent) : attente de la première,
+  relecture toutes les IDEMPOTENCY_POLL_SECONDS, au plus
+  IDEMPOTENCY_WAIT_SECONDS (plafonné à MAX_WAIT_SECONDS : le worker est
+  bloqué), puis 409 si elle n'a toujours pas répondu ;
+- même clé, autre requête (méthode, chemin ou corps différent) : 422.
+Une réponse 5xx ou une exception libère la clé : la tentative suivante
+exécute de nouveau la vue. Une réservation sans réponse depuis
+IDEMPOTENCY_LOCK_SECONDS (processus tué) est reprise.
+
+Sans en-tête, la vue s'exécute normalement. `python manage.py
+purge_idempotency_keys` supprime par lots les clés expirées.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import purging
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field("key").max_length
+MAX_WAIT_SECONDS = 2
+
+
+def fingerprint(request):
+    """sha256 de la méthode, du chemin et du corps (JSON canonique)."""
+    data = request.data
+    if hasattr(data, "lists"):
+        # QueryDict (formulaire) : toutes les valeurs de chaque champ
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def claim(user_id, scope, key, digest, now=None):
+    """
+    Réserve la clé : (ligne, True) si elle est à nous, (ligne existante, False)
+    sinon. Une ligne expirée ou abandonnée est supprimée puis réservée de nouveau.
+    """
+    now = now or timezone.now()
+    ttl = timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 86400))
+    lock = timedelta(seconds=getattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 60))
+    while True:
+        try:
+            # Savepoint : l'échec de l'INSERT n'annule pas une transaction englobante
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user_id=user_id, scope=scope, key=key, fingerprint=digest, created_at=now, expires_at=now + ttl
+                )
+            return record, True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(user_id=user_id, scope=scope, key=key).first()
+        if record is None:
+            # Libérée entre-temps
+            continue
+        abandoned = record.response_status is None and record.created_at <= now - lock
+        if record.expires_at > now and not abandoned:
+            return record, False
+        # Condition sur created_at : un seul des concurrents supprime cette ligne-là
+        IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+
+
+def stored_response(request, scope, now=None):
+    """Clé déjà répondue pour cette même requête (non expirée), ou None."""
+    key = request.headers.get(HEADER)
+    if not key or len(key) > MAX_KEY_LENGTH or not request.user.is_authenticated:
+        return None
+    return IdempotencyKey.objects.filter(
+        user_id=request.user.pk,
+        scope=scope,
+        key=key,
+        fingerprint=fingerprint(request),
+        response_status__isnull=False,
+        expires_at__gt=now or timezone.now(),
+    ).first()
+
+
+def store(record, response):
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=response.status_code, response_body=response.data
+    )
+
+
+def release(record):
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def replay(record):
+    return Response(record.response_body, status=record.response_status, headers={REPLAYED_HEADER: "true"})
+
+
+def wait_for(record):
+    """Relit la ligne jusqu'à la réponse de la première requête ; None si elle a été libérée."""
+    timeout = min(getattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 1), MAX_WAIT_SECONDS)
+    interval = getattr(settings, "IDEMPOTENCY_POLL_SECONDS", 0.05)
+    deadline = time.monotonic() + timeout
+    while record.response_status is None and time.monotonic() < deadline:
+        time.sleep(interval)
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+        if record is None:
+            return None
+    return record
+
+
+def idempotent(scope):
+    """Décorateur de méthode `post` d'APIView (après authentification et throttles)."""
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            # Réponse déjà trouvée par ReplayBeforeThrottleMixin
+            record = getattr(request, "_idempotent_replay", None)
+            if record is not None:
+                return replay(record)
+            key = request.headers.get(HEADER)
+            if not key or not request.user.is_authenticated:
+                return handler(view, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{HEADER} trop longue ({MAX_KEY_LENGTH} caractères au plus)."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            digest = fingerprint(request)
+            while True:
+                record, created = claim(request.user.pk, scope, key, digest)
+                if created:
+                    break
+                if record.fingerprint != digest:
+                    return Response(
+                        {"error": f"{HEADER} déjà utilisée pour une autre requête."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                record = wait_for(record)
+                if record is None:
+                    # Première requête en échec : on la rejoue nous-mêmes
+                    continue
+                if record.response_status is None:
+                    return Response(
+                        {"error": "Une requête identique est en cours de traitement, réessayez plus tard."},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return replay(record)
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except BaseException:
+                release(record)
+                raise
+            if response.status_code >= 500:
+                release(record)
+            else:
+                store(record, response)
+            return response
+
+        wrapper.idempotency_scope = scope
+        return wrapper
+
+    return decorator
+
+
+class ReplayBeforeThrottleMixin:
+    """
+    Pour une vue limitée (throttle_classes) dont la méthode est @idempotent :
+    une nouvelle tentative déjà répondue est rejouée sans passer par les
+    throttles (pas de 429 ni de jeton consommé pour un simple rejeu).
+    """
+
+    def check_throttles(self, request):
+        handler = getattr(self, request.method.lower(), None)
+        scope = getattr(handler, "idempotency_scope", None)
+        record = stored_response(request, scope) if scope else None
+        if record is not None:
+            request._idempotent_replay = record
+            return
+        super().check_throttles(request)
+
+
+# -----------------------------
+# Purge des clés expirées
+# -----------------------------
+def purge_chunk(now, chunk_size=1000):
+    """Un lot de clés expirées (index idempotency_expires_idx) ; retourne le nombre supprimé."""
+    with transaction.atomic():
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now)
+            .order_by("expires_at", "id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+        deleted, _ = IdempotencyKey.objects.filter(id__in=ids, expires_at__lte=now).delete()
+    return deleted
+
+
+def purge_expired(now=None, chunk_size=None, **options):
+    """
+    Supprime les clés expirées lot par lot (options de purging.run :
+    max_chunks, pause, progress). Retourne {"chunks", "deleted", "elapsed", "rate"}.
+    """
+    now = now or timezone.now()
+    chunk_size = max(1, chunk_size or getattr(settings, "IDEMPOTENCY_PURGE_CHUNK_SIZE", 1000))
+
+    def chunk():
+        deleted = purge_chunk(now, chunk_size)
+        return (deleted,) if deleted else None
+
+    return purging.run(chunk, ["deleted"], **options)
@@ -0,0 +1,96 @@
+# appointments/management/commands/benchmark_read_path.py
+"""
+Compare le rendu DRF (ModelSerializer) et le CompiledReader sur des données
+synthétiques créées dans une transaction annulée à la fin.
+
+    python manage.py benchmark_read_path --rows 500 --repeat 5
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.fast_serializers import compile_reader
+from appointments.models import Appointment, Availability, Client, Employer, Service, User
+from appointments.prefetching import plan_queryset
+from appointments.serializers import AppointmentSerializer, EmployerSerializer
+
+
+class Command(BaseCommand):
+    help = "Mesure le gain du chemin de lecture compilé (AppointmentList / EmployerList)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Nombre de rendez-vous générés")
+        parser.add_argument("--employers", type=int, default=50, help="Nombre de prestataires générés")
+        parser.add_argument("--repeat", type=int, default=5, help="Nombre de mesures (meilleur temps retenu)")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["rows"], options["employers"])
+            self.compare("AppointmentSerializer", AppointmentSerializer, Appointment.objects.order_by("-date", "id"), options["repeat"])
+            self.compare("EmployerSerializer", EmployerSerializer, Employer.objects.order_by("id"), options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, rows, employers):
+        tag = int(time.time() * 1000)
+        service = Service.objects.create(name=f"Bench {tag}", description="benchmark", price="40.00")
+        client_user = User.objects.create(username=f"bench_client_{tag}", email=f"bench_client_{tag}@bench.local")
+        client = Client.objects.create(user=client_user, name="Bench", email=f"bench_client_{tag}@bench.local")
+
+        employer_objs = []
+        for i in range(employers):
+            user = User.objects.create(username=f"bench_emp_{tag}_{i}", email=f"bench_emp_{tag}_{i}@bench.local")
+            employer_objs.append(
+                Employer.objects.create(
+                    user=user,
+                    name=f"Bench {i}",
+                    email=f"bench_emp_{tag}_{i}@bench.local",
+                    service=service,
+                    hourly_rate="25.00",
+                )
+            )
+        Availability.objects.bulk_create(
+            Availability(employer=e, day_of_week=d, start_time="09:00", end_time="17:00")
+            for e in employer_objs
+            for d in range(5)
+        )
+
+        start = timezone.now() + timedelta(days=1)
+        Appointment.objects.bulk_create(
+            Appointment(
+                client=client,
+                employer=employer_objs[i % employers],
+                service=service,
+                date=start + timedelta(hours=i),
+                total_amount="80.00",
+            )
+            for i in range(rows)
+        )
+
+    def compare(self, label, serializer_class, queryset, repeat):
+        def drf():
+            return serializer_class(plan_queryset(queryset, serializer_class), many=True).data
+
+        reader = compile_reader(serializer_class)
+
+        def compiled():
+            return reader.render(reader.values(queryset))
+
+        drf_time = self.best_of(drf, repeat)
+        compiled_time = self.best_of(compiled, repeat)
+        self.stdout.write(
+            f"{label:<24} DRF {drf_time * 1000:8.1f} ms | compilé {compiled_time * 1000:8.1f} ms"
+            f" | x{drf_time / compiled_time:.1f}"
+        )
+
+    @staticmethod
+    def best_of(fn, repeat):
+        best = float("inf")
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        return best
@@ -0,0 +1,66 @@
+# appointments/management/commands/benchmark_register.py
+"""
+Mesure /auth/register/ quand les usernames générés entrent en collision
+(contact@site0, contact@site1... -> contact, contact1...). Inscriptions
+créées dans une transaction annulée à la fin.
+
+    python manage.py benchmark_register --users 500
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from appointments.views import RegisterView
+
+# Hachage rapide par défaut : PBKDF2 masquerait le coût des requêtes
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence de l'inscription quand les usernames générés entrent en collision."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500, help="Inscriptions avec le même préfixe d'email")
+        parser.add_argument("--window", type=int, default=50, help="Inscriptions par ligne de résultat")
+        parser.add_argument("--real-hasher", action="store_true", help="Garde PASSWORD_HASHERS (PBKDF2)")
+
+    def handle(self, *args, **options):
+        overrides = {"THROTTLE_RATES": {}}
+        if not options["real_hasher"]:
+            overrides["PASSWORD_HASHERS"] = FAST_HASHERS
+        with override_settings(**overrides), transaction.atomic():
+            self.run(max(1, options["users"]), max(1, options["window"]))
+            transaction.set_rollback(True)
+
+    def run(self, users, window):
+        view = RegisterView.as_view()
+        factory = APIRequestFactory()
+        tag = int(time.time() * 1000)
+        latencies, queries = [], []
+        for n in range(users):
+            request = factory.post(
+                "/api/v1/auth/register/",
+                {"email": f"contact@bench{tag}-{n}.local", "password": "bench-pass-123"},
+                format="json",
+            )
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                response = view(request)
+            latencies.append(time.perf_counter() - started)
+            queries.append(len(ctx.captured_queries))
+            if response.status_code != 201:
+                self.stderr.write(f"Inscription {n} refusée : {response.data}")
+                return
+            if (n + 1) % window == 0 or n + 1 == users:
+                chunk = latencies[-window:]
+                self.stdout.write(
+                    f"inscriptions {n + 2 - len(chunk):>5}-{n + 1:<5} médiane {statistics.median(chunk) * 1000:6.2f} ms "
+                    f"max {max(chunk) * 1000:6.2f} ms  {max(queries[-window:])} requêtes "
+                    f"(dernier username : {response.data['user']['username']})"
+                )
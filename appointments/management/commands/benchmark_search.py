@@ -0,0 +1,86 @@
+# appointments/management/commands/benchmark_search.py
+"""
+Mesure /services/search/ (FTS5 et repli icontains) et /autocomplete/ sur un
+catalogue synthétique créé dans une transaction annulée à la fin.
+
+    python manage.py benchmark_search --services 100000 --repeat 10
+"""
+
+import random
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appointments import autocomplete, search
+from appointments.models import Service
+
+TRADES = [
+    "plomberie", "ménage", "électricité", "jardinage", "peinture", "serrurerie", "déménagement",
+    "coiffure", "informatique", "maçonnerie", "menuiserie", "carrelage", "vitrerie", "chauffage",
+    "climatisation", "toiture", "repassage", "garde d'enfants", "cours de maths", "soutien scolaire",
+]
+CITIES = ["Paris", "Lyon", "Marseille", "Lille", "Nantes", "Toulouse", "Alger", "Oran", "Constantine", "Annaba"]
+QUERIES = [("plomberie", ""), ("menage", "paris"), ("electri", ""), ("cours maths", "lyon"), ("introuvable", "")]
+PREFIXES = ["p", "plo", "menage 12", "ELEC", "ly", "zz"]
+
+
+class Command(BaseCommand):
+    help = "Mesure la recherche de services (FTS5 / repli icontains) sur un gros catalogue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=100000, help="Nombre de services générés")
+        parser.add_argument("--repeat", type=int, default=10, help="Répétitions par requête (moyenne)")
+        parser.add_argument("--fallback", action="store_true", help="Mesure aussi le repli icontains")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["services"])
+            self.run("FTS5" if search.fts_available() else "icontains", options["repeat"])
+            if options["fallback"] and search.fts_available():
+                with mock.patch.object(search, "fts_available", return_value=False):
+                    self.run("icontains", options["repeat"])
+            self.run_autocomplete(options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        rng = random.Random(42)
+        # Vocabulaire de description assez large pour une sélectivité réaliste
+        vocabulary = [f"{trade.split()[0]}{suffix}" for trade in TRADES for suffix in ("", "s", "iste", "eur", "age")]
+        vocabulary += [f"mot{i}" for i in range(400)]
+        started = time.perf_counter()
+        Service.objects.bulk_create(
+            (
+                Service(
+                    name=f"{rng.choice(TRADES).capitalize()} {i}",
+                    description=" ".join(rng.choices(vocabulary, k=12)),
+                    category=rng.choice(TRADES),
+                    city=rng.choice(CITIES),
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        indexed = search.rebuild_index()
+        self.stdout.write(f"{count} services créés, {indexed} indexés en {time.perf_counter() - started:.1f} s")
+
+    def run(self, label, repeat):
+        for query, location in QUERIES:
+            started = time.perf_counter()
+            for _ in range(max(1, repeat)):
+                ids = search.search_service_ids(query, location=location, limit=21)
+            elapsed = (time.perf_counter() - started) / max(1, repeat)
+            self.stdout.write(f"{label:<10} q={query!r:<16} location={location!r:<9} {len(ids):>3} résultats {elapsed * 1000:7.1f} ms")
+
+    def run_autocomplete(self, repeat):
+        started = time.perf_counter()
+        index = autocomplete.build_index()
+        self.stdout.write(f"autocomplete: index de {len(index)} suggestions construit en {time.perf_counter() - started:.1f} s")
+        lookups = max(1, repeat) * 100
+        for prefix in PREFIXES:
+            started = time.perf_counter()
+            for _ in range(lookups):
+                results = index.lookup(prefix)
+            elapsed = (time.perf_counter() - started) / lookups
+            self.stdout.write(f"autocomplete q={prefix!r:<12} {len(results):>3} résultats {elapsed * 1e6:7.1f} µs")
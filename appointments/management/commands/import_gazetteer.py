@@ -0,0 +1,127 @@
+# appointments/management/commands/import_gazetteer.py
+"""
+Géocodage hors ligne : renseigne latitude / longitude des services (et des
+prestataires) à partir d'un fichier CSV local de localités.
+
+Colonnes attendues (en-tête) : name, latitude, longitude et, optionnellement,
+alternate_names (noms séparés par des virgules, ex. export GeoNames).
+
+    python manage.py import_gazetteer villes.csv [--delimiter ";"] [--overwrite] [--dry-run]
+
+Chaque service est rapproché par sa ville, sinon par le dernier élément de
+`location` / `address` ("12 rue X, Lyon" -> "lyon"), sans tenir compte de la
+casse ni des accents. Les prestataires sans position héritent de celle de
+leur service. Écritures par bulk_update (lots de --batch-size lignes).
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from appointments.geo import encode_geohash
+from appointments.models import Employer, Service
+from appointments.search import fold
+
+NAME_COLUMNS = ("name", "city", "ville", "nom")
+LAT_COLUMNS = ("latitude", "lat")
+LNG_COLUMNS = ("longitude", "lng", "lon")
+
+
+def _column(fieldnames, candidates):
+    lowered = {name.strip().lower(): name for name in fieldnames or []}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+
+def load_gazetteer(path, delimiter=","):
+    """{nom replié: (lat, lng)} ; le premier nom rencontré l'emporte."""
+    places = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle, delimiter=delimiter)
+        name_col = _column(reader.fieldnames, NAME_COLUMNS)
+        lat_col = _column(reader.fieldnames, LAT_COLUMNS)
+        lng_col = _column(reader.fieldnames, LNG_COLUMNS)
+        alt_col = _column(reader.fieldnames, ("alternate_names", "alternatenames"))
+        if not (name_col and lat_col and lng_col):
+            raise CommandError("Colonnes requises : name, latitude, longitude.")
+
+        for row in reader:
+            try:
+                point = (float(row[lat_col]), float(row[lng_col]))
+            except (TypeError, ValueError):
+                continue
+            names = [row[name_col]]
+            if alt_col and row.get(alt_col):
+                names += row[alt_col].split(",")
+            for name in names:
+                places.setdefault(fold(name).strip(), point)
+    places.pop("", None)
+    return places
+
+
+def place_candidates(city, location, address):
+    for value in (city, location, address):
+        value = (value or "").strip()
+        if not value:
+            continue
+        yield fold(value)
+        if "," in value:
+            yield fold(value.rsplit(",", 1)[1]).strip()
+
+
+class Command(BaseCommand):
+    help = "Géocode services et prestataires depuis un CSV de localités (hors ligne)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Fichier CSV (name, latitude, longitude[, alternate_names])")
+        parser.add_argument("--delimiter", default=",", help="Séparateur CSV (défaut: ,)")
+        parser.add_argument("--overwrite", action="store_true", help="Recalcule aussi les positions déjà renseignées")
+        parser.add_argument("--dry-run", action="store_true", help="N'écrit rien")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            places = load_gazetteer(options["path"], options["delimiter"])
+        except OSError as exc:
+            raise CommandError(f"Lecture impossible : {exc}")
+        self.stdout.write(f"{len(places)} localités chargées.")
+
+        services = Service.objects.all()
+        if not options["overwrite"]:
+            services = services.filter(latitude__isnull=True)
+
+        updated, missing = [], 0
+        for pk, city, location, address in services.values_list("pk", "city", "location", "address").iterator():
+            point = next((places[key] for key in place_candidates(city, location, address) if key in places), None)
+            if point is None:
+                missing += 1
+                continue
+            updated.append(Service(pk=pk, latitude=point[0], longitude=point[1], geohash=encode_geohash(*point)))
+
+        employers = 0
+        if not options["dry_run"]:
+            with transaction.atomic():
+                Service.objects.bulk_update(
+                    updated, ["latitude", "longitude", "geohash"], batch_size=max(1, options["batch_size"])
+                )
+                employers = self.geocode_employers(options["overwrite"])
+
+        self.stdout.write(
+            f"Services géocodés : {len(updated)}, non trouvés : {missing}, prestataires mis à jour : {employers}."
+        )
+
+    def geocode_employers(self, overwrite):
+        # Un UPDATE : position (et geohash) du service pour les prestataires sans position
+        employers = Employer.objects.filter(service__latitude__isnull=False)
+        if not overwrite:
+            employers = employers.filter(latitude__isnull=True)
+        service = Service.objects.filter(pk=OuterRef("service_id"))
+        return employers.update(
+            latitude=Subquery(service.values("latitude")[:1]),
+            longitude=Subquery(service.values("longitude")[:1]),
+            geohash=Subquery(service.values("geohash")[:1]),
+        )
@@ -0,0 +1,51 @@
+# appointments/management/commands/process_outbox.py
+"""
+Worker de la file de notifications (voir appointments/outbox.py) : crée les
+notifications in-app par lots et livre les canaux externes, avec reprise
+exponentielle des échecs.
+
+    python manage.py process_outbox             # boucle (Ctrl+C pour arrêter)
+    python manage.py process_outbox --once      # vide la file puis s'arrête
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointments import outbox
+
+
+class Command(BaseCommand):
+    help = "Vide la file de notifications (notifications in-app + email / SMS)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "NOTIFICATION_OUTBOX_BATCH_SIZE", outbox.DEFAULT_BATCH_SIZE),
+            help="Événements traités par lot",
+        )
+        parser.add_argument("--once", action="store_true", help="Vide la file une fois puis s'arrête")
+        parser.add_argument("--interval", type=float, default=1.0, help="Attente (s) quand la file est vide")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        channels = {}
+        try:
+            while True:
+                started = time.perf_counter()
+                totals = outbox.drain(batch_size=batch_size, channels=channels)
+                if totals["claimed"]:
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{totals['claimed']} événements en {elapsed:.2f} s : "
+                        f"{totals['notifications']} notifications créées, {totals['delivered']} livrés, "
+                        f"{totals['retried']} à réessayer, {totals['failed']} en échec"
+                    )
+                if options["once"]:
+                    break
+                if not totals["claimed"]:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du worker.")
@@ -0,0 +1,35 @@
+# appointments/management/commands/purge_idempotency_keys.py
+"""
+Supprime les clés d'idempotence expirées (IdempotencyKey.expires_at) par
+lots courts, une transaction par lot.
+
+    python manage.py purge_idempotency_keys [--chunk-size 1000] [--max-chunks N] [--sleep 0.05] [--dry-run]
+"""
+
+from django.utils import timezone
+
+from appointments import idempotency
+from appointments.models import IdempotencyKey
+from appointments.purging import PurgeCommand
+
+
+class Command(PurgeCommand):
+    help = "Purge par lots les clés d'idempotence expirées."
+    chunk_size_setting = "IDEMPOTENCY_PURGE_CHUNK_SIZE"
+    unit = "Clés"
+    dry_run_help = "Compte les clés expirées"
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["dry_run"]:
+            count = IdempotencyKey.objects.filter(expires_at__lte=now).count()
+            self.stdout.write(f"{count} clés d'idempotence expirées.")
+            return
+
+        stats = idempotency.purge_expired(
+            now, **self.purge_options(options, lambda stats: f"{stats['deleted']} clés supprimées ({stats['rate']:.0f}/s)")
+        )
+        self.stdout.write(
+            f"{stats['deleted']} clés d'idempotence expirées supprimées en {stats['chunks']} lots, "
+            f"{stats['elapsed']:.2f} s ({stats['rate']:.0f}/s)."
+        )
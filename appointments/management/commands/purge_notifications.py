@@ -0,0 +1,54 @@
+# appointments/management/commands/purge_notifications.py
+"""
+Rétention des notifications : déplace dans l'historique (ou supprime) les
+notifications lues ou archivées plus anciennes que NOTIFICATION_RETENTION_DAYS,
+par lots courts (une transaction par lot) pour tourner sous trafic.
+
+    python manage.py purge_notifications [--days 90] [--mode history|delete]
+        [--chunk-size 1000] [--max-chunks N] [--sleep 0.1] [--dry-run]
+"""
+
+from django.conf import settings
+
+from appointments import notifications
+from appointments.purging import PurgeCommand
+
+
+class Command(PurgeCommand):
+    help = "Historise ou supprime les anciennes notifications lues, par lots."
+    chunk_size_setting = "NOTIFICATION_RETENTION_CHUNK_SIZE"
+    unit = "Notifications"
+    dry_run_help = "Compte les notifications concernées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90),
+            help="Âge (jours) au-delà duquel une notification lue est retirée",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=notifications.RETENTION_MODES,
+            default=getattr(settings, "NOTIFICATION_RETENTION_MODE", "history"),
+            help="history : copie dans NotificationHistory puis suppression ; delete : suppression seule",
+        )
+        super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        cutoff = notifications.retention_cutoff(options["days"])
+        if options["dry_run"]:
+            count = notifications.expired(cutoff).count()
+            self.stdout.write(f"{count} notifications lues avant le {cutoff:%Y-%m-%d %H:%M}.")
+            return
+
+        verb = "historisées" if options["mode"] == "history" else "supprimées"
+        stats = notifications.purge(
+            cutoff,
+            mode=options["mode"],
+            **self.purge_options(options, lambda stats: f"{stats['processed']} {verb} ({stats['rate']:.0f}/s)"),
+        )
+        self.stdout.write(
+            f"{stats['processed']} notifications {verb} en {stats['chunks']} lots, "
+            f"{stats['elapsed']:.2f} s ({stats['rate']:.0f}/s)."
+        )
@@ -0,0 +1,37 @@
+# appointments/management/commands/purge_tokens.py
+"""
+Supprime les refresh tokens expirés (OutstandingToken et leur entrée
+BlacklistedToken) par lots courts, une transaction par lot. Remplace
+`flushexpiredtokens` (un seul DELETE sur toute la table).
+
+    python manage.py purge_tokens [--chunk-size 1000] [--max-chunks N] [--sleep 0.05] [--dry-run]
+"""
+
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from appointments import revocation
+from appointments.purging import PurgeCommand
+
+
+class Command(PurgeCommand):
+    help = "Purge par lots les jetons expirés (outstanding + liste noire)."
+    chunk_size_setting = "TOKEN_PURGE_CHUNK_SIZE"
+    unit = "Jetons"
+    dry_run_help = "Compte les jetons expirés"
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["dry_run"]:
+            outstanding = OutstandingToken.objects.filter(expires_at__lte=now).count()
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__lte=now).count()
+            self.stdout.write(f"{outstanding} jetons expirés, dont {blacklisted} en liste noire.")
+            return
+
+        stats = revocation.purge_expired(
+            now, **self.purge_options(options, lambda stats: f"{stats['outstanding']} jetons supprimés ({stats['rate']:.0f}/s)")
+        )
+        self.stdout.write(
+            f"{stats['outstanding']} jetons expirés supprimés (dont {stats['blacklisted']} en liste noire) "
+            f"en {stats['chunks']} lots, {stats['elapsed']:.2f} s ({stats['rate']:.0f}/s)."
+        )
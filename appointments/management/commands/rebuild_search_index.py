@@ -0,0 +1,32 @@
+# appointments/management/commands/rebuild_search_index.py
+"""
+Reconstruit l'index plein texte des services (table FTS5), par exemple après
+un import en masse (bulk_create / update ne déclenchent pas les signaux).
+
+    python manage.py rebuild_search_index [--batch-size 2000]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from appointments import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des services."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000, help="Services insérés par lot")
+
+    def handle(self, *args, **options):
+        if not search.fts_available():
+            self.stdout.write("FTS5 indisponible : la recherche utilise le repli icontains, rien à reconstruire.")
+            return
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            count = search.rebuild_index(batch_size=max(1, options["batch_size"]))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{count} services indexés en {elapsed:.2f} s.")
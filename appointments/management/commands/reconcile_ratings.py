@@ -0,0 +1,68 @@
+# appointments/management/commands/reconcile_ratings.py
+"""
+Recalcule average_rating / total_reviews / histogramme 1..5 de chaque
+prestataire à partir de Appointment.rating (une seule requête groupée) et ne
+réécrit que les lignes qui ont dérivé (bulk_update par lots).
+
+    python manage.py reconcile_ratings [--dry-run] [--batch-size 500]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from appointments.models import Employer
+
+# Tolérance sur la moyenne (les mises à jour incrémentales sont en flottant)
+RATING_TOLERANCE = 1e-6
+
+
+class Command(BaseCommand):
+    help = "Réconcilie les notes agrégées des prestataires avec les avis des rendez-vous."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Affiche les écarts sans rien écrire")
+        parser.add_argument("--batch-size", type=int, default=500, help="Taille des lots de bulk_update")
+
+    def handle(self, *args, **options):
+        histogram = [f"rating_{i}_count" for i in Employer.RATING_VALUES]
+        rows = Employer.objects.annotate(
+            expected_total=Count("employer_appointments__rating"),
+            expected_average=Avg("employer_appointments__rating"),
+            **{
+                f"expected_{name}": Count("employer_appointments", filter=Q(employer_appointments__rating=i))
+                for i, name in zip(Employer.RATING_VALUES, histogram)
+            },
+        ).values(
+            "id",
+            "total_reviews",
+            "average_rating",
+            "expected_total",
+            "expected_average",
+            *histogram,
+            *(f"expected_{name}" for name in histogram),
+        )
+
+        drifted = []
+        checked = 0
+        for row in rows.iterator():
+            checked += 1
+            expected = {
+                "total_reviews": row["expected_total"],
+                "average_rating": float(row["expected_average"] or 0.0),
+                **{name: row[f"expected_{name}"] for name in histogram},
+            }
+            if (
+                abs(row["average_rating"] - expected["average_rating"]) > RATING_TOLERANCE
+                or any(row[name] != expected[name] for name in ["total_reviews", *histogram])
+            ):
+                drifted.append(Employer(pk=row["id"], **expected))
+
+        if drifted and not options["dry_run"]:
+            with transaction.atomic():
+                Employer.objects.bulk_update(
+                    drifted, ["total_reviews", "average_rating", *histogram], batch_size=max(1, options["batch_size"])
+                )
+
+        verb = "à corriger" if options["dry_run"] else "corrigés"
+        self.stdout.write(f"{checked} prestataires vérifiés, {len(drifted)} {verb}.")
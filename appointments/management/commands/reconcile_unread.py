@@ -0,0 +1,24 @@
+# appointments/management/commands/reconcile_unread.py
+"""
+Recalcule User.unread_notifications à partir des notifications non lues
+(une seule requête groupée) et ne réécrit que les compteurs qui ont dérivé.
+
+    python manage.py reconcile_unread [--dry-run] [--batch-size 500]
+"""
+
+from django.core.management.base import BaseCommand
+
+from appointments import notifications
+
+
+class Command(BaseCommand):
+    help = "Réconcilie les compteurs de notifications non lues des utilisateurs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Affiche les écarts sans rien écrire")
+        parser.add_argument("--batch-size", type=int, default=500, help="Taille des lots de bulk_update")
+
+    def handle(self, *args, **options):
+        checked, drifted = notifications.reconcile(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        verb = "à corriger" if options["dry_run"] else "corrigés"
+        self.stdout.write(f"{checked} utilisateurs vérifiés, {drifted} {verb}.")
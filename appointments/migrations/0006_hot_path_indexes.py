@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0005_service_address_service_category_service_city_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["client", "-date", "id"], name="appt_client_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["employer", "-date", "id"], name="appt_employer_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["service", "id"],
+                name="employer_active_service_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["id"], name="employer_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["recipient", "-created_at", "id"], name="notif_recipient_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["id"], name="service_active_idx"
+            ),
+        ),
+    ]
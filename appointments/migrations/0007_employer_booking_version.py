@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0006_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employer",
+            name="booking_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_histogram(apps, schema_editor):
+    # Une requête groupée (employer, rating), puis un UPDATE par prestataire noté
+    Appointment = apps.get_model("appointments", "Appointment")
+    Employer = apps.get_model("appointments", "Employer")
+    counts = {}
+    rows = Appointment.objects.filter(rating__isnull=False).values("employer_id", "rating").annotate(n=Count("id"))
+    for row in rows.order_by():
+        counts.setdefault(row["employer_id"], {})[f"rating_{row['rating']}_count"] = row["n"]
+    for employer_id, fields in counts.items():
+        Employer.objects.filter(pk=employer_id).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0007_employer_booking_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employer",
+            name="rating_1_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="rating_2_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="rating_3_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="rating_4_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="rating_5_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(condition=models.Q(("rating__isnull", False)), fields=["employer", "-created_at", "-id"], name="appt_employer_reviews_idx"),
+        ),
+        migrations.RunPython(backfill_histogram, migrations.RunPython.noop),
+    ]
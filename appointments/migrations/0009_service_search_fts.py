@@ -0,0 +1,51 @@
+from django.db import DatabaseError, migrations
+
+FTS_TABLE = "appointments_service_fts"
+
+
+def create_fts(apps, schema_editor):
+    # Table virtuelle FTS5 (SQLite uniquement ; ailleurs, la recherche se replie sur icontains)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Service = apps.get_model("appointments", "Service")
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "name, description, category, place, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        except DatabaseError:
+            return  # SQLite compilé sans FTS5
+
+        rows = [
+            [
+                s.pk,
+                s.name or "",
+                s.description or "",
+                s.category or "",
+                " ".join(part for part in (s.city, s.address, s.location) if part),
+            ]
+            for s in Service.objects.all().iterator()
+        ]
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, place) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0008_review_histogram"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0009_service_search_fts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(condition=models.Q(("is_active", True)), fields=["-average_rating", "-total_reviews", "id"], name="employer_active_rating_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(condition=models.Q(("is_active", True)), fields=["-total_reviews", "id"], name="employer_active_reviews_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(condition=models.Q(("is_active", True)), fields=["hourly_rate", "id"], name="employer_active_rate_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(condition=models.Q(("is_active", True), ("is_verified", True)), fields=["id"], name="employer_verified_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(django.db.models.functions.text.Lower("city"), name="service_city_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(django.db.models.functions.text.Lower("category"), name="service_category_lower_idx"),
+        ),
+    ]
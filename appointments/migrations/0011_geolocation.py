@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0010_employer_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employer",
+            name="geohash",
+            field=models.CharField(blank=True, default="", editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name="Latitude"),
+        ),
+        migrations.AddField(
+            model_name="employer",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name="Longitude"),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="geohash",
+            field=models.CharField(blank=True, default="", editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name="Latitude"),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name="Longitude"),
+        ),
+        migrations.AddIndex(
+            model_name="employer",
+            index=models.Index(condition=models.Q(("is_active", True), models.Q(("geohash", ""), _negated=True)), fields=["geohash"], name="employer_geohash_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(condition=models.Q(("geohash", ""), _negated=True), fields=["geohash"], name="service_geohash_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0011_geolocation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("notification_type", models.CharField(max_length=50)),
+                ("title", models.CharField(max_length=200)),
+                ("message", models.TextField()),
+                ("channels", models.JSONField(blank=True, default=list)),
+                ("status", models.CharField(choices=[("pending", "En attente"), ("failed", "Échec définitif")], default="pending", max_length=10)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("appointment", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="outbox_events", to="appointments.appointment")),
+                ("notification", models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name="+", to="appointments.notification")),
+                ("recipient", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="outbox_events", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Événement de notification",
+                "verbose_name_plural": "File de notifications",
+                "indexes": [models.Index(condition=models.Q(("status", "pending")), fields=["next_attempt_at", "id"], name="outbox_pending_idx")],
+            },
+        ),
+    ]
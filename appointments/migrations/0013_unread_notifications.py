@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread(apps, schema_editor):
+    # Une requête groupée, puis un UPDATE par utilisateur ayant des non lues
+    Notification = apps.get_model("appointments", "Notification")
+    User = apps.get_model("appointments", "User")
+    rows = Notification.objects.filter(is_read=False).values("recipient_id").annotate(n=Count("id"))
+    for row in rows.order_by():
+        User.objects.filter(pk=row["recipient_id"]).update(unread_notifications=row["n"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0012_notification_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="unread_notifications",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread, migrations.RunPython.noop),
+    ]
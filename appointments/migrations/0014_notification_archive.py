@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0013_unread_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="archived_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
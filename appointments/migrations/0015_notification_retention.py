@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0014_notification_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationHistory",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("appointment_id", models.BigIntegerField(blank=True, null=True)),
+                ("notification_type", models.CharField(max_length=50)),
+                ("title", models.CharField(max_length=200)),
+                ("message", models.TextField()),
+                ("created_at", models.DateTimeField()),
+                ("moved_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("recipient", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="notification_history", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "verbose_name": "Notification historisée",
+                "verbose_name_plural": "Historique des notifications",
+                "ordering": ["-created_at"],
+                "indexes": [models.Index(fields=["recipient", "-created_at"], name="notif_history_recipient_idx")],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(condition=models.Q(("is_read", True), ("archived_at__isnull", False), _connector="OR"), fields=["created_at", "id"], name="notif_retention_idx"),
+        ),
+    ]
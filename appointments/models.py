@@ -1,10 +1,26 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Cast, Greatest, Lower
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
 
+from .geo import encode_geohash
+
+
+def sync_geohash(instance, save_kwargs):
+    # geohash recalculé à chaque save ; ajouté à update_fields si la position y figure
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = encode_geohash(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ""
+    update_fields = save_kwargs.get("update_fields")
+    if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+        save_kwargs["update_fields"] = {*update_fields, "geohash"}
+
 
 class Service(models.Model):
     name = models.CharField(max_length=100, verbose_name="Nom du service")
@@ -12,12 +28,53 @@ class Service(models.Model):
     icon = models.CharField(max_length=50, default="fas fa-tools", verbose_name="Icône")
     is_active = models.BooleanField(default=True, verbose_name="Service actif")
 
+    category = models.CharField(max_length=120, blank=True, default="", verbose_name="Catégorie")
+    city = models.CharField(max_length=120, blank=True, default="", verbose_name="Ville")
+    address = models.TextField(blank=True, default="", verbose_name="Adresse")
+    location = models.CharField(max_length=255, blank=True, default="", verbose_name="Localisation")
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name="Prix",
+    )
+    duration = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Durée estimée en minutes",
+        verbose_name="Durée",
+    )
+
+    # Position (optionnelle) ; geohash dérivé, indexé pour la recherche de proximité
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)], verbose_name="Latitude"
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)], verbose_name="Longitude"
+    )
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        sync_geohash(self, kwargs)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Service"
         verbose_name_plural = "Services"
+        indexes = [
+            # ServiceList: services actifs uniquement
+            models.Index(fields=["id"], condition=models.Q(is_active=True), name="service_active_idx"),
+            # Recherche de prestataires par ville / catégorie (comparaison insensible à la casse)
+            models.Index(Lower("city"), name="service_city_lower_idx"),
+            models.Index(Lower("category"), name="service_category_lower_idx"),
+            # Recherche de proximité : plages de préfixes geohash
+            models.Index(fields=["geohash"], condition=~models.Q(geohash=""), name="service_geohash_idx"),
+        ]
 
 
 class Employer(models.Model):
@@ -67,21 +124,91 @@ class Employer(models.Model):
         verbose_name="Tarif horaire",
     )
 
+    # Position (optionnelle) ; geohash dérivé, indexé pour la recherche de proximité
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)], verbose_name="Latitude"
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)], verbose_name="Longitude"
+    )
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+
+    # Histogramme des notes (nombre d'avis à 1..5 étoiles), tenu à jour par update_rating
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Incrémenté à chaque réservation : l'UPDATE sert de verrou par prestataire
+    booking_version = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
-    def is_available(self, date_dt):
-        # Vérifie si un rendez-vous existe exactement sur ce datetime
-        return not self.employer_appointments.filter(date=date_dt).exists()
+    def save(self, *args, **kwargs):
+        sync_geohash(self, kwargs)
+        super().save(*args, **kwargs)
 
-    def update_rating(self, new_rating):
-        self.total_reviews += 1
-        self.average_rating = ((self.average_rating * (self.total_reviews - 1)) + new_rating) / self.total_reviews
-        self.save()
+    def is_available(self, date_dt, duration=None, exclude_id=None):
+        # Vérifie qu'aucun rendez-vous actif ne chevauche [date_dt, date_dt + durée[
+        from .booking import is_slot_free
+
+        return is_slot_free(self.pk, date_dt, duration, exclude_id=exclude_id)
+
+    RATING_VALUES = range(1, 6)
+    RATING_FIELDS = ["average_rating", "total_reviews"] + [f"rating_{i}_count" for i in RATING_VALUES]
+
+    def rating_histogram(self):
+        return {str(i): getattr(self, f"rating_{i}_count") for i in self.RATING_VALUES}
+
+    def update_rating(self, new_rating, previous_rating=None):
+        """
+        Un seul UPDATE atomique (expressions F()) : pas de perte de mise à jour
+        entre avis concurrents, et seules les colonnes de note sont écrites.
+        `previous_rating` : note remplacée quand un avis est modifié.
+        """
+        updates = {f"rating_{new_rating}_count": F(f"rating_{new_rating}_count") + 1}
+        if previous_rating:
+            # Modification d'un avis : même nombre d'avis, somme corrigée
+            total = F("total_reviews")
+            rating_sum = F("average_rating") * F("total_reviews") + (new_rating - previous_rating)
+            previous_count = f"rating_{previous_rating}_count"
+            updates[previous_count] = Greatest(F(previous_count) - 1, 0)
+        else:
+            total = F("total_reviews") + 1
+            rating_sum = F("average_rating") * F("total_reviews") + new_rating
+
+        Employer.objects.filter(pk=self.pk).update(
+            total_reviews=total,
+            average_rating=Cast(rating_sum, models.FloatField()) / Greatest(total, 1),
+            **updates,
+        )
+        self.refresh_from_db(fields=self.RATING_FIELDS)
 
     class Meta:
         verbose_name = "Prestataire"
         verbose_name_plural = "Prestataires"
+        indexes = [
+            # EmployerList ?service= / auto-assignation: prestataires actifs d'un service
+            models.Index(fields=["service", "id"], condition=models.Q(is_active=True), name="employer_active_service_idx"),
+            # EmployerList sans filtre: prestataires actifs, ordre de pagination
+            models.Index(fields=["id"], condition=models.Q(is_active=True), name="employer_active_idx"),
+            # Recherche de prestataires : filtres et tris (voir employer_search.py)
+            models.Index(
+                fields=["-average_rating", "-total_reviews", "id"],
+                condition=models.Q(is_active=True),
+                name="employer_active_rating_idx",
+            ),
+            models.Index(fields=["-total_reviews", "id"], condition=models.Q(is_active=True), name="employer_active_reviews_idx"),
+            models.Index(fields=["hourly_rate", "id"], condition=models.Q(is_active=True), name="employer_active_rate_idx"),
+            models.Index(
+                fields=["id"], condition=models.Q(is_active=True, is_verified=True), name="employer_verified_idx"
+            ),
+            models.Index(
+                fields=["geohash"], condition=models.Q(is_active=True) & ~models.Q(geohash=""), name="employer_geohash_idx"
+            ),
+        ]
 
 
 class Availability(models.Model):
@@ -228,6 +355,20 @@ class Appointment(models.Model):
         ordering = ["-date"]
         verbose_name = "Rendez-vous"
         verbose_name_plural = "Rendez-vous"
+        indexes = [
+            # Listes client / prestataire triées par date (-date, id)
+            models.Index(fields=["client", "-date", "id"], name="appt_client_date_idx"),
+            # Idem côté prestataire ; sert aussi les recherches par créneau
+            # (employer, date) : un B-tree se parcourt dans les deux sens.
+            models.Index(fields=["employer", "-date", "id"], name="appt_employer_date_idx"),
+            # Fil d'avis d'un prestataire (employer, -created_at, -id) limité aux
+            # rendez-vous notés : index partiel sur rating IS NOT NULL
+            models.Index(
+                fields=["employer", "-created_at", "-id"],
+                condition=models.Q(rating__isnull=False),
+                name="appt_employer_reviews_idx",
+            ),
+        ]
 
 
 class Notification(models.Model):
@@ -241,6 +382,8 @@ class Notification(models.Model):
     message = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Archivée : hors de la boîte de réception et du compteur de non lues
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     appointment = models.ForeignKey(
         Appointment,
@@ -252,11 +395,152 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Liste paginée (boîte de réception ou archivées : filtre sur archived_at) et actions groupées
+            models.Index(fields=["recipient", "-created_at", "id"], name="notif_recipient_created_idx"),
+            # Rétention : notifications lues ou archivées, des plus anciennes aux plus récentes
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_read=True) | models.Q(archived_at__isnull=False),
+                name="notif_retention_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.recipient.username}"
 
 
+class NotificationHistory(models.Model):
+    """
+    Historique : notification lue (ou archivée par l'utilisateur) ancienne,
+    déplacée hors de Notification par `purge_notifications` (voir
+    notifications.py). Même id ; pas de clé étrangère vers le rendez-vous ni
+    d'index de boîte de réception.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="notification_history",
+        db_index=False,
+    )
+    appointment_id = models.BigIntegerField(null=True, blank=True)
+    notification_type = models.CharField(max_length=50)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    moved_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Notification historisée"
+        verbose_name_plural = "Historique des notifications"
+        indexes = [
+            models.Index(fields=["recipient", "-created_at"], name="notif_history_recipient_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Réponse d'une requête POST envoyée avec l'en-tête Idempotency-Key (voir
+    idempotency.py) : rejouée aux nouvelles tentatives jusqu'à expires_at.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+    )
+    scope = models.CharField(max_length=30)
+    key = models.CharField(max_length=255)
+    # Empreinte méthode + chemin + corps : une clé réutilisée pour une autre requête est refusée
+    fingerprint = models.CharField(max_length=64)
+    # Null tant que la première requête est en cours
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "scope", "key"], name="idempotency_user_scope_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["expires_at", "id"], name="idempotency_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.user_id})"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Événement de notification en attente de livraison (voir outbox.py).
+    Écrit dans la transaction de l'écriture métier (outbox.enqueue),
+    consommé par `process_outbox` (ou dès le commit, NOTIFICATION_OUTBOX_INLINE).
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "En attente"),
+        ("failed", "Échec définitif"),
+    ]
+
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="outbox_events",
+    )
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="outbox_events",
+    )
+    notification_type = models.CharField(max_length=50)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+
+    # Canaux externes restant à livrer (email, sms...) ; la notification
+    # in-app est créée une seule fois (notification renseignée)
+    channels = models.JSONField(default=list, blank=True)
+    # Sans contrainte : la suppression groupée des notifications reste un seul DELETE
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Événement de notification"
+        verbose_name_plural = "File de notifications"
+        indexes = [
+            # File du worker : événements dus, dans l'ordre
+            models.Index(
+                fields=["next_attempt_at", "id"], condition=models.Q(status="pending"), name="outbox_pending_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.notification_type} -> {self.recipient_id} ({self.status})"
+
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ("client", "Client"),
@@ -271,6 +555,9 @@ class User(AbstractUser):
     address = models.TextField(blank=True, default="")
     profile_picture = models.ImageField(upload_to="profile_pictures/", null=True, blank=True)
 
+    # Nombre de notifications non lues (dénormalisé, voir notifications.py)
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "Utilisateur"
         verbose_name_plural = "Utilisateurs"
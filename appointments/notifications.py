@@ -0,0 +1,188 @@
+# appointments/notifications.py
+"""
+Compteur dénormalisé des notifications non lues (User.unread_notifications)
+et actions groupées (lire / archiver / supprimer).
+
+Le compteur couvre les notifications non lues de la boîte de réception
+(non archivées). Il est modifié par des UPDATE atomiques (F()) en même temps
+que les notifications :
+- création unitaire (Notification.objects.create, admin) : signal post_save ;
+- création par lots (worker outbox, bulk_create) : `add_unread`, un seul
+  UPDATE pour tout le lot ;
+- `mark_read`, `archive`, `delete` : un UPDATE / DELETE sur la sélection
+  (`select` : ids ou tout, avant une date), puis un décrément égal au nombre
+  de non lues réellement modifiées, dans la même transaction. Le nombre de
+  requêtes ne dépend pas du nombre de notifications.
+
+/notifications/unread-count/ lit la colonne (déjà chargée avec
+l'utilisateur). `python manage.py reconcile_unread` recalcule tous les
+compteurs en une requête groupée (suppressions en cascade, modifications
+directes en base...).
+
+Rétention (`python manage.py purge_notifications`) : les notifications lues
+ou archivées plus anciennes que NOTIFICATION_RETENTION_DAYS sont déplacées
+dans l'historique NotificationHistory (ou supprimées), par lots de
+NOTIFICATION_RETENTION_CHUNK_SIZE, chacun dans sa propre transaction courte.
+Elles ne comptent pas dans le compteur de non lues : il n'est pas modifié.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import purging
+from .models import Notification, NotificationHistory, User
+
+RETENTION_MODES = ("history", "delete")
+# Hors boîte de réception active : condition de l'index notif_retention_idx
+EXPIRABLE = Q(is_read=True) | Q(archived_at__isnull=False)
+
+
+def add_unread(recipient_ids):
+    """+1 par occurrence de recipient_id (un UPDATE pour tous les destinataires)."""
+    counts = Counter(recipient_ids)
+    if not counts:
+        return
+    increment = Case(
+        *(When(pk=user_id, then=Value(n)) for user_id, n in counts.items()),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    User.objects.filter(pk__in=counts).update(unread_notifications=F("unread_notifications") + increment)
+
+
+def remove_unread(user_id, count):
+    if count:
+        User.objects.filter(pk=user_id).update(
+            unread_notifications=Greatest(F("unread_notifications") - count, 0)
+        )
+
+
+def select(user, ids=None, before=None):
+    """Notifications de `user` : `ids` (None = toutes), créées avant `before` si fourni."""
+    queryset = Notification.objects.filter(recipient=user)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if before is not None:
+        queryset = queryset.filter(created_at__lt=before)
+    return queryset
+
+
+def mark_read(user, queryset):
+    """Marque lues les notifications non archivées de `queryset` ; retourne le nombre modifié."""
+    with transaction.atomic():
+        updated = queryset.filter(is_read=False, archived_at__isnull=True).update(is_read=True)
+        remove_unread(user.pk, updated)
+    return updated
+
+
+def archive(user, queryset, now=None):
+    """Archive les notifications de `queryset` (non lues d'abord, pour le compteur) ; retourne le nombre archivé."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        inbox = queryset.filter(archived_at__isnull=True)
+        unread = inbox.filter(is_read=False).update(archived_at=now)
+        read = inbox.update(archived_at=now)
+        remove_unread(user.pk, unread)
+    return unread + read
+
+
+def delete(user, queryset):
+    """Supprime les notifications de `queryset` (un seul DELETE) ; retourne le nombre supprimé."""
+    with transaction.atomic():
+        unread = queryset.filter(is_read=False, archived_at__isnull=True).update(is_read=True)
+        deleted, _ = queryset.delete()
+        remove_unread(user.pk, unread)
+    return deleted
+
+
+def unread_counts(user_ids):
+    """{user_id: compteur}, une requête."""
+    counts = dict.fromkeys(user_ids, 0)
+    counts.update(User.objects.filter(pk__in=user_ids).values_list("id", "unread_notifications"))
+    return counts
+
+
+def expected_counts(user_ids=None):
+    """Compteurs recalculés depuis Notification : queryset (id, unread_notifications, expected)."""
+    users = User.objects.all() if user_ids is None else User.objects.filter(pk__in=user_ids)
+    return users.annotate(
+        expected=Count(
+            "notifications", filter=Q(notifications__is_read=False, notifications__archived_at__isnull=True)
+        )
+    ).values_list("id", "unread_notifications", "expected")
+
+
+def reconcile(user_ids=None, batch_size=500, dry_run=False):
+    """Réécrit les compteurs qui ont dérivé ; retourne (vérifiés, corrigés)."""
+    drifted, checked = [], 0
+    for user_id, current, expected in expected_counts(user_ids).iterator():
+        checked += 1
+        if current != expected:
+            drifted.append(User(pk=user_id, unread_notifications=expected))
+    if drifted and not dry_run:
+        with transaction.atomic():
+            User.objects.bulk_update(drifted, ["unread_notifications"], batch_size=max(1, batch_size))
+    return checked, len(drifted)
+
+
+# -----------------------------
+# Rétention
+# -----------------------------
+def retention_cutoff(days=None, now=None):
+    days = getattr(settings, "NOTIFICATION_RETENTION_DAYS", 90) if days is None else days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def expired(cutoff):
+    """Notifications lues ou archivées créées avant `cutoff` (index notif_retention_idx)."""
+    return Notification.objects.filter(EXPIRABLE, created_at__lt=cutoff)
+
+
+def purge_chunk(cutoff, mode="history", chunk_size=1000):
+    """
+    Un lot, dans une transaction courte : copie dans NotificationHistory
+    (mode "history") puis un DELETE ; retourne le nombre de notifications traitées.
+    """
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Mode de rétention inconnu : {mode}")
+    fields = ["id", "recipient_id", "appointment_id", "notification_type", "title", "message", "created_at"]
+    with transaction.atomic():
+        rows = list(
+            expired(cutoff)
+            .order_by("created_at", "id")
+            .select_for_update(skip_locked=True)
+            .values_list(*fields)[:chunk_size]
+        )
+        if not rows:
+            return 0
+        if mode == "history":
+            # ignore_conflicts : un lot déjà copié puis interrompu peut être rejoué
+            NotificationHistory.objects.bulk_create(
+                (NotificationHistory(**dict(zip(fields, row))) for row in rows), ignore_conflicts=True
+            )
+        # Condition répétée : une notification repassée non lue entre-temps reste en place
+        deleted, _ = expired(cutoff).filter(pk__in=[row[0] for row in rows]).delete()
+    return deleted
+
+
+def purge(cutoff=None, mode=None, chunk_size=None, **options):
+    """
+    Traite les lots jusqu'à épuisement (options de purging.run : max_chunks,
+    pause, progress). Retourne {"chunks", "processed", "elapsed", "rate"}
+    (rate : notifications/s).
+    """
+    cutoff = retention_cutoff() if cutoff is None else cutoff
+    mode = mode or getattr(settings, "NOTIFICATION_RETENTION_MODE", "history")
+    chunk_size = max(1, chunk_size or getattr(settings, "NOTIFICATION_RETENTION_CHUNK_SIZE", 1000))
+
+    def chunk():
+        processed = purge_chunk(cutoff, mode, chunk_size)
+        return (processed,) if processed else None
+
+    return purging.run(chunk, ["processed"], **options)
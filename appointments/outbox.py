@@ -0,0 +1,284 @@
+# appointments/outbox.py
+"""
+File de notifications (outbox) et livraison par lots.
+
+Les vues n'écrivent plus la notification pendant la requête : `enqueue`
+enregistre un événement léger (NotificationOutbox) dans la transaction de
+l'écriture métier (transaction.atomic() de la vue) : le rendez-vous et son
+événement sont validés ou annulés ensemble, rien ne se perd entre les deux.
+
+Un worker séparé (`python manage.py process_outbox`) vide la file :
+1. réserve un lot d'événements dus (bail de NOTIFICATION_OUTBOX_LEASE_SECONDS,
+   SELECT ... FOR UPDATE SKIP LOCKED là où la base le permet) ;
+2. crée les notifications in-app du lot en un seul bulk_create ;
+3. livre les canaux externes de chaque événement (email, sms... voir
+   NOTIFICATION_CHANNELS) ;
+4. supprime les événements livrés, replanifie les autres avec un délai
+   exponentiel (NOTIFICATION_OUTBOX_BACKOFF_SECONDS, doublé à chaque échec)
+   et marque "failed" ceux qui dépassent NOTIFICATION_OUTBOX_MAX_ATTEMPTS.
+
+Un canal est une classe `DeliveryChannel` (nom enregistré ou chemin pointé).
+En développement, l'email passe par EMAIL_BACKEND (console ou fichier) et le
+SMS par NOTIFICATION_SMS_BACKEND ("console" ou "file").
+
+Sans worker, les événements restent en file et aucune notification
+n'apparaît. NOTIFICATION_OUTBOX_INLINE=True (développement, petit
+déploiement) livre chaque événement juste après le commit, dans la requête ;
+un échec le laisse en file pour le worker.
+"""
+
+import json
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import notifications, realtime
+from .models import Notification, NotificationOutbox
+
+DEFAULT_BATCH_SIZE = 200
+
+
+# -----------------------------
+# Canaux de livraison
+# -----------------------------
+class DeliveryChannel:
+    """Livre un événement (NotificationOutbox, recipient chargé) ; lève une exception en cas d'échec."""
+
+    name = None
+
+    def send(self, event):
+        raise NotImplementedError
+
+
+class EmailChannel(DeliveryChannel):
+    name = "email"
+
+    def send(self, event):
+        if not event.recipient.email:
+            return
+        send_mail(event.title, event.message, None, [event.recipient.email], fail_silently=False)
+
+
+class ConsoleSMSBackend:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, phone, text):
+        self.stream.write(f"[SMS {phone}] {text}\n")
+        self.stream.flush()
+
+
+class FileSMSBackend:
+    """Une ligne JSON par SMS dans NOTIFICATION_SMS_FILE_PATH."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, "NOTIFICATION_SMS_FILE_PATH", "sms.log")
+
+    def send(self, phone, text):
+        line = json.dumps({"to": phone, "text": text, "sent_at": timezone.now().isoformat()}, ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+SMS_BACKENDS = {"console": ConsoleSMSBackend, "file": FileSMSBackend}
+
+
+class SMSChannel(DeliveryChannel):
+    name = "sms"
+
+    def __init__(self, backend=None):
+        backend = backend or getattr(settings, "NOTIFICATION_SMS_BACKEND", "console")
+        if isinstance(backend, str):
+            backend = SMS_BACKENDS.get(backend) or import_string(backend)
+        self.backend = backend() if isinstance(backend, type) else backend
+
+    def send(self, event):
+        phone = getattr(event.recipient, "phone", "")
+        if not phone:
+            return
+        self.backend.send(phone, f"{event.title} : {event.message}")
+
+
+CHANNELS = {channel.name: channel for channel in (EmailChannel, SMSChannel)}
+
+
+def get_channel(channel):
+    """Nom enregistré, chemin pointé vers une classe, classe ou instance."""
+    if isinstance(channel, str):
+        channel = CHANNELS.get(channel) or import_string(channel)
+    if isinstance(channel, type):
+        channel = channel()
+    return channel
+
+
+def configured_channels():
+    return list(getattr(settings, "NOTIFICATION_CHANNELS", []))
+
+
+# -----------------------------
+# Mise en file
+# -----------------------------
+def enqueue(recipient, notification_type, title, message, appointment=None, channels=None):
+    """
+    Ajoute l'événement à la file dans la transaction courante : à appeler
+    dans le même transaction.atomic() que l'écriture métier.
+    """
+    event = NotificationOutbox.objects.create(
+        recipient=recipient,
+        appointment=appointment,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        channels=configured_channels() if channels is None else list(channels),
+    )
+    if getattr(settings, "NOTIFICATION_OUTBOX_INLINE", False):
+        # robust : une erreur de livraison n'échoue pas la requête, l'événement reste en file
+        transaction.on_commit(lambda: drain_events([event.pk]), robust=True)
+    return event
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def backoff(attempts):
+    """Délai avant la tentative suivante : base * 2^(tentatives - 1), plafonné."""
+    base = getattr(settings, "NOTIFICATION_OUTBOX_BACKOFF_SECONDS", 30)
+    ceiling = getattr(settings, "NOTIFICATION_OUTBOX_BACKOFF_MAX_SECONDS", 3600)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), ceiling))
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE, now=None, ids=None):
+    """
+    Réserve (bail) un lot d'événements dus (parmi `ids` si fourni) ; retourne
+    les événements réservés par cet appel, recipient chargé.
+    """
+    now = now or timezone.now()
+    leased_until = now + timedelta(seconds=getattr(settings, "NOTIFICATION_OUTBOX_LEASE_SECONDS", 300))
+    due = NotificationOutbox.objects.filter(status="pending", next_attempt_at__lte=now)
+    if ids is not None:
+        due = due.filter(pk__in=ids)
+    with transaction.atomic():
+        candidates = list(
+            due.order_by("next_attempt_at", "id")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not candidates:
+            return []
+        # Condition répétée : sans verrou de ligne (SQLite), un autre worker a pu
+        # réserver les mêmes événements entre le SELECT et l'UPDATE
+        if not due.filter(pk__in=candidates).update(next_attempt_at=leased_until):
+            return []
+    # Seulement les lignes dont ce bail est le nôtre
+    return list(
+        NotificationOutbox.objects.filter(pk__in=candidates, status="pending", next_attempt_at=leased_until)
+        .select_related("recipient")
+        .order_by("id")
+    )
+
+
+def create_notifications(events):
+    """
+    Notifications in-app des événements qui n'en ont pas encore : un INSERT,
+    un UPDATE de la file et un UPDATE des compteurs de non lues.
+    """
+    pending = [event for event in events if event.notification_id is None]
+    if not pending:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(
+            Notification(
+                recipient_id=event.recipient_id,
+                appointment_id=event.appointment_id,
+                notification_type=event.notification_type,
+                title=event.title,
+                message=event.message,
+            )
+            for event in pending
+        )
+        for event, notification in zip(pending, created):
+            event.notification = notification
+        NotificationOutbox.objects.bulk_update(pending, ["notification"])
+        notifications.add_unread(event.recipient_id for event in pending)
+    # Abonnés SSE de ce processus ; les autres les relisent en base (realtime.py)
+    realtime.notifications_created(created)
+    return created
+
+
+def deliver(events, channels=None):
+    """Livre les canaux externes ; retourne {event.pk: message d'erreur} des échecs."""
+    channels = {} if channels is None else channels
+    errors = {}
+    for event in events:
+        remaining = []
+        for name in event.channels:
+            try:
+                channel = channels.get(name) or get_channel(name)
+                channels[name] = channel
+                channel.send(event)
+            except Exception as exc:
+                remaining.append(name)
+                errors[event.pk] = f"{name}: {exc}"
+        event.channels = remaining
+    return errors
+
+
+def process_batch(events, now=None, channels=None):
+    now = now or timezone.now()
+    max_attempts = getattr(settings, "NOTIFICATION_OUTBOX_MAX_ATTEMPTS", 5)
+    stats = {"claimed": len(events), "notifications": 0, "delivered": 0, "retried": 0, "failed": 0}
+    if not events:
+        return stats
+
+    stats["notifications"] = len(create_notifications(events))
+    errors = deliver(events, channels)
+
+    done, retry = [], []
+    for event in events:
+        if event.pk not in errors:
+            done.append(event.pk)
+            continue
+        event.attempts += 1
+        event.last_error = errors[event.pk][:2000]
+        if event.attempts >= max_attempts:
+            event.status = "failed"
+            stats["failed"] += 1
+        else:
+            event.next_attempt_at = now + backoff(event.attempts)
+            stats["retried"] += 1
+        retry.append(event)
+
+    with transaction.atomic():
+        if done:
+            NotificationOutbox.objects.filter(pk__in=done).delete()
+        if retry:
+            NotificationOutbox.objects.bulk_update(
+                retry, ["channels", "attempts", "last_error", "status", "next_attempt_at"]
+            )
+    stats["delivered"] = len(done)
+    return stats
+
+
+def drain_events(ids, now=None):
+    """Traite tout de suite les événements `ids` encore dus (NOTIFICATION_OUTBOX_INLINE)."""
+    return process_batch(claim_batch(len(ids), now, ids=ids), now)
+
+
+def drain(batch_size=DEFAULT_BATCH_SIZE, max_batches=None, now=None, channels=None):
+    """Traite les lots dus jusqu'à épuisement (ou max_batches) ; retourne les totaux."""
+    totals = {"claimed": 0, "notifications": 0, "delivered": 0, "retried": 0, "failed": 0}
+    channels = {} if channels is None else channels
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        events = claim_batch(batch_size, now)
+        if not events:
+            break
+        for key, value in process_batch(events, now, channels).items():
+            totals[key] += value
+        batches += 1
+    return totals
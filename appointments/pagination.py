@@ -0,0 +1,205 @@
+# appointments/pagination.py
+"""
+Pagination par curseur (keyset) pour les listes de l'API.
+
+Contrairement à une pagination LIMIT/OFFSET, la page N coûte autant que la
+page 1 : le curseur contient les valeurs de tri de la dernière ligne servie et
+la page suivante est obtenue par un simple filtre (WHERE date < ... OR ...).
+Les curseurs sont signés (opaques et non falsifiables) et restent valides
+même si des lignes sont ajoutées entre deux pages.
+
+Format de réponse : {"next": url|null, "previous": url|null, "results": [...]}
+"""
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination keyset générique.
+
+    `ordering` doit désigner des champs non NULL et se terminer par une clé
+    unique (ex: "id") pour que l'ordre soit total. Quand la vue choisit
+    l'ordre, elle renseigne aussi `cursor_scope` (nom du tri) : il est signé
+    avec le curseur, qui est refusé (400) pour un autre tri.
+    """
+
+    ordering = ("id",)
+    cursor_scope = None
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Curseur invalide."
+    mismatched_cursor_message = "Curseur émis pour un autre tri."
+    signing_salt = "appointments.pagination"
+
+    @property
+    def page_size(self):
+        return api_settings.PAGE_SIZE or 50
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, "API_MAX_PAGE_SIZE", 100)
+
+    # -----------------------------
+    # API DRF
+    # -----------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.reversed_ordering() if reverse else tuple(self.ordering)
+
+        queryset = queryset.order_by(*ordering)
+
+        # Avec .only() (champs clairsemés), garder les colonnes du curseur
+        loaded, deferred = queryset.query.deferred_loading
+        if loaded and not deferred:
+            queryset = queryset.only(*loaded, *(name.lstrip("-") for name in self.ordering))
+
+        if position is not None:
+            queryset = queryset.filter(self.build_position_filter(position, ordering))
+
+        rows = list(queryset[: size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+
+        if reverse:
+            rows.reverse()
+            has_previous, has_next = has_more, position is not None
+        else:
+            has_previous, has_next = position is not None, has_more
+
+        self.next_position = self.get_position(rows[-1]) if rows and has_next else None
+        self.previous_position = self.get_position(rows[0]) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.build_link(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.build_link(self.previous_position, reverse=True)
+
+    # -----------------------------
+    # Helpers
+    # -----------------------------
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return min(self.page_size, self.max_page_size)
+        try:
+            size = int(raw)
+        except (TypeError, ValueError):
+            return min(self.page_size, self.max_page_size)
+        return max(1, min(size, self.max_page_size))
+
+    def reversed_ordering(self):
+        return tuple(f[1:] if f.startswith("-") else f"-{f}" for f in self.ordering)
+
+    def get_position(self, obj):
+        # obj: instance de modèle ou dict issu de .values()
+        values = []
+        for name in self.ordering:
+            name = name.lstrip("-")
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        return values
+
+    def build_position_filter(self, position, ordering):
+        """
+        (a, b) après (va, vb) <=> a > va OR (a = va AND b > vb),
+        en tenant compte du sens (ASC/DESC) de chaque champ.
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field_name = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{field_name}__{lookup}": value})
+            equal &= Q(**{field_name: value})
+        return condition
+
+    def build_link(self, position, reverse):
+        payload = {"p": position, "r": int(reverse)}
+        if self.cursor_scope is not None:
+            payload["s"] = self.cursor_scope
+        token = signing.dumps(payload, salt=self.signing_salt, compress=True)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = signing.loads(token, salt=self.signing_salt)
+        except signing.BadSignature:
+            raise NotFound(self.invalid_cursor_message)
+        # Avant le décodage : les clés d'un autre tri n'ont pas le même format
+        if not isinstance(payload, dict) or payload.get("s") != self.cursor_scope:
+            raise ValidationError({self.cursor_query_param: [self.mismatched_cursor_message]})
+
+        try:
+            raw_position = payload["p"]
+            reverse = bool(payload.get("r"))
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.model._meta.get_field(name.lstrip("-")).to_python(value)
+                for name, value in zip(self.ordering, raw_position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+
+class AppointmentPagination(KeysetPagination):
+    ordering = ("-date", "id")
+
+
+class EmployerPagination(KeysetPagination):
+    """L'ordre (et cursor_scope) est choisi par la vue selon ?sort= (employer_search.SORTS)."""
+
+    ordering = ("id",)
+
+
+class NotificationPagination(KeysetPagination):
+    ordering = ("-created_at", "id")
+
+
+class ReviewPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,139 @@
+# appointments/prefetching.py
+"""
+Planification des requêtes à partir de l'arbre des serializers.
+
+Un serializer imbriqué (ex: AppointmentSerializer -> EmployerSerializer ->
+ServiceSerializer + availabilities) déclenche une requête par ligne et par
+relation si le queryset n'est pas préparé (N+1). `plan_queryset` parcourt les
+champs du serializer et en déduit :
+- select_related pour les FK / OneToOne "avant" (une seule jointure SQL) ;
+- prefetch_related pour les relations multiples (une requête par relation,
+  quel que soit le nombre de lignes), avec un queryset lui-même planifié.
+
+Une liste coûte ainsi un nombre constant de requêtes. Si le serializer a été
+restreint (?fields=, voir DynamicFieldsMixin), seules les colonnes rendues
+sont chargées (.only()).
+"""
+
+import re
+
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _serializer_instance(serializer):
+    if isinstance(serializer, type):
+        return serializer()
+    return serializer
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except Exception:
+        return None
+
+
+def collect_relations(serializer, model, prefix=""):
+    """
+    Retourne (select_related, prefetch_related) pour `serializer` appliqué à `model`.
+    Les chemins sont préfixés par `prefix` (ex: "employer__").
+    """
+    select = []
+    prefetch = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+
+        model_field = _model_field(model, field.source)
+        if model_field is None or not model_field.is_relation:
+            continue
+
+        path = f"{prefix}{field.source}"
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            child_model = model_field.related_model
+            # Relation inverse : la FK vers le parent sert à rattacher les lignes préchargées
+            required = [model_field.remote_field.attname] if model_field.one_to_many else []
+            child_qs = plan_queryset(child_model._default_manager.all(), child, required)
+            prefetch.append(Prefetch(path, queryset=child_qs))
+
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(path)
+
+        elif isinstance(field, serializers.BaseSerializer):
+            if model_field.many_to_many or model_field.one_to_many:
+                continue
+            select.append(path)
+            child_select, child_prefetch = collect_relations(
+                field, model_field.related_model, prefix=f"{path}__"
+            )
+            select.extend(child_select)
+            prefetch.extend(child_prefetch)
+
+    return select, prefetch
+
+
+DISPLAY_SOURCE_RE = re.compile(r"^get_(\w+)_display$")
+
+
+def collect_columns(serializer, model, prefix=""):
+    """
+    Colonnes nécessaires pour rendre `serializer` (chemins utilisables par .only()).
+    Retourne None si une source ne correspond pas à un champ connu (propriété,
+    méthode...) : on ne peut alors pas restreindre les colonnes sans risque.
+    """
+    columns = [f"{prefix}{model._meta.pk.name}"]
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*" or "." in field.source:
+            return None
+
+        source = field.source
+        display = DISPLAY_SOURCE_RE.match(source)
+        if display:
+            source = display.group(1)
+
+        model_field = _model_field(model, source)
+        if model_field is None:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            continue  # relations multiples: chargées par prefetch
+
+        path = f"{prefix}{source}"
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(field, serializers.ListSerializer):
+            nested = collect_columns(field, model_field.related_model, prefix=f"{path}__")
+            if nested is None:
+                return None
+            columns.extend(nested)
+        else:
+            columns.append(path)
+
+    return columns
+
+
+def plan_queryset(queryset, serializer, required=()):
+    """
+    Applique select_related / prefetch_related nécessaires à `serializer`
+    (classe ou instance) sur `queryset`. `required` : colonnes toujours
+    chargées en plus de celles du serializer.
+    """
+    serializer = _serializer_instance(serializer)
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    select, prefetch = collect_relations(serializer, queryset.model)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    if getattr(serializer, "sparse_fieldset", False):
+        columns = collect_columns(serializer, queryset.model)
+        if columns is not None:
+            queryset = queryset.only(*columns, *required)
+    return queryset
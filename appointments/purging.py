@@ -0,0 +1,81 @@
+# appointments/purging.py
+"""
+Purges par lots courts (une transaction par lot), pour tourner sous trafic :
+boucle et options de commande communes à purge_notifications, purge_tokens
+et purge_idempotency_keys. Chaque module ne fournit que son lot
+(notifications.purge_chunk, revocation.purge_chunk, idempotency.purge_chunk).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def run(chunk, counters, max_chunks=None, pause=0, progress=None):
+    """
+    Appelle `chunk()` jusqu'à épuisement (None) ou max_chunks, avec `pause`
+    secondes entre deux lots ; `chunk()` retourne un compte par nom de
+    `counters`. `progress(stats)` est appelé après chaque lot. Retourne
+    {"chunks", <counters>..., "elapsed", "rate"} (rate : counters[0] par seconde).
+    """
+    stats = {"chunks": 0, **dict.fromkeys(counters, 0), "elapsed": 0.0, "rate": 0.0}
+    started = time.perf_counter()
+
+    def measure():
+        stats["elapsed"] = time.perf_counter() - started
+        stats["rate"] = stats[counters[0]] / stats["elapsed"] if stats["elapsed"] else 0.0
+
+    while max_chunks is None or stats["chunks"] < max_chunks:
+        counts = chunk()
+        if counts is None:
+            break
+        stats["chunks"] += 1
+        for name, count in zip(counters, counts):
+            stats[name] += count
+        measure()
+        if progress:
+            progress(stats)
+        if pause:
+            time.sleep(pause)
+    measure()
+    return stats
+
+
+class PurgeCommand(BaseCommand):
+    """
+    Options communes (--chunk-size --max-chunks --sleep --dry-run
+    --report-every) ; la sous-classe renseigne `chunk_size_setting` et
+    `unit`, puis passe `self.purge_options(options, ...)` à sa purge.
+    """
+
+    chunk_size_setting = None
+    unit = "Lignes"
+    dry_run_help = "Compte les lignes concernées"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=getattr(settings, self.chunk_size_setting, 1000),
+            help=f"{self.unit} par lot (une transaction par lot)",
+        )
+        parser.add_argument("--max-chunks", type=int, default=None, help="Nombre maximal de lots")
+        parser.add_argument("--sleep", type=float, default=0.0, help="Pause (s) entre deux lots")
+        parser.add_argument("--dry-run", action="store_true", help=self.dry_run_help)
+        parser.add_argument("--report-every", type=int, default=10, help="Progression affichée tous les N lots")
+
+    def purge_options(self, options, report):
+        """Arguments de `run` ; `report(stats)` : ligne de progression, affichée tous les --report-every lots."""
+        every = max(1, options["report_every"])
+
+        def progress(stats):
+            if stats["chunks"] % every == 0:
+                self.stdout.write(f"  {report(stats)}")
+
+        return {
+            "chunk_size": options["chunk_size"],
+            "max_chunks": options["max_chunks"],
+            "pause": options["sleep"],
+            "progress": progress,
+        }
@@ -0,0 +1,292 @@
+# appointments/realtime.py
+"""
+Notifications en temps réel (Server-Sent Events).
+
+GET /notifications/stream/ (vue async, servie par nazek/asgi.py) garde une
+connexion ouverte par onglet et pousse :
+- `event: notification` (id = Notification.id) à chaque nouvelle notification ;
+- `event: unread` ({"count": n}) à la connexion et à chaque changement ;
+- un commentaire `: ping` toutes les REALTIME_HEARTBEAT_SECONDS secondes.
+
+Une connexion inactive ne coûte qu'une tâche asyncio et une file vide : pas
+de thread, pas de requête SQL. À la reconnexion, le navigateur renvoie
+Last-Event-ID et les notifications manquées sont relues en base.
+
+Pub/sub : le Broker du processus distribue les événements aux abonnés
+locaux. Le backend (REALTIME_BACKEND) transporte les événements entre
+processus :
+- "local"    : processus courant uniquement ;
+- "database" : (défaut) en plus, une tâche unique par processus relit toutes
+  les REALTIME_POLL_SECONDS les nouvelles notifications (id > dernier vu) et
+  les compteurs de non lues des abonnés locaux : cela couvre le worker
+  process_outbox et les autres workers (lu, archivé, supprimé ailleurs) ;
+- chemin.vers.Backend : par exemple un pub/sub Redis (publish + écoute).
+"""
+
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+from django.utils.module_loading import import_string
+
+from .models import Notification
+from .notifications import unread_counts
+
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+def notification_event(notification):
+    from .serializers import NotificationSerializer
+
+    return {"event": "notification", "id": notification.pk, "data": NotificationSerializer(notification).data}
+
+
+def unread_event(count):
+    return {"event": "unread", "data": {"count": count}}
+
+
+def format_event(event):
+    """Trame SSE."""
+    lines = []
+    if event.get("id") is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append("data: " + json.dumps(event["data"], ensure_ascii=False, default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+# -----------------------------
+# Pub/sub du processus
+# -----------------------------
+class Subscription:
+    def __init__(self, user_id, last_id=0):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+        # Dernier id de notification envoyé : évite les doublons (publication locale + relecture)
+        self.last_id = last_id
+        # Dernier compteur de non lues envoyé : un compteur inchangé n'est pas renvoyé
+        self.last_count = None
+
+    def push(self, event):
+        # Exécuté dans la boucle de l'abonné
+        if event.get("id") is not None and event["id"] <= self.last_id:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : on ferme, il se reconnecte avec Last-Event-ID
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def events(self, heartbeat):
+        """Événements SSE ; None = délai de heartbeat écoulé."""
+        while True:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event is None:
+                return
+            if event.get("id") is not None:
+                if event["id"] <= self.last_id:
+                    continue
+                self.last_id = event["id"]
+            if event["event"] == "unread":
+                if event["data"]["count"] == self.last_count:
+                    continue
+                self.last_count = event["data"]["count"]
+            yield event
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id, last_id=0):
+        subscription = Subscription(user_id, last_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def subscribed_users(self, user_ids=None):
+        with self._lock:
+            if user_ids is None:
+                return set(self._subscribers)
+            return {user_id for user_id in user_ids if user_id in self._subscribers}
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def deliver(self, user_id, events):
+        """Distribue aux abonnés locaux ; appelable depuis n'importe quel thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            for event in events:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+
+# -----------------------------
+# Backends (transport entre processus)
+# -----------------------------
+class LocalBackend:
+    name = "local"
+
+    def publish(self, broker, user_id, events):
+        broker.deliver(user_id, events)
+
+    def start(self, broker):
+        """Appelé (dans la boucle) à chaque nouvel abonnement."""
+
+
+class DatabasePollingBackend(LocalBackend):
+    """
+    Une tâche par processus relit Notification (id > dernier vu) et les
+    compteurs de non lues des abonnés, et distribue aux abonnés locaux ;
+    s'arrête quand il n'y a plus d'abonnés.
+    """
+
+    name = "database"
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, "REALTIME_POLL_SECONDS", 1.0)
+        self._task = None
+        # Dernier compteur de non lues envoyé par abonné
+        self._counts = {}
+
+    def start(self, broker):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self.poll(broker))
+
+    @staticmethod
+    def max_id():
+        return Notification.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+
+    def fetch(self, broker, after_id, limit=500):
+        """
+        (événements par utilisateur abonné, dernier id lu) : nouvelles
+        notifications, puis compteur de non lues s'il a changé (deux requêtes).
+        """
+        from .serializers import NotificationSerializer
+
+        by_user = {}
+        last_id = after_id
+        notifications = list(Notification.objects.filter(id__gt=after_id).order_by("id")[:limit])
+        if notifications:
+            last_id = notifications[-1].pk
+            users = broker.subscribed_users({n.recipient_id for n in notifications})
+            notifications = [n for n in notifications if n.recipient_id in users]
+            for notification, data in zip(notifications, NotificationSerializer(notifications, many=True).data):
+                by_user.setdefault(notification.recipient_id, []).append(
+                    {"event": "notification", "id": notification.pk, "data": data}
+                )
+
+        subscribed = broker.subscribed_users()
+        self._counts = {user_id: count for user_id, count in self._counts.items() if user_id in subscribed}
+        for user_id, count in unread_counts(list(subscribed)).items():
+            if user_id in by_user or self._counts.get(user_id) != count:
+                by_user.setdefault(user_id, []).append(unread_event(count))
+                self._counts[user_id] = count
+        return by_user, last_id
+
+    async def poll(self, broker):
+        last_id = await sync_to_async(self.max_id)()
+        while broker.subscribed_users():
+            await asyncio.sleep(self.interval)
+            by_user, last_id = await sync_to_async(self.fetch)(broker, last_id)
+            for user_id, events in by_user.items():
+                broker.deliver(user_id, events)
+
+
+BACKENDS = {backend.name: backend for backend in (LocalBackend, DatabasePollingBackend)}
+
+broker = Broker()
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend = getattr(settings, "REALTIME_BACKEND", DatabasePollingBackend.name)
+        if isinstance(backend, str):
+            backend = BACKENDS.get(backend) or import_string(backend)
+        _backend = backend() if isinstance(backend, type) else backend
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    _backend = None
+
+
+# -----------------------------
+# Publication (code synchrone : worker, vues)
+# -----------------------------
+def notifications_created(notifications):
+    """Publie les nouvelles notifications (et les compteurs) des destinataires connectés ici."""
+    users = broker.subscribed_users({n.recipient_id for n in notifications})
+    if not users:
+        return
+    backend = get_backend()
+    counts = unread_counts(list(users))
+    for notification in notifications:
+        if notification.recipient_id in users:
+            backend.publish(broker, notification.recipient_id, [notification_event(notification)])
+    for user_id, count in counts.items():
+        backend.publish(broker, user_id, [unread_event(count)])
+
+
+def unread_changed(user_id):
+    if broker.subscribed_users([user_id]):
+        get_backend().publish(broker, user_id, [unread_event(unread_counts([user_id])[user_id])])
+
+
+# -----------------------------
+# Flux d'un utilisateur
+# -----------------------------
+def missed_notifications(user_id, after_id, limit):
+    return [
+        notification_event(n)
+        for n in Notification.objects.filter(recipient_id=user_id, id__gt=after_id).order_by("id")[:limit]
+    ]
+
+
+async def event_stream(user_id, last_event_id=None):
+    """Générateur async des trames SSE de `user_id` (abonnement retiré à la déconnexion)."""
+    heartbeat = getattr(settings, "REALTIME_HEARTBEAT_SECONDS", 15)
+    replay_limit = getattr(settings, "REALTIME_REPLAY_LIMIT", 100)
+
+    # Abonnement avant la relecture : rien ne se perd entre les deux
+    subscription = broker.subscribe(user_id, last_id=last_event_id or 0)
+    get_backend().start(broker)
+    try:
+        yield f"retry: {int(getattr(settings, 'REALTIME_RETRY_MS', 5000))}\n\n"
+        if last_event_id is not None:
+            for event in await sync_to_async(missed_notifications)(user_id, last_event_id, replay_limit):
+                subscription.last_id = max(subscription.last_id, event["id"])
+                yield format_event(event)
+        count = (await sync_to_async(unread_counts)([user_id]))[user_id]
+        subscription.last_count = count
+        yield format_event(unread_event(count))
+
+        async for event in subscription.events(heartbeat):
+            yield ": ping\n\n" if event is None else format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
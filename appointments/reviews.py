@@ -0,0 +1,54 @@
+# appointments/reviews.py
+"""
+Pipeline unique des avis (AppointmentReview et AddReview).
+
+Un avis reste stocké sur le rendez-vous (rating / feedback). `submit_review`
+écrit ces colonnes et, dans la même transaction, met à jour les agrégats du
+prestataire (moyenne, nombre d'avis, histogramme 1..5 étoiles) par un seul
+UPDATE atomique (Employer.update_rating). Un avis modifié remplace l'ancien
+dans l'histogramme au lieu d'être compté deux fois.
+
+`employer_reviews` est le fil public : rendez-vous notés d'un prestataire,
+du plus récent au plus ancien, servi par l'index partiel
+appt_employer_reviews_idx (employer, -created_at, -id) WHERE rating IS NOT NULL.
+"""
+
+from django.db import transaction
+
+from .models import Appointment
+
+DEFAULT_FEEDBACK = "Avis sans commentaire"
+
+
+def submit_review(appointment, rating, feedback=None, complete=False):
+    """
+    Enregistre l'avis `rating` (1..5) sur `appointment`.
+    `complete=True` passe aussi le rendez-vous au statut "terminé".
+    """
+    update_fields = ["rating", "feedback"]
+    with transaction.atomic():
+        # Avis précédent relu sous verrou : deux soumissions concurrentes ne
+        # comptent pas chacune un nouvel avis
+        previous_rating, previous_feedback = (
+            Appointment.objects.select_for_update().filter(pk=appointment.pk).values_list("rating", "feedback").get()
+        )
+        appointment.rating = rating
+        appointment.feedback = feedback if feedback is not None else previous_feedback
+        if not appointment.feedback:
+            appointment.feedback = DEFAULT_FEEDBACK
+        if complete:
+            appointment.status = "terminé"
+            update_fields.append("status")
+
+        appointment.save(update_fields=update_fields)
+        if rating != previous_rating:
+            appointment.employer.update_rating(rating, previous_rating)
+    return appointment
+
+
+def employer_reviews(employer_id):
+    return (
+        Appointment.objects.filter(employer_id=employer_id, rating__isnull=False)
+        .select_related("client", "service")
+        .only("id", "rating", "feedback", "created_at", "client__name", "service__name")
+    )
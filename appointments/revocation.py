@@ -0,0 +1,62 @@
+# appointments/revocation.py
+"""
+Liste noire des refresh tokens (rest_framework_simplejwt.token_blacklist) :
+chaque connexion insère un OutstandingToken, chaque déconnexion un
+BlacklistedToken ; les deux tables grossissent sans limite.
+
+`python manage.py purge_tokens` supprime par lots courts les jetons
+expirés (OutstandingToken et leur entrée BlacklistedToken).
+
+La vérification de liste noire reste la requête indexée de simplejwt : le
+seul appelant (LogoutView) met ensuite le jeton en liste noire, il n'y a pas
+d'endpoint de rafraîchissement dont un pré-filtre en mémoire éviterait la
+requête.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from . import purging
+
+
+# -----------------------------
+# Purge des jetons expirés
+# -----------------------------
+def purge_chunk(now, after_id=0, chunk_size=1000):
+    """
+    Un lot de jetons expirés (id > after_id), dans une transaction courte :
+    un DELETE de liste noire puis un DELETE des jetons. Retourne
+    (jetons supprimés, entrées de liste noire supprimées, dernier id) ;
+    dernier id None quand il ne reste plus rien.
+    """
+    with transaction.atomic():
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=after_id, expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0, 0, None
+        blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        deleted, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+    return deleted, blacklisted, ids[-1]
+
+
+def purge_expired(now=None, chunk_size=None, **options):
+    """
+    Parcours par id croissant (les jetons expirent dans leur ordre de
+    création) ; options de purging.run (max_chunks, pause, progress).
+    Retourne {"chunks", "outstanding", "blacklisted", "elapsed", "rate"}.
+    """
+    now = now or timezone.now()
+    chunk_size = max(1, chunk_size or getattr(settings, "TOKEN_PURGE_CHUNK_SIZE", 1000))
+    last_id = 0
+
+    def chunk():
+        nonlocal last_id
+        deleted, blacklisted, last_id = purge_chunk(now, last_id, chunk_size)
+        return None if last_id is None else (deleted, blacklisted)
+
+    return purging.run(chunk, ["outstanding", "blacklisted"], **options)
@@ -0,0 +1,211 @@
+# appointments/search.py
+"""
+Recherche plein texte des services (/services/search/).
+
+Sur SQLite, une table virtuelle FTS5 `appointments_service_fts` (rowid =
+Service.id) indexe name, description, category et `place` (ville + adresse +
+localisation). Le tokenizer `unicode61 remove_diacritics 2` rend la
+recherche insensible à la casse et aux accents ("menage" trouve "Ménage"),
+chaque terme est cherché en préfixe ("plomb" trouve "Plomberie") et les
+résultats sont classés par bm25 (le nom pèse plus que la description).
+
+La table est créée par la migration 0009 et tenue à jour par les signaux
+post_save / post_delete de Service (voir signals.py). Les écritures de masse
+(bulk_create, update) ne déclenchent pas de signaux :
+`python manage.py rebuild_search_index` reconstruit l'index.
+
+Sans FTS5 (autre base, SQLite compilé sans FTS5), repli sur des icontains
+combinés (un terme = OR sur les champs, termes en AND), classés par champ.
+"""
+
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Service
+
+FTS_TABLE = "appointments_service_fts"
+FTS_COLUMNS = ("name", "description", "category", "place")
+# Poids bm25 par colonne (même ordre que FTS_COLUMNS)
+FTS_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+MAX_TERMS = 8
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_available = None
+
+
+def fold(text):
+    """Minuscules sans accents : "Électricité" -> "electricite"."""
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def terms(text, folded=True):
+    # Les lettres isolées (élisions l', d', j'...) sont ignorées
+    text = fold(text) if folded else str(text or "").lower()
+    return [term for term in TERM_RE.findall(text) if len(term) > 1][:MAX_TERMS]
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def reset_fts_cache(**kwargs):
+    # Branché sur post_migrate : la table peut apparaître après le premier appel
+    global _fts_available
+    _fts_available = None
+
+
+# -----------------------------
+# Index FTS5
+# -----------------------------
+def create_fts_table(cursor):
+    columns = ", ".join(FTS_COLUMNS)
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def _document(service):
+    place = " ".join(part for part in (service.city, service.address, service.location) if part)
+    return [service.name or "", service.description or "", service.category or "", place]
+
+
+def index_service(service):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [service.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            [service.pk, *_document(service)],
+        )
+
+
+def unindex_service(service_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [service_id])
+
+
+def rebuild_index(batch_size=2000):
+    """Reconstruit tout l'index ; retourne le nombre de services indexés."""
+    if not fts_available():
+        return 0
+    fields = ("id", "name", "description", "category", "city", "address", "location")
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        batch = []
+        for service in Service.objects.only(*fields).order_by().iterator(chunk_size=batch_size):
+            batch.append([service.pk, *_document(service)])
+            if len(batch) >= batch_size:
+                count += _insert_batch(cursor, batch)
+                batch = []
+        count += _insert_batch(cursor, batch)
+    return count
+
+
+def _insert_batch(cursor, rows):
+    if rows:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+    return len(rows)
+
+
+# -----------------------------
+# Recherche
+# -----------------------------
+def match_expression(query_terms, place_terms=()):
+    """Expression MATCH FTS5 : termes en préfixe, combinés en AND."""
+    parts = [f'"{term}"*' for term in query_terms]
+    parts += [f'place : "{term}"*' for term in place_terms]
+    return " AND ".join(parts)
+
+
+def _filters_sql(category=None, min_price=None, max_price=None):
+    where, params = ["s.is_active = %s"], [True]
+    if category:
+        where.append("LOWER(s.category) = LOWER(%s)")
+        params.append(category)
+    if min_price is not None:
+        where.append("s.price >= %s")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("s.price <= %s")
+        params.append(max_price)
+    return where, params
+
+
+def _fts_ids(match, limit, offset, **filters):
+    where, params = _filters_sql(**filters)
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    sql = (
+        f"SELECT f.rowid FROM {FTS_TABLE} f "
+        f"JOIN {Service._meta.db_table} s ON s.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND {' AND '.join(where)} "
+        f"ORDER BY bm25({FTS_TABLE}, {weights}), f.rowid LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _any_icontains(fields, term):
+    # Terme tel que saisi et sans accents : "ménage" trouve aussi "menage"
+    condition = Q()
+    for variant in {term, fold(term)}:
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": variant})
+    return condition
+
+
+def _fallback_queryset(query_terms, place_terms, category=None, min_price=None, max_price=None):
+    qs = Service.objects.filter(is_active=True)
+    for term in query_terms:
+        qs = qs.filter(_any_icontains(("name", "description", "category", "city"), term))
+    for term in place_terms:
+        qs = qs.filter(_any_icontains(("city", "address", "location"), term))
+    if category:
+        qs = qs.filter(category__iexact=category)
+    if min_price is not None:
+        qs = qs.filter(price__gte=min_price)
+    if max_price is not None:
+        qs = qs.filter(price__lte=max_price)
+
+    first = query_terms[0] if query_terms else None
+    if first:
+        rank = Case(
+            When(name__icontains=first, then=Value(0)),
+            When(category__icontains=first, then=Value(1)),
+            When(city__icontains=first, then=Value(2)),
+            default=Value(3),
+            output_field=IntegerField(),
+        )
+        qs = qs.annotate(search_rank=rank).order_by("search_rank", "name", "id")
+    else:
+        qs = qs.order_by("name", "id")
+    return qs
+
+
+def search_service_ids(query, location="", limit=20, offset=0, **filters):
+    """
+    Identifiants des services actifs correspondant à `query` (et `location`),
+    du plus pertinent au moins pertinent.
+    """
+    query_terms, place_terms = terms(query), terms(location)
+    if fts_available() and (query_terms or place_terms):
+        return _fts_ids(match_expression(query_terms, place_terms), limit, offset, **filters)
+
+    qs = _fallback_queryset(terms(query, folded=False), terms(location, folded=False), **filters)
+    return list(qs.values_list("id", flat=True)[offset : offset + limit])
@@ -1,16 +1,109 @@
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
+from . import booking, reviews
 from .models import Appointment, Availability, Client, Employer, Notification, Service, User
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+def parse_field_tree(value):
+    """
+    "id,employer.name,employer.service" -> {"id": {}, "employer": {"name": {}, "service": {}}}
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+
+    tree = {}
+    for path in value:
+        node = tree
+        for part in str(path).strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class DynamicFieldsMixin:
+    """
+    Sélection de champs et expansion des relations à la demande.
+
+    - ?fields=id,date,employer.name : seuls ces champs sont rendus ;
+    - ?expand=employer,employer.service : seules ces relations sont imbriquées,
+      les autres sont réduites à leur clé primaire.
+
+    Sans ?expand=, les relations déclarées restent imbriquées (comportement
+    historique). Les mêmes options peuvent être passées au constructeur
+    (fields=..., expand=...). `plan_queryset` s'appuie sur les champs restants
+    pour éviter les jointures inutiles et limiter les colonnes (.only()).
+    """
+
+    sparse_fieldset = False
+
+    def __init__(self, *args, **kwargs):
+        self._field_tree = parse_field_tree(kwargs.pop("fields", None))
+        self._expand_tree = parse_field_tree(kwargs.pop("expand", None))
+        super().__init__(*args, **kwargs)
+
+    def _is_top_level(self):
+        parent = getattr(self, "parent", None)
+        if isinstance(parent, serializers.ListSerializer):
+            parent = getattr(parent, "parent", None)
+        return parent is None
+
+    def _requested_trees(self):
+        if self._field_tree is not None or self._expand_tree is not None or not self._is_top_level():
+            return self._field_tree, self._expand_tree
+
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+
+        params = request.query_params
+        return parse_field_tree(params.get("fields") or None), parse_field_tree(params.get("expand"))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        field_tree, expand_tree = self._requested_trees()
+        self.sparse_fieldset = field_tree is not None
+
+        if field_tree is not None:
+            fields = {name: field for name, field in fields.items() if name in field_tree}
+
+        for name, field in list(fields.items()):
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+
+            # "employer.name" dans ?fields= implique l'expansion de employer
+            sub_fields = (field_tree or {}).get(name) or None
+            if expand_tree is not None and name not in expand_tree and sub_fields is None:
+                fields[name] = self._collapsed_field(name, field)
+                continue
+
+            if isinstance(nested, DynamicFieldsMixin):
+                nested._field_tree = sub_fields
+                nested._expand_tree = None if expand_tree is None else expand_tree.get(name, {})
+
+        return fields
+
+    def _collapsed_field(self, name, field):
+        kwargs = {"read_only": True}
+        if field.source and field.source != name:
+            kwargs["source"] = field.source
+        if isinstance(field, serializers.ListSerializer):
+            kwargs["many"] = True
+        return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class ServiceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Service
-        fields = "__all__"
+        exclude = ["geohash"]
 
 
-class AvailabilitySerializer(serializers.ModelSerializer):
+class AvailabilitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Availability
         fields = "__all__"
@@ -25,7 +118,86 @@ class AvailabilitySerializer(serializers.ModelSerializer):
         return attrs
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class AvailabilityScheduleListSerializer(serializers.ListSerializer):
+    """
+    Remplacement atomique du planning hebdomadaire d'un employeur.
+    Validation en mémoire (chevauchements inclus) puis diff avec l'existant :
+    bulk_create / bulk_update / delete, nombre de requêtes constant.
+    """
+
+    def validate(self, attrs):
+        by_day = {}
+        for row in attrs:
+            key = (row["day_of_week"], row.get("is_available", True))
+            by_day.setdefault(key, []).append((row["start_time"], row["end_time"]))
+
+        for (day, _), intervals in by_day.items():
+            intervals.sort()
+            for (start, end), (next_start, next_end) in zip(intervals, intervals[1:]):
+                if next_start < end:
+                    label = dict(Availability._meta.get_field("day_of_week").choices)[day]
+                    raise serializers.ValidationError(
+                        f"Créneaux qui se chevauchent le {label.lower()} "
+                        f"({start:%H:%M}-{end:%H:%M} et {next_start:%H:%M}-{next_end:%H:%M})."
+                    )
+        return attrs
+
+    def update(self, instance, validated_data):
+        # instance: disponibilités actuelles ; context["employer"]: propriétaire
+        employer = self.context["employer"]
+        wanted = {
+            (row["day_of_week"], row["start_time"], row["end_time"]): row.get("is_available", True)
+            for row in validated_data
+        }
+
+        with transaction.atomic():
+            booking.lock_employer(employer.pk)
+            existing = {(a.day_of_week, a.start_time, a.end_time): a for a in instance}
+
+            to_delete = [a.pk for key, a in existing.items() if key not in wanted]
+            to_update = []
+            for key, is_available in wanted.items():
+                current = existing.get(key)
+                if current is not None and current.is_available != is_available:
+                    current.is_available = is_available
+                    to_update.append(current)
+            to_create = [
+                Availability(employer=employer, day_of_week=day, start_time=start, end_time=end, is_available=is_available)
+                for (day, start, end), is_available in wanted.items()
+                if (day, start, end) not in existing
+            ]
+
+            if to_delete:
+                Availability.objects.filter(pk__in=to_delete).delete()
+            if to_update:
+                Availability.objects.bulk_update(to_update, ["is_available"])
+            if to_create:
+                Availability.objects.bulk_create(to_create)
+
+        kept = [a for key, a in existing.items() if key in wanted]
+        self.changes = {"created": len(to_create), "updated": len(to_update), "deleted": len(to_delete)}
+        return sorted(kept + to_create, key=lambda a: (a.day_of_week, a.start_time))
+
+
+class AvailabilityScheduleSerializer(serializers.ModelSerializer):
+    """Ligne du planning hebdomadaire (PUT /employers/<id>/availabilities/)."""
+
+    class Meta:
+        model = Availability
+        fields = ["day_of_week", "start_time", "end_time", "is_available"]
+        # unicité et chevauchements vérifiés en mémoire par la liste
+        validators = []
+        list_serializer_class = AvailabilityScheduleListSerializer
+
+    def validate(self, attrs):
+        if attrs["start_time"] >= attrs["end_time"]:
+            raise serializers.ValidationError(
+                {"end_time": "L'heure de fin doit être après l'heure de début."}
+            )
+        return attrs
+
+
+class ClientSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
@@ -33,7 +205,7 @@ class ClientSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class EmployerSerializer(serializers.ModelSerializer):
+class EmployerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     service = ServiceSerializer(read_only=True)
     availabilities = AvailabilitySerializer(many=True, read_only=True)
@@ -42,7 +214,7 @@ class EmployerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Employer
-        fields = "__all__"
+        exclude = ["booking_version", "geohash"] + [f"rating_{i}_count" for i in Employer.RATING_VALUES]
 
 
 class EmployerUpdateSerializer(serializers.ModelSerializer):
@@ -56,16 +228,18 @@ class EmployerUpdateSerializer(serializers.ModelSerializer):
             "description",
             "hourly_rate",
             "profile_picture",
+            "latitude",
+            "longitude",
         ]
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = "__all__"
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
+class AppointmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     client = ClientSerializer(read_only=True)
     employer = EmployerSerializer(read_only=True)
     service = ServiceSerializer(read_only=True)
@@ -108,13 +282,25 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
             if service is None or employer.service_id != service.id:
                 attrs["service"] = employer.service
 
-        if employer and hasattr(employer, "is_available") and not employer.is_available(dt):
+        duration = booking.resolve_duration(attrs.get("estimated_duration"), attrs.get("service"))
+        if employer and hasattr(employer, "is_available") and not employer.is_available(dt, duration):
             raise serializers.ValidationError(
                 {"date": "L'employeur n'est pas disponible à cette date."}
             )
 
         return attrs
 
+    def create(self, validated_data):
+        # Revérification sous verrou : deux demandes simultanées ne peuvent
+        # pas obtenir le même créneau (lève booking.BookingConflict).
+        duration = booking.resolve_duration(validated_data.get("estimated_duration"), validated_data.get("service"))
+        return booking.reserve(
+            validated_data["employer"].pk,
+            validated_data["date"],
+            duration,
+            create=lambda: super(AppointmentCreateSerializer, self).create(validated_data),
+        )
+
 
 class AppointmentReviewSerializer(serializers.ModelSerializer):
     class Meta:
@@ -122,23 +308,33 @@ class AppointmentReviewSerializer(serializers.ModelSerializer):
         fields = ["id", "feedback", "rating"]
 
     def validate_rating(self, value):
-        if value < 1 or value > 5:
+        if value is not None and (value < 1 or value > 5):
             raise serializers.ValidationError("La note doit être entre 1 et 5.")
         return value
 
     def update(self, instance, validated_data):
-        instance.feedback = validated_data.get("feedback", instance.feedback)
-        instance.rating = validated_data.get("rating", instance.rating)
-        instance.status = "terminé"
-        instance.save()
+        rating = validated_data.get("rating", instance.rating)
+        feedback = validated_data.get("feedback", instance.feedback)
+        if rating is None:
+            instance.feedback = feedback
+            instance.status = "terminé"
+            instance.save()
+            return instance
+        return reviews.submit_review(instance, rating, feedback, complete=True)
+
 
-        if instance.rating and hasattr(instance.employer, "update_rating"):
-            instance.employer.update_rating(instance.rating)
+class EmployerReviewSerializer(serializers.ModelSerializer):
+    """Avis public d'un prestataire (fil /employers/<id>/reviews/)."""
 
-        return instance
+    client_name = serializers.CharField(source="client.name", read_only=True)
+    service_name = serializers.CharField(source="service.name", read_only=True, default=None)
+
+    class Meta:
+        model = Appointment
+        fields = ["id", "rating", "feedback", "created_at", "client_name", "service_name"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = [
@@ -0,0 +1,79 @@
+# appointments/signals.py
+"""
+Récepteurs de signaux de l'app (branchés dans AppointmentsConfig.ready).
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import authentication, autocomplete, notifications, search
+from .models import Client, Employer, Notification, Service, User
+
+
+@receiver(post_save, sender=Service)
+def service_saved(sender, instance, raw=False, **kwargs):
+    # raw: chargement de fixtures (loaddata) -> rebuild_search_index ensuite
+    if not raw:
+        search.index_service(instance)
+    # Index d'autocomplétion en mémoire : seulement si la transaction aboutit
+    transaction.on_commit(lambda: autocomplete.service_changed(instance))
+
+
+@receiver(post_delete, sender=Service)
+def service_deleted(sender, instance, **kwargs):
+    search.unindex_service(instance.pk)
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.service_removed(pk))
+
+
+@receiver(post_save, sender=Employer)
+def employer_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.employer_changed(instance))
+
+
+@receiver(post_delete, sender=Employer)
+def employer_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.employer_removed(pk))
+
+
+# Champs de User recopiés dans les claims du jeton (authentication.py)
+CLAIM_FIELDS = {"role", "is_active", "is_staff", "is_superuser"}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if not created and not raw and (update_fields is None or CLAIM_FIELDS & set(update_fields)):
+        authentication.claims_changed(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    authentication.claims_changed(instance.pk)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Employer)
+def profile_saved(sender, instance, created=False, raw=False, **kwargs):
+    # client_id / employer_id ne changent qu'à la création du profil
+    if created and not raw:
+        authentication.claims_changed(instance.user_id)
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Employer)
+def profile_deleted(sender, instance, **kwargs):
+    authentication.claims_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created=False, raw=False, **kwargs):
+    # Créations unitaires ; les lots (bulk_create du worker) passent par add_unread
+    if created and not raw and not instance.is_read:
+        notifications.add_unread([instance.recipient_id])
+
+
+post_migrate.connect(search.reset_fts_cache, dispatch_uid="appointments.search.reset_fts_cache")
+post_migrate.connect(autocomplete.reset_index, dispatch_uid="appointments.autocomplete.reset_index")
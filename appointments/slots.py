@@ -0,0 +1,157 @@
+# appointments/slots.py
+"""
+Calcul des créneaux libres d'un prestataire.
+
+1. Les règles hebdomadaires `Availability` (day_of_week, start_time, end_time)
+   sont déployées sur chaque jour de la période, dans le fuseau du projet
+   (Europe/Paris, changements d'heure compris). Les règles is_available=False
+   sont retranchées des fenêtres ouvertes. Un prestataire sans aucune règle
+   travaille tous les jours sur BOOKING_DEFAULT_WORKING_HOURS (même règle que
+   l'affectation automatique, assignment.py).
+2. Les rendez-vous actifs (voir booking.booked_intervals) sont retranchés par
+   arithmétique d'intervalles (fusion + balayage), sans requête par créneau.
+3. Les débuts de créneaux sont émis tous les `granularity` minutes à partir
+   du début de chaque fenêtre, si [début, début + durée[ tient dans le libre.
+
+Deux requêtes au total (disponibilités + rendez-vous), quelle que soit la
+longueur de la période.
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import booking
+from .models import Availability
+
+UTC = dt_timezone.utc
+
+
+def default_working_hours():
+    """(début, fin) locaux des prestataires sans disponibilités renseignées."""
+    start, end = getattr(settings, "BOOKING_DEFAULT_WORKING_HOURS", ("09:00", "18:00"))
+    return time.fromisoformat(start), time.fromisoformat(end)
+
+
+def default_rules():
+    start, end = default_working_hours()
+    return [(day, start, end, True) for day in range(7)]
+
+
+def merge_intervals(intervals):
+    """Trie et fusionne des intervalles [début, fin[ qui se touchent ou se chevauchent."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(intervals, busy):
+    """intervals - busy (deux listes triées et fusionnées)."""
+    result = []
+    j = 0
+    for start, end in intervals:
+        cursor = start
+        while j < len(busy) and busy[j][1] <= cursor:
+            j += 1
+        k = j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > cursor:
+                result.append((cursor, busy[k][0]))
+            cursor = max(cursor, busy[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def _local_window(day, start_time, end_time, tz):
+    # heures locales -> UTC (l'arithmétique se fait en UTC, sûre aux changements d'heure)
+    end_day = day if end_time > start_time else day + timedelta(days=1)
+    start = timezone.make_aware(datetime.combine(day, start_time), tz)
+    end = timezone.make_aware(datetime.combine(end_day, end_time), tz)
+    return start.astimezone(UTC), end.astimezone(UTC)
+
+
+def weekly_windows(rules, first_day, last_day, tz):
+    """
+    Déploie les règles hebdomadaires sur [first_day, last_day] :
+    retourne (fenêtres ouvertes, fenêtres bloquées) en UTC.
+    """
+    by_weekday = {}
+    for day_of_week, start_time, end_time, is_available in rules:
+        by_weekday.setdefault(day_of_week, []).append((start_time, end_time, is_available))
+
+    open_windows, blocked = [], []
+    day = first_day
+    while day <= last_day:
+        for start_time, end_time, is_available in by_weekday.get(day.weekday(), ()):
+            window = _local_window(day, start_time, end_time, tz)
+            (open_windows if is_available else blocked).append(window)
+        day += timedelta(days=1)
+    return open_windows, blocked
+
+
+def free_intervals(employer_id, first_day, last_day, tz=None):
+    """
+    (fenêtres ouvertes fusionnées, intervalles libres) en UTC pour
+    l'employeur sur [first_day, last_day].
+    """
+    tz = tz or timezone.get_default_timezone()
+    rules = list(
+        Availability.objects.filter(employer_id=employer_id).values_list(
+            "day_of_week", "start_time", "end_time", "is_available"
+        )
+    )
+    if not rules:
+        rules = default_rules()
+    open_windows, blocked = weekly_windows(rules, first_day, last_day, tz)
+    if not open_windows:
+        return [], []
+
+    windows = merge_intervals(open_windows)
+    range_start, range_end = windows[0][0], windows[-1][1]
+    busy = booking.booked_intervals(employer_id, range_start, range_end)
+    busy = merge_intervals(blocked + busy)
+    return windows, subtract_intervals(windows, busy)
+
+
+def free_slots(employer_id, first_day, last_day, granularity=30, duration=None, now=None, tz=None):
+    """
+    Créneaux libres, groupés par jour local :
+    [{"date": "2026-10-19", "slots": ["09:00", "09:30", ...]}, ...]
+    """
+    tz = tz or timezone.get_default_timezone()
+    duration = timedelta(minutes=duration or booking.default_duration())
+    step = timedelta(minutes=granularity)
+    now = now or timezone.now()
+
+    windows, free = free_intervals(employer_id, first_day, last_day, tz)
+
+    days = {}
+    w = 0
+    for start, end in free:
+        if end - duration < now:
+            continue
+        # origine de la grille = début de la fenêtre de disponibilité
+        while windows[w][1] <= start:
+            w += 1
+        origin = windows[w][0]
+        offset = (start - origin) % step
+        cursor = start if not offset else start + (step - offset)
+        if cursor < now:
+            cursor += -((cursor - now) // step) * step
+        while cursor + duration <= end:
+            if cursor >= now:
+                local = cursor.astimezone(tz)
+                days.setdefault(local.date(), []).append(local.strftime("%H:%M"))
+            cursor += step
+
+    return [{"date": day.isoformat(), "slots": slots} for day, slots in sorted(days.items())]
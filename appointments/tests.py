@@ -1,14 +1,22 @@
+import time
 from datetime import timedelta
 
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 
-from .models import User, Client, Employer, Service, Appointment, Notification
+from .models import User, Client, Employer, Service, Appointment, Notification, Availability
 
 
 class CriticalEndpointsTests(APITestCase):
     def setUp(self):
+        from . import throttling
+
+        # Seaux du processus vidés : un login par test depuis la même IP
+        throttling.reset_store()
+
         # Service
         self.service = Service.objects.create(
             name="Plomberie",
@@ -152,4 +160,2107 @@ class CriticalEndpointsTests(APITestCase):
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         self.assertEqual(res.data["employer"]["id"], self.employer_profile.id)
-        self.assertEqual(res.data["service"]["id"], self.service.id)
\ No newline at end of file
+        self.assertEqual(res.data["service"]["id"], self.service.id)
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="Service test")
+        self.client_user = User.objects.create_user(username="client_page", email="client_page@test.com", role="client")
+        self.client_profile = Client.objects.create(user=self.client_user, name="Client Page", email="client_page@test.com")
+        employer_user = User.objects.create_user(username="employer_page", email="employer_page@test.com", role="employer")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Employer Page", email="employer_page@test.com", service=self.service
+        )
+
+        base = timezone.now() + timedelta(days=1)
+        # 2 rendez-vous partagent la même date : le tri (-date, id) doit les départager
+        dates = [base, base, base + timedelta(hours=1), base + timedelta(hours=2), base + timedelta(hours=3)]
+        self.appointments = [
+            Appointment.objects.create(client=self.client_profile, employer=self.employer, service=self.service, date=d)
+            for d in dates
+        ]
+        self.client.force_authenticate(user=self.client_user)
+
+    def collect(self, url):
+        ids = []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in res.data["results"])
+            url = res.data["next"]
+        return ids
+
+    def test_appointments_are_paginated_by_date_desc_then_id(self):
+        ids = self.collect("/api/v1/appointments/?page_size=2")
+        expected = [a.id for a in sorted(self.appointments, key=lambda a: (-a.date.timestamp(), a.id))]
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get("/api/v1/appointments/?page_size=2")
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(
+            [item["id"] for item in back.data["results"]],
+            [item["id"] for item in first.data["results"]],
+        )
+
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=3):
+            res = self.client.get("/api/v1/appointments/?page_size=1000")
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertIsNotNone(res.data["next"])
+
+    def test_tampered_cursor_is_rejected(self):
+        res = self.client.get("/api/v1/appointments/?cursor=not-a-cursor")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_notifications_are_paginated(self):
+        created = [
+            Notification.objects.create(recipient=self.client_user, notification_type="test", title=f"N{i}", message="m").id
+            for i in range(3)
+        ]
+        ids = self.collect("/api/v1/notifications/?page_size=2")
+        self.assertCountEqual(ids, created)
+
+
+class PlannedQuerysetTests(APITestCase):
+    def setUp(self):
+        self.client_user = User.objects.create_user(username="client_plan", email="client_plan@test.com", role="client")
+        self.client_profile = Client.objects.create(user=self.client_user, name="Client Plan", email="client_plan@test.com")
+
+    def add_appointments(self, count):
+        for i in range(count):
+            service = Service.objects.create(name=f"Service {i}", description="d")
+            user = User.objects.create_user(username=f"emp_plan_{i}_{service.id}", email=f"emp{service.id}@test.com")
+            employer = Employer.objects.create(user=user, name=f"Emp {i}", email=f"emp{service.id}@test.com", service=service)
+            Availability.objects.create(employer=employer, day_of_week=0, start_time="09:00", end_time="12:00")
+            Availability.objects.create(employer=employer, day_of_week=1, start_time="09:00", end_time="12:00")
+            Appointment.objects.create(
+                client=self.client_profile,
+                employer=employer,
+                service=service,
+                date=timezone.now() + timedelta(days=i + 1),
+            )
+
+    def count_list_queries(self):
+        # Utilisateur frais : pas de cache user.client d'une requête à l'autre
+        self.client.force_authenticate(user=User.objects.get(pk=self.client_user.pk))
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/appointments/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), len(res.data["results"])
+
+    def test_appointment_list_query_count_is_constant(self):
+        self.add_appointments(1)
+        small_queries, small_rows = self.count_list_queries()
+        self.add_appointments(12)
+        large_queries, large_rows = self.count_list_queries()
+
+        self.assertEqual((small_rows, large_rows), (1, 13))
+        self.assertEqual(small_queries, large_queries)
+
+    def test_employer_list_query_count_is_constant(self):
+        self.add_appointments(1)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/api/v1/employers/")
+        self.add_appointments(8)
+        with CaptureQueriesContext(connection) as large:
+            res = self.client.get("/api/v1/employers/")
+
+        self.assertEqual(len(res.data["results"]), 9)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="Service test")
+        self.client_user = User.objects.create_user(username="client_sparse", email="client_sparse@test.com", role="client")
+        self.client_profile = Client.objects.create(user=self.client_user, name="Client Sparse", email="client_sparse@test.com")
+        employer_user = User.objects.create_user(username="employer_sparse", email="employer_sparse@test.com", role="employer")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Employer Sparse", email="employer_sparse@test.com", service=self.service
+        )
+        Availability.objects.create(employer=self.employer, day_of_week=0, start_time="09:00", end_time="12:00")
+        self.appointment = Appointment.objects.create(
+            client=self.client_profile,
+            employer=self.employer,
+            service=self.service,
+            date=timezone.now() + timedelta(days=1),
+        )
+        self.client.force_authenticate(user=self.client_user)
+
+    def get_first(self, query):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(f"/api/v1/appointments/?{query}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data["results"][0], ctx.captured_queries
+
+    def test_fields_limits_payload_and_columns(self):
+        item, queries = self.get_first("fields=id,date,status")
+
+        self.assertEqual(set(item), {"id", "date", "status"})
+        select = [q["sql"] for q in queries if '"appointments_appointment"."date"' in q["sql"]][-1]
+        self.assertNotIn("JOIN", select)
+        self.assertNotIn('"description"', select)
+        self.assertFalse(any("appointments_availability" in q["sql"] for q in queries))
+
+    def test_expand_collapses_other_relations_to_pk(self):
+        item, queries = self.get_first("expand=service")
+
+        self.assertEqual(item["service"]["id"], self.service.id)
+        self.assertEqual(item["employer"], self.employer.id)
+        self.assertEqual(item["client"], self.client_profile.id)
+        self.assertFalse(any("appointments_availability" in q["sql"] for q in queries))
+
+    def test_nested_fields_expand_relation(self):
+        item, _ = self.get_first("fields=id,employer.name,employer.availabilities&expand=")
+
+        self.assertEqual(set(item), {"id", "employer"})
+        self.assertEqual(set(item["employer"]), {"name", "availabilities"})
+        self.assertEqual(len(item["employer"]["availabilities"]), 1)
+
+    def test_default_keeps_full_nesting(self):
+        item, _ = self.get_first("")
+        self.assertEqual(item["employer"]["service"]["id"], self.service.id)
+        self.assertEqual(len(item["employer"]["availabilities"]), 1)
+
+    def test_sparse_nested_reverse_relation_keeps_parent_key(self):
+        from .prefetching import plan_queryset
+        from .serializers import EmployerSerializer
+
+        for i in range(2):
+            user = User.objects.create_user(username=f"employer_sparse_{i}", email=f"employer_sparse_{i}@test.com")
+            employer = Employer.objects.create(user=user, name=f"E{i}", email=f"employer_sparse_{i}@test.com", service=self.service)
+            for day in range(3):
+                Availability.objects.create(employer=employer, day_of_week=day, start_time="09:00", end_time="12:00")
+
+        fields = "id,availabilities.day_of_week"
+        with CaptureQueriesContext(connection) as ctx:
+            queryset = plan_queryset(Employer.objects.order_by("id"), EmployerSerializer(many=True, fields=fields))
+            data = EmployerSerializer(queryset, many=True, fields=fields).data
+        self.assertEqual([len(row["availabilities"]) for row in data], [1, 3, 3])
+        # Employeurs + disponibilités : la FK vers l'employeur est chargée avec le prefetch
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+
+class CompiledReaderParityTests(APITestCase):
+    def setUp(self):
+        service = Service.objects.create(name="Plomberie", description="d", price="45.50", duration=90, city="Paris")
+        client_user = User.objects.create_user(username="client_fast", email="client_fast@test.com", role="client")
+        self.client_profile = Client.objects.create(
+            user=client_user, name="Client Fast", email="client_fast@test.com", profile_picture="client_pics/a.jpg"
+        )
+        self.employers = []
+        for i, svc in enumerate([service, None]):
+            user = User.objects.create_user(username=f"employer_fast_{i}", email=f"employer_fast_{i}@test.com")
+            employer = Employer.objects.create(
+                user=user,
+                name=f"Employer {i}",
+                email=f"employer_fast_{i}@test.com",
+                service=svc,
+                hourly_rate="30.00" if svc else None,
+                profile_picture="employer_pics/e.png" if svc else None,
+                average_rating=4.5,
+                total_reviews=2,
+            )
+            Availability.objects.create(employer=employer, day_of_week=i, start_time="09:00", end_time="12:30")
+            Availability.objects.create(employer=employer, day_of_week=4, start_time="14:00", end_time="18:00")
+            self.employers.append(employer)
+
+        for i, employer in enumerate(self.employers * 2):
+            Appointment.objects.create(
+                client=self.client_profile,
+                employer=employer,
+                service=employer.service,
+                date=timezone.now() + timedelta(days=i + 1),
+                status=["en_attente", "accepté", "terminé", "annulé"][i],
+                payment_method=["carte", "especes"][i % 2],
+                total_amount="120.00",
+                rating=5 if i == 2 else None,
+                estimated_duration=60 if i else None,
+            )
+
+    def as_json(self, data):
+        from rest_framework.renderers import JSONRenderer
+        import json
+
+        return json.loads(JSONRenderer().render(data))
+
+    def assert_parity(self, serializer_class, queryset, query=""):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .fast_serializers import compile_reader
+        from .prefetching import plan_queryset
+
+        request = Request(APIRequestFactory().get(f"/x/?{query}"))
+        serializer = serializer_class(context={"request": request})
+        expected = serializer_class(
+            plan_queryset(queryset, serializer), many=True, context={"request": request}
+        ).data
+
+        reader = compile_reader(serializer_class(context={"request": request}))
+        self.assertIsNotNone(reader)
+        actual = reader.render(reader.values(queryset), request)
+
+        self.assertEqual(self.as_json(actual), self.as_json(expected))
+
+    def test_appointment_parity(self):
+        from .serializers import AppointmentSerializer
+
+        self.assert_parity(AppointmentSerializer, Appointment.objects.order_by("-date", "id"))
+
+    def test_employer_parity(self):
+        from .serializers import EmployerSerializer
+
+        self.assert_parity(EmployerSerializer, Employer.objects.order_by("id"))
+
+    def test_sparse_parity(self):
+        from .serializers import AppointmentSerializer
+
+        self.assert_parity(
+            AppointmentSerializer,
+            Appointment.objects.order_by("-date", "id"),
+            "fields=id,status_display,employer.name,employer.availabilities,client&expand=employer",
+        )
+
+    def test_reader_cache_is_bounded(self):
+        from unittest import mock
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from . import fast_serializers
+        from .serializers import AppointmentSerializer
+
+        def reader(query):
+            request = Request(APIRequestFactory().get(f"/x/?{query}"))
+            return fast_serializers.compile_reader(AppointmentSerializer(context={"request": request}))
+
+        with mock.patch.object(fast_serializers, "READER_CACHE_SIZE", 2), mock.patch.object(
+            fast_serializers, "_READER_CACHE", fast_serializers.OrderedDict()
+        ) as cache:
+            first = reader("fields=id")
+            for query in ("fields=id,date", "fields=id", "fields=id,status", "fields=status"):
+                reader(query)
+            self.assertEqual(len(cache), 2)
+            # "fields=id" évincée par deux formes plus récentes : recompilée
+            self.assertIsNot(reader("fields=id"), first)
+
+    def test_list_endpoint_uses_compiled_reader(self):
+        self.client.force_authenticate(user=User.objects.get(pk=self.client_profile.user_id))
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/v1/appointments/?page_size=3")
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertEqual(res.data["results"][0]["payment_method_display"], "Espèces")
+        # Aucune requête par ligne : profil client + liste + disponibilités
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+
+class QueryPlanTests(APITestCase):
+    """
+    EXPLAIN QUERY PLAN des requêtes chaudes : échoue si l'une d'elles
+    repasse en parcours complet de table (SQLite uniquement).
+    """
+
+    def setUp(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Plans vérifiés pour SQLite uniquement")
+
+        from .pagination import AppointmentPagination, NotificationPagination
+
+        self.appointment_ordering = AppointmentPagination.ordering
+        self.notification_ordering = NotificationPagination.ordering
+        self.service = Service.objects.create(name="Plomberie", description="d")
+        user = User.objects.create_user(username="plan_client", email="plan_client@test.com")
+        self.client_profile = Client.objects.create(user=user, name="Plan", email="plan_client@test.com")
+        employer_user = User.objects.create_user(username="plan_employer", email="plan_employer@test.com")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Plan", email="plan_employer@test.com", service=self.service
+        )
+
+    def assert_uses_index(self, queryset, index_name):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            detail = line.split(" ", 3)[-1]
+            self.assertFalse(
+                detail.startswith("SCAN ") and " USING " not in detail,
+                f"Parcours complet de table:\n{plan}",
+            )
+        self.assertIn(index_name, plan)
+
+    def test_client_appointments(self):
+        qs = Appointment.objects.filter(client=self.client_profile).order_by(*self.appointment_ordering)
+        self.assert_uses_index(qs[:51], "appt_client_date_idx")
+        self.assert_uses_index(qs.filter(date__lt=timezone.now())[:51], "appt_client_date_idx")
+
+    def test_employer_appointments(self):
+        qs = Appointment.objects.filter(employer=self.employer).order_by(*self.appointment_ordering)
+        self.assert_uses_index(qs[:51], "appt_employer_date_idx")
+
+    def test_employer_slot_lookup(self):
+        qs = self.employer.employer_appointments.filter(date=timezone.now())
+        self.assert_uses_index(qs, "appt_employer_date_idx")
+
+    def test_booking_overlap_range(self):
+        from .booking import overlap_candidates
+
+        start = timezone.now()
+        qs = overlap_candidates(self.employer.id, start, start + timedelta(hours=1))
+        self.assert_uses_index(qs.values_list("date", "estimated_duration", "service__duration"), "appt_employer_date_idx")
+
+    def test_employer_reviews(self):
+        from .pagination import ReviewPagination
+        from .reviews import employer_reviews
+
+        qs = employer_reviews(self.employer.id).order_by(*ReviewPagination.ordering)
+        self.assert_uses_index(qs[:51], "appt_employer_reviews_idx")
+        self.assert_uses_index(qs.filter(created_at__lt=timezone.now())[:51], "appt_employer_reviews_idx")
+
+    def test_notifications(self):
+        qs = Notification.objects.filter(recipient=self.client_profile.user).order_by(*self.notification_ordering)
+        self.assert_uses_index(qs[:51], "notif_recipient_created_idx")
+
+    def test_notification_inbox(self):
+        qs = Notification.objects.filter(recipient=self.client_profile.user, archived_at__isnull=True)
+        self.assert_uses_index(qs.order_by(*self.notification_ordering)[:51], "notif_recipient_created_idx")
+
+    def test_notification_retention(self):
+        from .notifications import expired
+
+        qs = expired(timezone.now()).order_by("created_at", "id")
+        self.assert_uses_index(qs[:1000], "notif_retention_idx")
+
+    def test_active_employers(self):
+        qs = Employer.objects.filter(is_active=True).order_by("id")
+        self.assert_uses_index(qs.filter(service_id=self.service.id)[:51], "employer_active_service_idx")
+        self.assert_uses_index(qs[:51], "employer_active_idx")
+
+    def test_employer_search_filters(self):
+        from django.http import QueryDict
+        from . import employer_search
+
+        cases = {
+            "": "employer_active_idx",
+            "service=1&sort=rating": "employer_active_service_idx",
+            "min_rate=10&max_rate=50": "employer_active_rate_idx",
+            "sort=price&min_rate=10": "employer_active_rate_idx",
+            "sort=reviews": "employer_active_reviews_idx",
+            "verified=1": "employer_verified_idx",
+            "city=Paris&verified=1": "service_city_lower_idx",
+            "category=maison&sort=rating": "service_category_lower_idx",
+            "free_at=2030-10-21T10:00": "appt_employer_date_idx",
+        }
+        for query, index_name in cases.items():
+            params = QueryDict(query)
+            qs = employer_search.filter_employers(Employer.objects.filter(is_active=True), params)
+            qs = qs.order_by(*employer_search.SORTS[employer_search.get_sort(params)])
+            with self.subTest(query=query):
+                self.assert_uses_index(qs[:51], index_name)
+
+    def test_nearby_prefilter(self):
+        from .geo import prefilter
+
+        qs = Service.objects.filter(is_active=True).filter(prefilter(48.8566, 2.3522, 10)).values_list("pk", "latitude", "longitude")
+        self.assert_uses_index(qs, "service_geohash_idx")
+        qs = Employer.objects.filter(is_active=True).filter(prefilter(48.8566, 2.3522, 10)).values_list("pk", "latitude", "longitude")
+        self.assert_uses_index(qs, "employer_geohash_idx")
+
+    def test_active_services(self):
+        qs = Service.objects.filter(is_active=True).order_by("id")
+        self.assert_uses_index(qs[:51], "service_active_idx")
+
+
+class BookingEngineTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="d", duration=90)
+        client_user = User.objects.create_user(username="client_booking", email="client_booking@test.com")
+        self.client_profile = Client.objects.create(user=client_user, name="Client", email="client_booking@test.com")
+        employer_user = User.objects.create_user(username="employer_booking", email="employer_booking@test.com")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Employer", email="employer_booking@test.com", service=self.service
+        )
+        self.start = (timezone.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+        self.client.force_authenticate(user=client_user)
+
+    def book(self, start, duration=None, status_value="en_attente"):
+        return Appointment.objects.create(
+            client=self.client_profile,
+            employer=self.employer,
+            service=self.service,
+            date=start,
+            estimated_duration=duration,
+            status=status_value,
+        )
+
+    def post(self, start, **extra):
+        payload = {"employer": self.employer.id, "service": self.service.id, "date": start.isoformat(), **extra}
+        return self.client.post("/api/v1/appointments/create/", payload, format="json")
+
+    def test_overlap_is_rejected(self):
+        self.book(self.start, duration=60)
+        res = self.post(self.start + timedelta(minutes=30))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("date", res.data)
+
+    def test_adjacent_slot_is_accepted(self):
+        self.book(self.start, duration=60)
+        res = self.post(self.start + timedelta(minutes=60), estimated_duration=30)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_new_booking_ending_inside_existing_is_rejected(self):
+        self.book(self.start, duration=60)
+        res = self.post(self.start - timedelta(minutes=30), estimated_duration=45)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_service_duration_is_the_fallback(self):
+        # Pas d'estimated_duration : le service dure 90 min -> occupe jusqu'à 11:30
+        self.book(self.start)
+        self.assertFalse(self.employer.is_available(self.start + timedelta(minutes=80), 15))
+        self.assertTrue(self.employer.is_available(self.start + timedelta(minutes=90), 15))
+
+    def test_cancelled_and_refused_do_not_block(self):
+        self.book(self.start, duration=60, status_value="annulé")
+        self.book(self.start, duration=60, status_value="refusé")
+        res = self.post(self.start)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_reservation_rechecks_under_lock(self):
+        from .serializers import AppointmentCreateSerializer
+
+        serializer = AppointmentCreateSerializer(
+            data={"employer": self.employer.id, "service": self.service.id, "date": self.start}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        # Une réservation concurrente passe entre la validation et l'insertion
+        self.book(self.start + timedelta(minutes=15), duration=30)
+
+        from .booking import BookingConflict
+
+        with self.assertRaises(BookingConflict):
+            serializer.save(client=self.client_profile)
+        self.assertEqual(Appointment.objects.filter(employer=self.employer).count(), 1)
+
+
+class FreeSlotTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="d", duration=60)
+        client_user = User.objects.create_user(username="client_slots", email="client_slots@test.com")
+        self.client_profile = Client.objects.create(user=client_user, name="Client", email="client_slots@test.com")
+        employer_user = User.objects.create_user(username="employer_slots", email="employer_slots@test.com")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Employer", email="employer_slots@test.com", service=self.service
+        )
+        # Lundi 09:00-12:00 et dimanche 09:00-11:00 (dont 10:00-10:30 bloqué)
+        Availability.objects.create(employer=self.employer, day_of_week=0, start_time="09:00", end_time="12:00")
+        Availability.objects.create(employer=self.employer, day_of_week=6, start_time="09:00", end_time="11:00")
+        Availability.objects.create(
+            employer=self.employer, day_of_week=6, start_time="10:00", end_time="10:30", is_available=False
+        )
+        self.client.force_authenticate(user=client_user)
+        self.past = timezone.now() - timedelta(days=1)
+
+    def local(self, day, hour, minute=0):
+        from datetime import datetime
+
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute))
+
+    def test_bookings_are_subtracted_with_two_queries(self):
+        from datetime import date
+        from .slots import free_slots
+
+        monday = date(2030, 10, 21)
+        Appointment.objects.create(
+            client=self.client_profile, employer=self.employer, service=self.service, date=self.local(monday, 10)
+        )
+        Appointment.objects.create(
+            client=self.client_profile,
+            employer=self.employer,
+            service=self.service,
+            date=self.local(monday, 9),
+            status="annulé",
+        )
+
+        with self.assertNumQueries(2):
+            days = free_slots(self.employer.id, monday, monday + timedelta(days=59), granularity=30, duration=60, now=self.past)
+
+        self.assertEqual(days[0], {"date": "2030-10-21", "slots": ["09:00", "11:00"]})
+        self.assertEqual(days[2], {"date": "2030-10-28", "slots": ["09:00", "09:30", "10:00", "10:30", "11:00"]})
+
+    def test_unavailable_rules_and_dst_change(self):
+        from datetime import date
+        from .slots import free_slots
+
+        # 27/10/2030 : passage à l'heure d'hiver à Paris
+        sunday = date(2030, 10, 27)
+        days = free_slots(self.employer.id, sunday, sunday, granularity=30, duration=30, now=self.past)
+        self.assertEqual(days, [{"date": "2030-10-27", "slots": ["09:00", "09:30", "10:30"]}])
+
+    def test_endpoint(self):
+        res = self.client.get(f"/api/v1/employers/{self.employer.id}/slots/?granularity=60")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["duration"], 60)
+        self.assertEqual(res.data["timezone"], "Europe/Paris")
+        for day in res.data["days"]:
+            self.assertTrue(day["slots"])
+
+        self.assertEqual(self.client.get("/api/v1/employers/999999/slots/").status_code, status.HTTP_404_NOT_FOUND)
+        bad = self.client.get(f"/api/v1/employers/{self.employer.id}/slots/?start=2030-01-01&end=2031-01-01")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_employer_without_rules_uses_default_hours(self):
+        from datetime import date
+        from .assignment import filter_free
+        from .slots import free_slots
+
+        user = User.objects.create_user(username="employer_norules", email="employer_norules@test.com")
+        employer = Employer.objects.create(user=user, name="Sans horaires", email="employer_norules@test.com", service=self.service)
+        wednesday = date(2030, 10, 23)
+        Appointment.objects.create(
+            client=self.client_profile, employer=employer, service=self.service, date=self.local(wednesday, 10)
+        )
+
+        days = free_slots(employer.id, wednesday, wednesday, granularity=60, duration=60, now=self.past)
+        self.assertEqual(
+            days, [{"date": "2030-10-23", "slots": ["09:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00", "17:00"]}]
+        )
+        # Même règle pour l'affectation automatique
+        employers = Employer.objects.filter(pk=employer.pk)
+        self.assertTrue(filter_free(employers, self.local(wednesday, 11), 60).exists())
+        self.assertFalse(filter_free(employers, self.local(wednesday, 20), 60).exists())
+
+
+class AvailabilityScheduleTests(APITestCase):
+    def setUp(self):
+        employer_user = User.objects.create_user(username="employer_sched", email="employer_sched@test.com", role="employer")
+        self.employer = Employer.objects.create(user=employer_user, name="Employer", email="employer_sched@test.com")
+        other_user = User.objects.create_user(username="other_sched", email="other_sched@test.com", role="employer")
+        self.other = Employer.objects.create(user=other_user, name="Other", email="other_sched@test.com")
+        for day in range(5):
+            Availability.objects.create(employer=self.employer, day_of_week=day, start_time="09:00", end_time="17:00")
+        self.url = f"/api/v1/employers/{self.employer.id}/availabilities/"
+        self.client.force_authenticate(user=User.objects.get(pk=employer_user.pk))
+
+    def test_replace_diffs_in_constant_queries(self):
+        schedule = [
+            {"day_of_week": d, "start_time": "09:00", "end_time": "17:00", "is_available": d != 4} for d in range(4)
+        ]
+        schedule += [{"day_of_week": 4, "start_time": "09:00", "end_time": "17:00", "is_available": False}]
+        schedule += [{"day_of_week": 5, "start_time": f"{h:02d}:00", "end_time": f"{h + 1:02d}:00"} for h in range(8, 12)]
+
+        kept_ids = set(Availability.objects.filter(employer=self.employer, day_of_week__lt=4).values_list("id", flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.put(self.url, schedule, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        small = len(ctx.captured_queries)
+
+        self.assertEqual(len(res.data), 9)
+        self.assertEqual(res.data, self.client.get(self.url).data)
+        self.assertTrue(kept_ids <= {row["id"] for row in res.data})
+        friday = Availability.objects.get(employer=self.employer, day_of_week=4)
+        self.assertFalse(friday.is_available)
+
+        # Le nombre de requêtes ne dépend pas de la taille du planning
+        schedule = [
+            {"day_of_week": d, "start_time": f"{h:02d}:00", "end_time": f"{h:02d}:30"} for d in range(7) for h in range(6, 20)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.put(self.url, {"availabilities": schedule}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 98)
+        self.assertLessEqual(len(ctx.captured_queries), small)
+        self.assertEqual(Availability.objects.filter(employer=self.employer).count(), 98)
+
+    def test_overlap_rejected_without_changes(self):
+        schedule = [
+            {"day_of_week": 0, "start_time": "09:00", "end_time": "12:00"},
+            {"day_of_week": 0, "start_time": "11:00", "end_time": "13:00"},
+        ]
+        res = self.client.put(self.url, schedule, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Availability.objects.filter(employer=self.employer).count(), 5)
+
+        bad = self.client.put(self.url, [{"day_of_week": 1, "start_time": "12:00", "end_time": "09:00"}], format="json")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_employer_forbidden(self):
+        res = self.client.put(f"/api/v1/employers/{self.other.id}/availabilities/", [], format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_empty_schedule_clears(self):
+        res = self.client.put(self.url, [], format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+        self.assertFalse(Availability.objects.filter(employer=self.employer).exists())
+
+
+class AssignmentTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="d", duration=60)
+        client_user = User.objects.create_user(username="client_assign", email="client_assign@test.com")
+        self.client_profile = Client.objects.create(user=client_user, name="Client", email="client_assign@test.com")
+        self.employers = []
+        for i in range(3):
+            user = User.objects.create_user(username=f"emp_assign_{i}", email=f"emp_assign_{i}@test.com", role="employer")
+            self.employers.append(
+                Employer.objects.create(user=user, name=f"Emp {i}", email=f"emp_assign_{i}@test.com", service=self.service)
+            )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=30)
+        self.client.force_authenticate(user=User.objects.get(pk=client_user.pk))
+
+    def book(self, employer, date, **kwargs):
+        return Appointment.objects.create(
+            client=self.client_profile, employer=employer, service=self.service, date=date, **kwargs
+        )
+
+    def test_least_loaded_free_employer_in_one_query(self):
+        from .assignment import pick_employer
+
+        e0, e1, e2 = self.employers
+        for days in (1, 2, 3):
+            self.book(e0, self.start + timedelta(days=days))
+        self.book(e1, self.start + timedelta(days=1))
+        # e2: aucun rendez-vous à venir... sauf un qui chevauche le créneau demandé
+        self.book(e2, self.start - timedelta(minutes=30))
+
+        with self.assertNumQueries(1):
+            employer = pick_employer(self.service.id, self.start, 60)
+        self.assertEqual(employer, e1)
+
+        # Un rendez-vous terminé avant le créneau (ou annulé) ne bloque pas
+        Appointment.objects.filter(employer=e2).update(date=self.start - timedelta(minutes=60))
+        self.book(e1, self.start + timedelta(days=2))
+        self.book(e2, self.start, status="annulé")
+        self.assertEqual(pick_employer(self.service.id, self.start, 60), e2)
+        self.assertEqual(pick_employer(self.service.id), e2)
+
+    def test_busy_subquery_matches_has_conflict(self):
+        from . import booking
+
+        employer = self.employers[0]
+        self.book(employer, self.start, estimated_duration=90)
+        for minutes in (-120, -60, -30, 0, 60, 89, 90, 120):
+            start = self.start + timedelta(minutes=minutes)
+            busy = Employer.objects.filter(booking.busy_subquery(start, start + timedelta(minutes=60)), pk=employer.pk).exists()
+            self.assertEqual(busy, booking.has_conflict(employer.id, start, 60), minutes)
+
+    def test_working_hours_and_strategies(self):
+        from .assignment import pick_employer
+
+        e0, e1, e2 = self.employers
+        local = timezone.localtime(self.start).replace(hour=10, minute=0)
+        # e0 travaille le matin du jour demandé ; e1 a des horaires mais pas ce jour-là
+        Availability.objects.create(employer=e0, day_of_week=local.weekday(), start_time="08:00", end_time="12:00")
+        Availability.objects.create(employer=e1, day_of_week=(local.weekday() + 1) % 7, start_time="08:00", end_time="12:00")
+        e0.average_rating, e0.total_reviews = 4.9, 40
+        e0.save()
+        e2.average_rating, e2.total_reviews = 5.0, 1
+        e2.save()
+
+        self.assertEqual(pick_employer(self.service.id, local, 60, strategy="rating_weighted"), e0)
+        self.assertEqual(pick_employer(self.service.id, local.replace(hour=12), 60, strategy="rating_weighted"), e2)
+
+        self.book(e0, self.start + timedelta(days=2))
+        self.assertEqual(pick_employer(self.service.id, local, 60, strategy="round_robin"), e2)
+
+    def test_create_appointment_and_suggestions(self):
+        e0, e1, e2 = self.employers
+        self.book(e0, self.start + timedelta(days=1))
+        self.book(e1, self.start + timedelta(days=1))
+
+        res = self.client.post(
+            "/api/v1/appointments/create/",
+            {"service": self.service.id, "date": self.start.isoformat(), "description": "Fuite"},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        self.assertEqual(Appointment.objects.get(pk=res.data["id"]).employer, e2)
+
+        res = self.client.get(
+            f"/api/v1/services/{self.service.id}/employers/suggested/",
+            {"date": self.start.isoformat(), "limit": 5},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in res.data], [e0.id, e1.id])
+        self.assertEqual(res.data[0]["upcoming_bookings"], 1)
+
+
+class RatingAggregationTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="d")
+        self.client_user = User.objects.create_user(username="client_rating", email="client_rating@test.com")
+        self.client_profile = Client.objects.create(user=self.client_user, name="Client", email="client_rating@test.com")
+        employer_user = User.objects.create_user(username="emp_rating", email="emp_rating@test.com", role="employer")
+        self.employer = Employer.objects.create(user=employer_user, name="Emp", email="emp_rating@test.com")
+        self.appointments = [
+            Appointment.objects.create(
+                client=self.client_profile,
+                employer=self.employer,
+                service=self.service,
+                date=timezone.now() - timedelta(days=i + 1),
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=User.objects.get(pk=self.client_user.pk))
+
+    def test_update_rating_is_atomic(self):
+        stale = Employer.objects.get(pk=self.employer.pk)
+        with self.assertNumQueries(2):  # UPDATE + rafraîchissement
+            self.employer.update_rating(5)
+        # Instance périmée : l'UPDATE part des valeurs en base, rien n'est perdu
+        stale.update_rating(2)
+        self.assertEqual((stale.total_reviews, stale.average_rating), (2, 3.5))
+
+        stale.update_rating(4, previous_rating=2)
+        self.assertEqual((stale.total_reviews, stale.average_rating), (2, 4.5))
+
+    def test_add_review_updates_and_replaces_rating(self):
+        url = f"/api/v1/appointments/{self.appointments[0].id}/add-review/"
+        res = self.client.put(url, {"feedback": "Bien", "rating": 4}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.put(url, {"feedback": "Très bien", "rating": 5}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.employer.refresh_from_db()
+        self.assertEqual((self.employer.total_reviews, self.employer.average_rating), (1, 5.0))
+
+        bad = self.client.put(url, {"feedback": "?", "rating": 9}, format="json")
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reconcile_command_fixes_only_drifted_rows(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        other_user = User.objects.create_user(username="emp_rating2", email="emp_rating2@test.com", role="employer")
+        Employer.objects.create(user=other_user, name="Other", email="emp_rating2@test.com")
+        Appointment.objects.filter(pk=self.appointments[0].pk).update(rating=5)
+        Appointment.objects.filter(pk=self.appointments[1].pk).update(rating=2)
+        Employer.objects.filter(pk=self.employer.pk).update(total_reviews=7, average_rating=1.0)
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("reconcile_ratings", stdout=out)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("1 corrigés", out.getvalue())
+
+        self.employer.refresh_from_db()
+        self.assertEqual((self.employer.total_reviews, self.employer.average_rating), (2, 3.5))
+
+        out = StringIO()
+        call_command("reconcile_ratings", stdout=out)
+        self.assertIn("0 corrigés", out.getvalue())
+
+
+class ReviewFeedTests(APITestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Plomberie", description="d")
+        client_user = User.objects.create_user(username="client_feed", email="client_feed@test.com")
+        self.client_profile = Client.objects.create(user=client_user, name="Client Feed", email="client_feed@test.com")
+        employer_user = User.objects.create_user(username="emp_feed", email="emp_feed@test.com", role="employer")
+        self.employer = Employer.objects.create(user=employer_user, name="Emp", email="emp_feed@test.com")
+        self.appointments = Appointment.objects.bulk_create(
+            Appointment(
+                client=self.client_profile,
+                employer=self.employer,
+                service=self.service,
+                date=timezone.now() - timedelta(days=i + 1),
+            )
+            for i in range(8)
+        )
+        self.client.force_authenticate(user=User.objects.get(pk=client_user.pk))
+
+    def test_both_review_paths_feed_the_histogram(self):
+        first, second = self.appointments[:2]
+        res = self.client.post(f"/api/v1/appointments/{first.id}/review/", {"rating": 4, "feedback": "Bien"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.put(f"/api/v1/appointments/{second.id}/add-review/", {"rating": 2, "feedback": "Bof"}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Avis modifié : déplacé d'une colonne à l'autre, pas compté deux fois
+        self.client.post(f"/api/v1/appointments/{first.id}/review/", {"rating": 5, "feedback": "Top"}, format="json")
+
+        self.employer.refresh_from_db()
+        self.assertEqual(self.employer.rating_histogram(), {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1})
+        self.assertEqual((self.employer.total_reviews, self.employer.average_rating), (2, 3.5))
+        first.refresh_from_db()
+        self.assertEqual(first.status, "terminé")
+
+    def test_resubmission_from_stale_instance_is_counted_once(self):
+        from .reviews import submit_review
+
+        # Deux copies chargées avant tout avis (double soumission concurrente)
+        stale = [Appointment.objects.get(pk=self.appointments[0].pk) for _ in range(2)]
+        submit_review(stale[0], 4)
+        submit_review(stale[1], 2)
+
+        self.employer.refresh_from_db()
+        self.assertEqual(self.employer.rating_histogram(), {"1": 0, "2": 1, "3": 0, "4": 0, "5": 0})
+        self.assertEqual((self.employer.total_reviews, self.employer.average_rating), (1, 2.0))
+
+    def test_feed_is_keyset_paginated(self):
+        from .reviews import submit_review
+
+        for rating, appointment in zip([5, 4, 5, 3, 1], self.appointments):
+            submit_review(appointment, rating)
+
+        url = f"/api/v1/employers/{self.employer.id}/reviews/?page_size=2"
+        self.client.force_authenticate(user=None)
+        with self.assertNumQueries(2):  # prestataire + page
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["histogram"], {"1": 1, "2": 0, "3": 1, "4": 1, "5": 2})
+        self.assertEqual(res.data["total_reviews"], 5)
+        self.assertEqual(res.data["results"][0]["client_name"], "Client Feed")
+        self.assertEqual(res.data["results"][0]["service_name"], "Plomberie")
+
+        ids = [row["id"] for row in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids += [row["id"] for row in res.data["results"]]
+        self.assertEqual(ids, sorted((a.id for a in self.appointments[:5]), reverse=True))
+
+        self.assertEqual(self.client.get("/api/v1/employers/999999/reviews/").status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ServiceSearchTests(APITestCase):
+    def setUp(self):
+        Service.objects.create(name="Plomberie", description="Fuites et chauffe-eau", category="Maison", city="Lyon", price="50.00")
+        Service.objects.create(name="Ménage à domicile", description="Nettoyage complet", category="Maison", city="Paris", price="25.00")
+        Service.objects.create(name="Cours de maths", description="Soutien scolaire, ménage exclu", category="Éducation", city="Paris", price="30.00")
+        Service.objects.create(name="Électricité", description="Dépannage", category="Maison", city="Marseille", price="60.00")
+        Service.objects.create(name="Ménage inactif", description="", category="Maison", city="Paris", is_active=False)
+        self.url = "/api/v1/services/search/"
+
+    def names(self, **params):
+        res = self.client.get(self.url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row["name"] for row in res.data["results"]]
+
+    def test_accent_insensitive_prefix_and_ranking(self):
+        # Le nom pèse plus que la description
+        self.assertEqual(self.names(q="menage"), ["Ménage à domicile", "Cours de maths"])
+        self.assertEqual(self.names(q="ELECTRI"), ["Électricité"])
+        self.assertEqual(self.names(q="plomb lyon"), ["Plomberie"])
+        self.assertEqual(self.names(q="menage", location="paris", max_price=26), ["Ménage à domicile"])
+        self.assertEqual(self.names(q="education"), ["Cours de maths"])
+        self.assertEqual(self.names(q="introuvable"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        service = Service.objects.get(name="Plomberie")
+        service.name = "Serrurerie"
+        service.save()
+        self.assertEqual(self.names(q="plomberie"), [])
+        self.assertEqual(self.names(q="serrurerie"), ["Serrurerie"])
+        service.delete()
+        self.assertEqual(self.names(q="serrurerie"), [])
+
+    def test_offset_pagination(self):
+        res = self.client.get(self.url, {"category": "maison", "limit": 2})
+        self.assertEqual(len(res.data["results"]), 2)
+        self.assertIsNotNone(res.data["next"])
+        rest = self.client.get(res.data["next"])
+        self.assertIsNone(rest.data["next"])
+        names = [r["name"] for r in res.data["results"] + rest.data["results"]]
+        self.assertCountEqual(names, ["Plomberie", "Ménage à domicile", "Électricité"])
+
+    def test_icontains_fallback(self):
+        from unittest import mock
+        from . import search
+
+        with mock.patch.object(search, "fts_available", return_value=False):
+            self.assertEqual(self.names(q="ménage"), ["Ménage à domicile", "Cours de maths"])
+            self.assertEqual(self.names(q="plomb", location="lyon"), ["Plomberie"])
+
+
+class EmployerSearchTests(APITestCase):
+    def setUp(self):
+        self.paris = Service.objects.create(name="Ménage", description="d", category="Maison", city="Paris")
+        self.lyon = Service.objects.create(name="Plomberie", description="d", category="Maison", city="Lyon")
+        specs = [
+            # nom, service, tarif, note, nb avis, vérifié
+            ("A", self.paris, "20.00", 4.8, 10, True),
+            ("B", self.paris, "35.00", 3.9, 4, False),
+            ("C", self.lyon, "50.00", 4.8, 30, True),
+            ("D", self.lyon, None, 0.0, 0, False),
+        ]
+        self.employers = {}
+        for name, service, rate, rating, reviews, verified in specs:
+            user = User.objects.create_user(username=f"search_{name}", email=f"search_{name}@test.com", role="employer")
+            self.employers[name] = Employer.objects.create(
+                user=user,
+                name=name,
+                email=f"search_{name}@test.com",
+                service=service,
+                hourly_rate=rate,
+                average_rating=rating,
+                total_reviews=reviews,
+                is_verified=verified,
+            )
+        self.url = "/api/v1/employers/"
+
+    def names(self, **params):
+        res = self.client.get(self.url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return [row["name"] for row in res.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(self.names(), ["A", "B", "C", "D"])
+        self.assertEqual(self.names(service=self.lyon.id), ["C", "D"])
+        self.assertEqual(self.names(min_rate=25, max_rate=50), ["B", "C"])
+        self.assertEqual(self.names(min_rating=4.5), ["A", "C"])
+        self.assertEqual(self.names(verified="true"), ["A", "C"])
+        self.assertEqual(self.names(city="paris", verified=0), ["B"])
+        self.assertEqual(self.names(category="MAISON", min_rate=40), ["C"])
+
+        bad = self.client.get(self.url, {"sort": "nom"})
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {"min_rate": "abc"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sorts_paginate_with_keyset(self):
+        self.assertEqual(self.names(sort="-price"), ["C", "B", "A"])
+
+        res = self.client.get(self.url, {"sort": "rating", "page_size": 1})
+        names = [row["name"] for row in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            names += [row["name"] for row in res.data["results"]]
+        self.assertEqual(names, ["C", "A", "B", "D"])
+
+    def test_detail_returns_one_active_employer(self):
+        employer = self.employers["D"]
+        res = self.client.get(f"{self.url}{employer.id}/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["name"], "D")
+
+        Employer.objects.filter(pk=employer.pk).update(is_active=False)
+        self.assertEqual(self.client.get(f"{self.url}{employer.id}/").status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_is_bound_to_its_sort(self):
+        from urllib.parse import parse_qs, urlparse
+
+        res = self.client.get(self.url, {"sort": "rating", "page_size": 1})
+        cursor = parse_qs(urlparse(res.data["next"]).query)["cursor"][0]
+        self.assertEqual(self.client.get(self.url, {"sort": "rating", "cursor": cursor}).status_code, status.HTTP_200_OK)
+        for sort in ("price", None):
+            params = {"cursor": cursor, **({"sort": sort} if sort else {})}
+            res = self.client.get(self.url, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("cursor", res.data)
+
+    def test_free_at(self):
+        client_user = User.objects.create_user(username="search_client", email="search_client@test.com")
+        client = Client.objects.create(user=client_user, name="Client", email="search_client@test.com")
+        start = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        Appointment.objects.create(client=client, employer=self.employers["A"], service=self.paris, date=start)
+
+        self.assertEqual(self.names(free_at=start.isoformat(), city="paris"), ["B"])
+        later = (start + timedelta(hours=2)).isoformat()
+        self.assertEqual(self.names(free_at=later, city="paris"), ["A", "B"])
+
+
+class GeoSearchTests(APITestCase):
+    PLACES = {
+        # nom: (lat, lng)
+        "Paris": (48.8566, 2.3522),
+        "Versailles": (48.8049, 2.1204),
+        "Meaux": (48.9601, 2.8788),
+        "Lyon": (45.7640, 4.8357),
+    }
+
+    def setUp(self):
+        self.services = {
+            name: Service.objects.create(name=f"Service {name}", description="d", city=name, latitude=lat, longitude=lng)
+            for name, (lat, lng) in self.PLACES.items()
+        }
+
+    def test_geohash_and_cover(self):
+        from . import geo
+
+        self.assertEqual(geo.encode_geohash(57.64911, 10.40744), "u4pruydqq")
+        self.assertEqual(self.services["Paris"].geohash[:5], "u09tv")
+        # Tout point à moins du rayon tombe dans une des cellules couvrantes
+        for radius in (1, 5, 30, 120):
+            prefixes = geo.covering_prefixes(48.8566, 2.3522, radius)
+            for name, (lat, lng) in self.PLACES.items():
+                inside = geo.distances_km(48.8566, 2.3522, [(lat, lng)])[0] <= radius
+                if inside:
+                    self.assertTrue(any(geo.encode_geohash(lat, lng).startswith(p) for p in prefixes), (radius, name))
+
+    def test_services_sorted_by_distance(self):
+        res = self.client.get("/api/v1/services/nearby/", {"lat": 48.8566, "lng": 2.3522, "radius_km": 50})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["city"] for row in res.data["results"]], ["Paris", "Versailles", "Meaux"])
+        self.assertAlmostEqual(res.data["results"][1]["distance_km"], 17.8, delta=0.5)
+        self.assertNotIn("geohash", res.data["results"][0])
+
+        far = self.client.get("/api/v1/services/nearby/", {"lat": 48.8566, "lng": 2.3522, "radius_km": 5000})
+        self.assertEqual(far.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get("/api/v1/services/nearby/", {"lat": "x"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_gazetteer_import(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        plain = Service.objects.create(name="Sans position", description="d", address="3 rue Mercière, Lyon")
+        user = User.objects.create_user(username="geo_emp", email="geo_emp@test.com", role="employer")
+        employer = Employer.objects.create(user=user, name="Geo", email="geo_emp@test.com", service=plain)
+        accented = Service.objects.create(name="Accents", description="d", city="SAINT-ÉTIENNE")
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as handle:
+            handle.write("name,latitude,longitude,alternate_names\n")
+            handle.write('Lyon,45.764,4.8357,"Lugdunum,Lion"\n')
+            handle.write("Saint-Étienne,45.4397,4.3872,\n")
+        self.addCleanup(os.unlink, handle.name)
+
+        out = StringIO()
+        call_command("import_gazetteer", handle.name, stdout=out)
+        self.assertIn("Services géocodés : 2", out.getvalue())
+
+        plain.refresh_from_db()
+        accented.refresh_from_db()
+        employer.refresh_from_db()
+        self.assertEqual((plain.latitude, plain.longitude), (45.764, 4.8357))
+        self.assertEqual(accented.latitude, 45.4397)
+        self.assertEqual(employer.geohash, plain.geohash)
+
+        res = self.client.get("/api/v1/employers/nearby/", {"lat": 45.76, "lng": 4.83, "radius_km": 5})
+        self.assertEqual([row["id"] for row in res.data["results"]], [employer.id])
+
+
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        from . import autocomplete
+
+        self.autocomplete = autocomplete
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.plomberie = Service.objects.create(name="Plomberie Dupont", description="d", category="Plomberie", city="Évry")
+        Service.objects.create(name="Ménage express", description="d", category="Ménage", city="Paris")
+        Service.objects.create(name="Repassage", description="d", category="Ménage", city="paris")
+        user = User.objects.create_user(username="ac_emp", email="ac_emp@test.com", role="employer")
+        self.employer = Employer.objects.create(
+            user=user, name="Élodie Martin", email="ac_emp@test.com", service=self.plomberie, is_verified=True
+        )
+        hidden = User.objects.create_user(username="ac_hidden", email="ac_hidden@test.com", role="employer")
+        Employer.objects.create(user=hidden, name="Marc Non Vérifié", email="ac_hidden@test.com", service=self.plomberie)
+
+    def labels(self, query, **params):
+        res = self.client.get("/api/v1/autocomplete/", {"q": query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(row["type"], row["label"]) for row in res.data["results"]]
+
+    def test_prefix_folding_and_kinds(self):
+        self.assertEqual(self.labels("PLOM"), [("category", "Plomberie"), ("service", "Plomberie Dupont")])
+        self.assertEqual(self.labels("dupo"), [("service", "Plomberie Dupont")])
+        self.assertEqual(self.labels("menage"), [("category", "Ménage"), ("service", "Ménage express")])
+        self.assertEqual(self.labels("evr"), [("city", "Évry")])
+        self.assertEqual(self.labels("par"), [("city", "Paris")])
+        self.assertEqual(self.labels("mar"), [("employer", "Élodie Martin")])
+        self.assertEqual(self.labels("m", limit=1), [("category", "Ménage")])
+        self.assertEqual(self.labels(""), [])
+
+    def test_incremental_updates(self):
+        self.labels("plom")  # construit l'index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plomberie.name = "Chauffage Dupont"
+            self.plomberie.category = "Chauffage"
+            self.plomberie.save()
+            Service.objects.create(name="Jardin", description="d", city="Lyon")
+        self.assertEqual(self.labels("plom"), [])
+        self.assertEqual(self.labels("chauf"), [("category", "Chauffage"), ("service", "Chauffage Dupont")])
+        self.assertEqual(self.labels("lyo"), [("city", "Lyon")])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employer.is_verified = False
+            self.employer.save()
+            Service.objects.filter(city="paris").delete()
+        self.assertEqual(self.labels("mar"), [])
+        # "Paris" reste porté par "Ménage express"
+        self.assertEqual(self.labels("par"), [("city", "Paris")])
+
+        # Une transaction annulée ne touche pas l'index
+        try:
+            with transaction.atomic():
+                Service.objects.create(name="Fantôme", description="d")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(self.labels("fant"), [])
+
+    def test_lookup_speed(self):
+        index = self.autocomplete.AutocompleteIndex()
+        for i in range(20000):
+            index.set_service(i + 1, f"Service {i} plomberie", f"catégorie {i % 50}", f"Ville {i % 300}")
+        started = time.perf_counter()
+        for prefix in ("s", "serv", "plo", "vil", "categorie 4", "zzz") * 100:
+            index.lookup(prefix)
+        per_lookup = (time.perf_counter() - started) / 600
+        self.assertLess(per_lookup, 0.001)
+
+
+class FlakyChannel:
+    """Canal de test : échoue `failures` fois puis réussit."""
+
+    failures = 1
+    sent = []
+
+    def send(self, event):
+        if FlakyChannel.failures > 0:
+            FlakyChannel.failures -= 1
+            raise ConnectionError("passerelle indisponible")
+        FlakyChannel.sent.append(event.pk)
+
+
+class NotificationOutboxTests(APITestCase):
+    def setUp(self):
+        from . import outbox
+
+        self.outbox = outbox
+        self.service = Service.objects.create(name="Plomberie", description="d")
+        self.client_user = User.objects.create_user(
+            username="outbox_client", email="outbox_client@test.com", role="client", phone="0600000000"
+        )
+        self.client_profile = Client.objects.create(user=self.client_user, name="Outbox", email="outbox_client@test.com")
+        employer_user = User.objects.create_user(username="outbox_emp", email="outbox_emp@test.com", role="employer")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Emp", email="outbox_emp@test.com", service=self.service
+        )
+        self.client.force_authenticate(self.client_user)
+
+    def book(self, hour=10):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                "/api/v1/appointments/create/",
+                {"service": self.service.id, "employer": self.employer.id, "date": (timezone.now() + timedelta(days=2)).date().isoformat(), "time": f"{hour}:00"},
+                format="json",
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED, res.data)
+        return res
+
+    def test_enqueued_in_transaction_and_drained_in_bulk(self):
+        from .models import NotificationOutbox
+
+        self.book()
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+        totals = self.outbox.drain()
+        self.assertEqual((totals["claimed"], totals["notifications"], totals["delivered"]), (1, 1, 1))
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.employer.user)
+        self.assertEqual(notification.notification_type, "appointment_request")
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+        # Rollback : aucun événement
+        try:
+            with transaction.atomic():
+                self.outbox.enqueue(self.client_user, "test", "t", "m")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_batch_query_count_is_constant(self):
+        def queries_for(count):
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(count):
+                    self.outbox.enqueue(self.client_user, "test", f"T{i}", "m")
+            with CaptureQueriesContext(connection) as ctx:
+                self.outbox.drain()
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(1), queries_for(25))
+        self.assertEqual(Notification.objects.count(), 26)
+
+    def test_channels_retry_with_backoff(self):
+        from django.core import mail
+        from django.test import override_settings
+        from .models import NotificationOutbox
+
+        FlakyChannel.failures, FlakyChannel.sent = 1, []
+        with override_settings(
+            NOTIFICATION_CHANNELS=["email", "appointments.tests.FlakyChannel"],
+            NOTIFICATION_OUTBOX_BACKOFF_SECONDS=60,
+            NOTIFICATION_OUTBOX_MAX_ATTEMPTS=3,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.outbox.enqueue(self.client_user, "test", "Rappel", "Demain 10h")
+
+            now = timezone.now()
+            totals = self.outbox.drain(now=now)
+            self.assertEqual((totals["retried"], totals["delivered"]), (1, 0))
+            self.assertEqual(len(mail.outbox), 1)
+            self.assertEqual(mail.outbox[0].to, ["outbox_client@test.com"])
+
+            event = NotificationOutbox.objects.get()
+            self.assertEqual(event.channels, ["appointments.tests.FlakyChannel"])
+            self.assertEqual(event.attempts, 1)
+            self.assertIn("passerelle indisponible", event.last_error)
+            self.assertEqual(event.next_attempt_at, now + timedelta(seconds=60))
+
+            # Pas encore dû ; puis livré sans recréer la notification ni renvoyer l'email
+            self.assertEqual(self.outbox.drain(now=now + timedelta(seconds=30))["claimed"], 0)
+            totals = self.outbox.drain(now=now + timedelta(seconds=61))
+            self.assertEqual((totals["notifications"], totals["delivered"]), (0, 1))
+            self.assertEqual(FlakyChannel.sent, [event.pk])
+            self.assertEqual(len(mail.outbox), 1)
+            self.assertEqual(Notification.objects.count(), 1)
+
+            # Échec définitif après NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+            FlakyChannel.failures = 10
+            with self.captureOnCommitCallbacks(execute=True):
+                self.outbox.enqueue(self.client_user, "test", "Rappel", "m", channels=["appointments.tests.FlakyChannel"])
+            for minutes in (1, 3, 10):
+                self.outbox.drain(now=now + timedelta(minutes=minutes))
+            self.assertEqual(NotificationOutbox.objects.get().status, "failed")
+
+    def test_sms_file_backend(self):
+        import json
+        import os
+        import tempfile
+        from django.test import override_settings
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "sms.log")
+        with override_settings(NOTIFICATION_SMS_BACKEND="file", NOTIFICATION_SMS_FILE_PATH=path):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.outbox.enqueue(self.client_user, "test", "Rappel", "Demain", channels=["sms"])
+            self.outbox.drain()
+        with open(path, encoding="utf-8") as handle:
+            line = json.loads(handle.readline())
+        self.assertEqual((line["to"], line["text"]), ("0600000000", "Rappel : Demain"))
+
+    def test_concurrent_claims_do_not_share_events(self):
+        from unittest import mock
+        from django.db.models import QuerySet
+
+        for i in range(3):
+            self.outbox.enqueue(self.client_user, "test", f"T{i}", "m")
+        now = timezone.now()
+        update = QuerySet.update
+        rival = []
+
+        def rival_claims_first(queryset, **kwargs):
+            # SQLite : pas de verrou de ligne, un autre worker a lu les mêmes ids et réserve avant nous
+            if not rival:
+                rival.append(None)
+                rival.extend(self.outbox.claim_batch(now=now + timedelta(microseconds=1)))
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=rival_claims_first):
+            mine = self.outbox.claim_batch(now=now)
+        self.assertEqual(len(rival), 4)
+        self.assertEqual(mine, [])
+
+    def test_inline_delivery_without_worker(self):
+        from django.test import override_settings
+        from .models import NotificationOutbox
+
+        with override_settings(NOTIFICATION_OUTBOX_INLINE=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.book()
+        self.assertEqual(Notification.objects.get().recipient, self.employer.user)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+class RealtimeStreamTests(APITestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from . import realtime
+
+        self.realtime = realtime
+        realtime.reset_backend()
+        self.addCleanup(realtime.reset_backend)
+        self.user = User.objects.create_user(username="sse_user", email="sse@test.com")
+        self.token = str(AccessToken.for_user(self.user))
+
+    def notify(self, title="N", is_read=False):
+        return Notification.objects.create(recipient=self.user, notification_type="test", title=title, message="m", is_read=is_read)
+
+    async def open_stream(self, **extra):
+        from django.test import AsyncClient
+
+        response = await AsyncClient().get("/api/v1/notifications/stream/", {"token": self.token}, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response, aiter(response.streaming_content)
+
+    async def next_frame(self, frames):
+        import asyncio
+
+        return (await asyncio.wait_for(anext(frames), timeout=5)).decode()
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get("/api/v1/notifications/stream/").status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.get("/api/v1/notifications/stream/", {"token": "invalide"})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_push_unread_and_heartbeat(self):
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+
+        with override_settings(REALTIME_BACKEND="local", REALTIME_HEARTBEAT_SECONDS=0.05):
+            await sync_to_async(self.notify)()
+            response, frames = await self.open_stream()
+            self.assertTrue((await self.next_frame(frames)).startswith("retry:"))
+            self.assertIn('event: unread\ndata: {"count": 1}', await self.next_frame(frames))
+            self.assertEqual(self.realtime.broker.connection_count(), 1)
+
+            notification = await sync_to_async(self.notify)("Nouveau")
+            await sync_to_async(self.realtime.notifications_created)([notification])
+            frame = await self.next_frame(frames)
+            self.assertIn(f"id: {notification.pk}\nevent: notification", frame)
+            self.assertIn('"title": "Nouveau"', frame)
+            self.assertIn('"count": 2', await self.next_frame(frames))
+            self.assertEqual(await self.next_frame(frames), ": ping\n\n")
+            await frames.aclose()
+
+    async def test_reconnect_replays_missed_notifications(self):
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+
+        first, second, third = [await sync_to_async(self.notify)(f"N{i}") for i in range(3)]
+        with override_settings(REALTIME_BACKEND="local"):
+            response, frames = await self.open_stream(headers={"Last-Event-ID": str(first.pk)})
+            await self.next_frame(frames)
+            self.assertIn(f"id: {second.pk}\n", await self.next_frame(frames))
+            self.assertIn(f"id: {third.pk}\n", await self.next_frame(frames))
+            self.assertIn('"count": 3', await self.next_frame(frames))
+            await frames.aclose()
+
+    async def test_database_backend_picks_up_other_processes(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+
+        with override_settings(REALTIME_BACKEND="database", REALTIME_POLL_SECONDS=0.01):
+            response, frames = await self.open_stream()
+            await self.next_frame(frames)
+            await self.next_frame(frames)
+            await asyncio.sleep(0.05)  # le poller a lu le dernier id existant
+            # Écrite "ailleurs" (worker) : aucune publication locale
+            notification = await sync_to_async(self.notify)("Worker")
+            self.assertIn(f"id: {notification.pk}\nevent: notification", await self.next_frame(frames))
+            self.assertIn('"count": 1', await self.next_frame(frames))
+            await frames.aclose()
+
+    async def test_database_backend_picks_up_unread_changes_from_other_processes(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from django.test import override_settings
+        from . import notifications
+
+        await sync_to_async(self.notify)()
+        await sync_to_async(self.notify)()
+        with override_settings(REALTIME_BACKEND="database", REALTIME_POLL_SECONDS=0.01):
+            response, frames = await self.open_stream()
+            await self.next_frame(frames)
+            self.assertIn('"count": 2', await self.next_frame(frames))
+            await asyncio.sleep(0.05)
+            # Lue "ailleurs" (autre worker) : seul le compteur en base change
+            await sync_to_async(notifications.mark_read)(self.user, notifications.select(self.user))
+            self.assertIn('event: unread\ndata: {"count": 0}', await self.next_frame(frames))
+            await frames.aclose()
+
+
+class UnreadCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="unread_user", email="unread@test.com")
+        self.other = User.objects.create_user(username="unread_other", email="unread_other@test.com")
+        self.client.force_authenticate(self.user)
+
+    def counter(self, user=None):
+        user = user or self.user
+        user.refresh_from_db(fields=["unread_notifications"])
+        return user.unread_notifications
+
+    def notify(self, user=None, **kwargs):
+        return Notification.objects.create(recipient=user or self.user, notification_type="test", title="T", message="m", **kwargs)
+
+    def test_counter_follows_create_and_read(self):
+        first = self.notify()
+        self.notify()
+        self.notify(is_read=True)
+        self.assertEqual(self.counter(), 2)
+
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/v1/notifications/unread-count/")
+        self.assertEqual(res.data, {"count": 2})
+
+        url = f"/api/v1/notifications/{first.id}/read/"
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        # Déjà lue : pas de double décrément
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counter(), 1)
+
+        foreign = self.notify(self.other)
+        res = self.client.post(f"/api/v1/notifications/{foreign.id}/read/")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.counter(self.other), 1)
+
+    def test_outbox_batch_increments_in_one_update(self):
+        from . import outbox
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (self.user, self.user, self.other):
+                outbox.enqueue(user, "test", "T", "m")
+        outbox.drain()
+        self.assertEqual((self.counter(), self.counter(self.other)), (2, 1))
+
+    def test_reconcile_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        self.notify()
+        self.notify(self.other)
+        User.objects.filter(pk=self.user.pk).update(unread_notifications=7)
+        Notification.objects.filter(recipient=self.other).update(is_read=True)
+
+        out = StringIO()
+        call_command("reconcile_unread", stdout=out)
+        self.assertIn("2 corrigés", out.getvalue())
+        self.assertEqual((self.counter(), self.counter(self.other)), (1, 0))
+
+
+class BulkNotificationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bulk_user", email="bulk@test.com")
+        self.other = User.objects.create_user(username="bulk_other", email="bulk_other@test.com")
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now()
+
+    def notify(self, count, user=None, days_ago=0, **kwargs):
+        ids = []
+        for i in range(count):
+            notification = Notification.objects.create(
+                recipient=user or self.user, notification_type="test", title=f"T{i}", message="m", **kwargs
+            )
+            ids.append(notification.id)
+        if days_ago:
+            Notification.objects.filter(id__in=ids).update(created_at=self.now - timedelta(days=days_ago))
+        return ids
+
+    def counter(self, user=None):
+        user = user or self.user
+        user.refresh_from_db(fields=["unread_notifications"])
+        return user.unread_notifications
+
+    def test_mark_all_read_is_constant_queries(self):
+        def queries_for(count):
+            Notification.objects.filter(recipient=self.user).delete()
+            User.objects.filter(pk=self.user.pk).update(unread_notifications=0)
+            self.notify(count)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post("/api/v1/notifications/read/", {"all": True}, format="json")
+            self.assertEqual(res.data, {"updated": count, "unread_count": 0})
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(2), queries_for(40))
+        self.notify(1, self.other)
+        self.assertEqual(self.counter(self.other), 1)
+
+    def test_ids_and_before(self):
+        old = self.notify(3, days_ago=10)
+        recent = self.notify(2)
+        foreign = self.notify(1, self.other)
+
+        res = self.client.post("/api/v1/notifications/read/", {"ids": [old[0], recent[0], foreign[0]]}, format="json")
+        self.assertEqual(res.data, {"updated": 2, "unread_count": 3})
+        self.assertFalse(Notification.objects.get(id=foreign[0]).is_read)
+
+        before = (self.now - timedelta(days=1)).isoformat()
+        res = self.client.post("/api/v1/notifications/read/", {"all": True, "before": before}, format="json")
+        self.assertEqual(res.data, {"updated": 2, "unread_count": 1})
+        self.assertEqual(self.counter(self.other), 1)
+
+        for payload in ({}, {"ids": [1], "all": True}, {"ids": "1,2"}, {"ids": ["x"]}, {"all": True, "before": "hier"}):
+            res = self.client.post("/api/v1/notifications/read/", payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, payload)
+
+    def test_archive_and_delete_keep_counter(self):
+        from .models import NotificationOutbox
+
+        read = self.notify(2, is_read=True)
+        unread = self.notify(3)
+        self.assertEqual(self.counter(), 3)
+
+        res = self.client.post("/api/v1/notifications/archive/", {"ids": [read[0], unread[0]]}, format="json")
+        self.assertEqual(res.data, {"archived": 2, "unread_count": 2})
+        inbox = self.client.get("/api/v1/notifications/")
+        self.assertEqual(len(inbox.data["results"]), 3)
+        archived = self.client.get("/api/v1/notifications/?archived=1")
+        self.assertEqual({row["id"] for row in archived.data["results"]}, {read[0], unread[0]})
+        # Une notification archivée ne se "lit" plus (hors compteur)
+        res = self.client.post("/api/v1/notifications/read/", {"ids": [unread[0]]}, format="json")
+        self.assertEqual(res.data, {"updated": 0, "unread_count": 2})
+
+        # Référencée par un événement en échec de la file : suppression en un seul DELETE
+        NotificationOutbox.objects.create(
+            recipient=self.user, notification_type="test", title="T", message="m", notification_id=unread[1], status="failed"
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/v1/notifications/delete/", {"all": True}, format="json")
+        self.assertEqual(res.data, {"deleted": 5, "unread_count": 0})
+        self.assertEqual(sum(query["sql"].startswith("DELETE") for query in ctx.captured_queries), 1)
+        self.assertFalse(Notification.objects.filter(recipient=self.user).exists())
+        self.assertEqual(self.counter(), 0)
+
+
+class NotificationRetentionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="retention_user", email="retention@test.com")
+        self.now = timezone.now()
+
+    def notify(self, count, days_ago, **kwargs):
+        ids = [
+            Notification.objects.create(
+                recipient=self.user, notification_type="test", title=f"T{i}", message="m", **kwargs
+            ).id
+            for i in range(count)
+        ]
+        Notification.objects.filter(id__in=ids).update(created_at=self.now - timedelta(days=days_ago))
+        return ids
+
+    def test_history_moves_only_old_read_notifications(self):
+        from .models import NotificationHistory
+        from . import notifications
+
+        old_read = self.notify(3, 120, is_read=True)
+        old_archived = self.notify(1, 120)
+        notifications.archive(self.user, notifications.select(self.user, ids=old_archived))
+        old_unread = self.notify(2, 120)
+        recent_read = self.notify(2, 10, is_read=True)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 2)
+
+        stats = notifications.purge(notifications.retention_cutoff(90, self.now), mode="history", chunk_size=2)
+        self.assertEqual((stats["processed"], stats["chunks"]), (4, 2))
+
+        remaining = set(Notification.objects.values_list("id", flat=True))
+        self.assertEqual(remaining, set(old_unread + recent_read))
+        archived = NotificationHistory.objects.get(pk=old_read[0])
+        self.assertEqual((archived.recipient_id, archived.title), (self.user.id, "T0"))
+        self.assertEqual(NotificationHistory.objects.count(), 4)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 2)
+
+    def test_chunks_are_bounded_and_max_chunks_stops(self):
+        from . import notifications
+
+        self.notify(5, 200, is_read=True)
+        cutoff = notifications.retention_cutoff(90, self.now)
+        with CaptureQueriesContext(connection) as ctx:
+            stats = notifications.purge(cutoff, mode="delete", chunk_size=2, max_chunks=2)
+        self.assertEqual(stats["processed"], 4)
+        self.assertEqual(sum(query["sql"].startswith("DELETE") for query in ctx.captured_queries), 2)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_command_reports_throughput(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import NotificationHistory
+
+        self.notify(3, 100, is_read=True)
+        out = StringIO()
+        call_command("purge_notifications", "--dry-run", stdout=out)
+        self.assertIn("3 notifications", out.getvalue())
+        self.assertEqual(Notification.objects.count(), 3)
+
+        out = StringIO()
+        call_command("purge_notifications", "--mode", "delete", "--chunk-size", "2", stdout=out)
+        self.assertIn("3 notifications supprimées en 2 lots", out.getvalue())
+        self.assertIn("/s)", out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(NotificationHistory.objects.exists())
+
+
+class RegistrationUsernameTests(APITestCase):
+    def setUp(self):
+        from django.test import override_settings
+
+        # Hachage rapide : on mesure les requêtes, pas PBKDF2 ; sans limitation de débit (30 inscriptions)
+        hashers = override_settings(
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], THROTTLE_RATES={}
+        )
+        hashers.enable()
+        self.addCleanup(hashers.disable)
+
+    def register(self, email, **extra):
+        return self.client.post(
+            "/api/v1/auth/register/", {"email": email, "password": "secret-pass-123", **extra}, format="json"
+        )
+
+    def test_generate_is_one_query_and_fills_first_gap(self):
+        from .views import generate_unique_username
+
+        for username in ["contact", "contact1", "contact3", "contact-pro", "contacts", "contact01"]:
+            User.objects.create_user(username=username, email=f"{username}@test.com")
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_unique_username(email="contact@example.com"), "contact2")
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_unique_username(email="nouveau@example.com"), "nouveau")
+        self.assertEqual(generate_unique_username(first_name="Élise", last_name="Durand"), "elisedurand")
+
+    def test_register_queries_do_not_grow_with_collisions(self):
+        def queries_for(n):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.register(f"contact@site{n}.com")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(res.data["user"]["username"], f"contact{n}" if n else "contact")
+            return len(ctx.captured_queries)
+
+        counts = [queries_for(n) for n in range(30)]
+        self.assertEqual(counts[1], counts[29])
+
+    def test_retries_when_generated_username_is_taken_concurrently(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from .views import RegisterView
+
+        create_account = RegisterView.create_account
+
+        def racing(view, serializer, *args):
+            if not User.objects.filter(email="rival@test.com").exists():
+                # Inscription concurrente : même username, INSERT avant le nôtre
+                User.objects.create_user(username=serializer.validated_data["username"], email="rival@test.com")
+                raise IntegrityError("UNIQUE constraint failed: appointments_user.username")
+            return create_account(view, serializer, *args)
+
+        with mock.patch.object(RegisterView, "create_account", racing):
+            res = self.register("contact@example.com")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["user"]["username"], "contact1")
+
+    def test_explicit_username_conflict_is_not_rewritten(self):
+        User.objects.create_user(username="choisi", email="choisi@test.com")
+        res = self.register("autre@example.com", username="choisi")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("username", res.data)
+
+
+class ClaimsAuthenticationTests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+
+        # LocMemCache des tests : invalidations fiables dans ce seul processus
+        single = override_settings(AUTH_CLAIMS_SINGLE_PROCESS=True)
+        single.enable()
+        self.addCleanup(single.disable)
+        cache.clear()
+        self.service = Service.objects.create(name="Plomberie", description="d")
+        self.client_user = User.objects.create_user(username="claims_client", email="claims_client@test.com")
+        self.client_profile = Client.objects.create(
+            user=self.client_user, name="Claims Client", email="claims_client@test.com"
+        )
+        self.employer_user = User.objects.create_user(
+            username="claims_employer", email="claims_employer@test.com", role="employer"
+        )
+        self.employer = Employer.objects.create(
+            user=self.employer_user, name="Claims Employer", email="claims_employer@test.com", service=self.service
+        )
+        Appointment.objects.create(
+            client=self.client_profile, employer=self.employer, service=self.service,
+            date=timezone.now() + timedelta(days=1),
+        )
+
+    def authenticate(self, user):
+        from .views import get_tokens_for_user
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(user)['access']}")
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tables = ('"appointments_user"', '"appointments_client"', '"appointments_employer"')
+        return [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT") and q["sql"].split(" FROM ")[1].startswith(tables)]
+
+    def test_token_carries_profile_claims(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .views import get_tokens_for_user
+
+        access = AccessToken(get_tokens_for_user(self.client_user)["access"])
+        self.assertEqual(
+            (access["role"], access["client_id"], access["employer_id"]), ("client", self.client_profile.id, None)
+        )
+        access = AccessToken(get_tokens_for_user(self.employer_user)["access"])
+        self.assertEqual((access["client_id"], access["employer_id"]), (None, self.employer.id))
+
+        self.assertEqual((access["is_active"], access["is_staff"], access["is_superuser"]), (True, False, False))
+
+        staff = User.objects.create_user(username="claims_staff", email="claims_staff@test.com", is_staff=True)
+        self.assertNotIn("role", AccessToken(get_tokens_for_user(staff)["access"]))
+
+    def test_staff_flags_and_process_local_cache_use_database(self):
+        from django.test import override_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .authentication import claims_user
+        from .views import get_tokens_for_user
+
+        access = AccessToken(get_tokens_for_user(self.client_user)["access"])
+        self.assertEqual(claims_user(access).pk, self.client_user.pk)
+        # Drapeaux lus dans le jeton : staff relu en base même avec des claims
+        access["is_staff"] = True
+        self.assertIsNone(claims_user(access))
+
+        # LocMemCache sans AUTH_CLAIMS_SINGLE_PROCESS : invalidations invisibles des autres workers
+        with override_settings(AUTH_CLAIMS_SINGLE_PROCESS=False):
+            self.authenticate(self.client_user)
+            self.assertEqual(len(self.auth_queries("/api/v1/appointments/")), 2)
+
+    def test_hot_paths_skip_user_and_profile_queries(self):
+        self.authenticate(self.client_user)
+        self.assertEqual(self.auth_queries("/api/v1/appointments/"), [])
+        self.authenticate(self.employer_user)
+        self.assertEqual(self.auth_queries("/api/v1/notifications/"), [])
+
+        # Jeton sans claims (émis avant) : utilisateur et profil relus en base
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        access = RefreshToken.for_user(self.client_user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(len(self.auth_queries("/api/v1/appointments/")), 2)
+
+    def test_profile_endpoints_load_full_objects(self):
+        self.authenticate(self.client_user)
+        res = self.client.get("/api/v1/clients/profile/")
+        self.assertEqual(res.data["name"], "Claims Client")
+        res = self.client.get("/api/v1/auth/user/")
+        self.assertEqual(res.data["email"], "claims_client@test.com")
+        self.assertEqual(self.client.get("/api/v1/employers/profile/").status_code, status.HTTP_403_FORBIDDEN)
+
+        self.authenticate(self.employer_user)
+        res = self.client.get("/api/v1/employers/profile/")
+        self.assertEqual(res.data["name"], "Claims Employer")
+
+    def test_stale_claims_fall_back_to_database(self):
+        self.authenticate(self.client_user)
+        time.sleep(0.01)
+        self.client_profile.delete()
+        self.assertEqual(self.client.get("/api/v1/clients/profile/").status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get("/api/v1/appointments/").data["results"], [])
+
+        self.authenticate(self.employer_user)
+        time.sleep(0.01)
+        self.employer_user.is_active = False
+        self.employer_user.save()
+        self.assertEqual(self.client.get("/api/v1/notifications/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="token_user", email="token@test.com")
+
+    def test_logout_blacklists_the_refresh_token(self):
+        from rest_framework_simplejwt.exceptions import TokenError
+        from .authentication import ProfileRefreshToken
+        from .views import get_tokens_for_user
+
+        tokens = get_tokens_for_user(self.user)
+        self.client.force_authenticate(self.user)
+        res = self.client.post("/api/v1/auth/logout/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.post("/api/v1/auth/logout/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertRaises(TokenError):
+            ProfileRefreshToken(tokens["refresh"])
+
+    def test_purge_removes_expired_tokens_in_chunks(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+        now = timezone.now()
+        expired = OutstandingToken.objects.bulk_create(
+            OutstandingToken(user=self.user, jti=f"old-{i}", token="t", expires_at=now - timedelta(days=1))
+            for i in range(5)
+        )
+        valid = OutstandingToken.objects.create(user=self.user, jti="valid", token="t", expires_at=now + timedelta(days=1))
+        BlacklistedToken.objects.create(token=expired[0])
+        BlacklistedToken.objects.create(token=valid)
+
+        out = StringIO()
+        call_command("purge_tokens", "--chunk-size", "2", stdout=out)
+        self.assertIn("5 jetons expirés supprimés (dont 1 en liste noire) en 3 lots", out.getvalue())
+        self.assertEqual(list(OutstandingToken.objects.values_list("jti", flat=True)), ["valid"])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        from django.test import override_settings
+        from . import throttling
+
+        rates = override_settings(
+            THROTTLE_RATES={"login:ip": "3/min", "login:user": {"rate": "1/min", "burst": 2}, "booking:user": "1/h"}
+        )
+        rates.enable()
+        self.addCleanup(rates.disable)
+        throttling.reset_store()
+        self.addCleanup(throttling.reset_store)
+        self.user = User.objects.create_user(username="throttle_user", email="throttle@test.com", password="pass-1234")
+
+    def login(self, email, ip="10.0.0.1"):
+        return self.client.post(
+            "/api/v1/auth/login/", {"email": email, "password": "wrong"}, format="json", REMOTE_ADDR=ip
+        )
+
+    def test_token_bucket_refills_over_time(self):
+        from .throttling import MemoryStore
+
+        store = MemoryStore()
+        results = [store.consume("k", 2, 1.0, now=100.0)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        allowed, wait = store.consume("k", 2, 1.0, now=100.0)
+        self.assertEqual((allowed, wait), (False, 1.0))
+        self.assertTrue(store.consume("k", 2, 1.0, now=101.0)[0])
+
+    def test_login_is_limited_per_email_and_per_ip_before_hashing(self):
+        from unittest import mock
+        from . import throttling
+
+        with mock.patch("appointments.views.authenticate", return_value=None) as authenticate:
+            codes = [self.login("throttle@test.com").status_code for _ in range(3)]
+            self.assertEqual(codes, [401, 401, 429])
+            self.assertEqual(authenticate.call_count, 2)
+
+            # Autre email, même IP : le seau IP (3) est épuisé
+            res = self.login("other@test.com")
+            self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn("Retry-After", res.headers)
+            # Autre IP, email encore disponible
+            self.assertEqual(self.login("other@test.com", ip="10.0.0.2").status_code, 404)
+
+        self.assertEqual(
+            {key: value for key, value in throttling.stats().items() if key.startswith("login")},
+            {"login:ip": {"allowed": 4, "rejected": 1}, "login:user": {"allowed": 3, "rejected": 1}},
+        )
+
+    def test_forwarded_for_header_does_not_reset_the_ip_bucket(self):
+        from django.conf import settings
+        from django.test import override_settings
+
+        with override_settings(THROTTLE_RATES={"login:ip": "2/min"}):
+            codes = [
+                self.client.post(
+                    "/api/v1/auth/login/", {"email": f"x{i}@test.com", "password": "wrong"}, format="json",
+                    REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR=f"192.0.2.{i}",
+                ).status_code
+                for i in range(3)
+            ]
+            self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
+
+            # Derrière un proxy : l'adresse ajoutée par le proxy, pas celles envoyées par le client
+            rest = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+            with override_settings(REST_FRAMEWORK=rest):
+                codes = [
+                    self.client.post(
+                        "/api/v1/auth/login/", {"email": f"y{i}@test.com", "password": "wrong"}, format="json",
+                        REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR=f"192.0.2.{i}, 203.0.113.7",
+                    ).status_code
+                    for i in range(3)
+                ]
+                self.assertEqual(codes[2], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_booking_is_limited_per_user_and_stats_are_staff_only(self):
+        self.client.force_authenticate(self.user)
+        first = self.client.post("/api/v1/appointments/create/", {}, format="json")
+        self.assertEqual(first.status_code, status.HTTP_403_FORBIDDEN)
+        second = self.client.post("/api/v1/appointments/create/", {}, format="json")
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.assertEqual(self.client.get("/api/v1/throttles/stats/").status_code, status.HTTP_403_FORBIDDEN)
+        staff = User.objects.create_user(username="throttle_staff", email="throttle_staff@test.com", is_staff=True)
+        self.client.force_authenticate(staff)
+        res = self.client.get("/api/v1/throttles/stats/")
+        self.assertEqual(res.data["store"], "memory")
+        self.assertEqual(res.data["rates"]["booking:user"], {"allowed": 1, "rejected": 1})
+
+    def test_cache_store_shares_buckets(self):
+        from django.test import override_settings
+        from . import throttling
+
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "throttle-tests"}}
+        ):
+            first, second = throttling.CacheStore(), throttling.CacheStore()
+            self.assertTrue(first.consume("k", 1, 0.01)[0])
+            self.assertFalse(second.consume("k", 1, 0.01)[0])
+            first.incr("x:ip:allowed")
+            second.incr("x:ip:allowed")
+            self.assertEqual(first.counters(["x:ip:allowed", "x:ip:rejected"]), {"x:ip:allowed": 2, "x:ip:rejected": 0})
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        from django.test import override_settings
+
+        rates = override_settings(THROTTLE_RATES={})
+        rates.enable()
+        self.addCleanup(rates.disable)
+
+        self.service = Service.objects.create(name="Plomberie", description="Test", is_active=True)
+        self.user = User.objects.create_user(username="idem_client", email="idem_client@test.com", role="client")
+        self.profile = Client.objects.create(user=self.user, name="Client Idem", email="idem_client@test.com")
+        employer_user = User.objects.create_user(username="idem_employer", email="idem_employer@test.com", role="employer")
+        self.employer = Employer.objects.create(
+            user=employer_user, name="Employer Idem", email="idem_employer@test.com", service=self.service, is_active=True
+        )
+        self.appointment = Appointment.objects.create(
+            client=self.profile,
+            employer=self.employer,
+            service=self.service,
+            date=timezone.now() + timedelta(days=1),
+            status="accepté",
+        )
+        self.client.force_authenticate(self.user)
+
+    def book(self, key=None, hour=10):
+        payload = {
+            "service": self.service.id,
+            "employer": self.employer.id,
+            "date": (timezone.now() + timedelta(days=3)).date().isoformat(),
+            "time": f"{hour}:00",
+        }
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        # Mise en file outbox après commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/v1/appointments/create/", payload, format="json", **headers)
+
+    def pay(self, key=None, method="carte"):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/v1/appointments/{self.appointment.id}/payment/", {"payment_method": method}, format="json", **headers
+            )
+
+    def test_retry_replays_the_first_booking(self):
+        from .models import NotificationOutbox
+
+        first = self.book("booking-1")
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED, first.data)
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self.book("booking-1")
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(retry.data["id"], first.data["id"])
+        # Une lecture de la clé, avant les throttles : la vue n'est pas exécutée
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(Appointment.objects.filter(client=self.profile).count(), 2)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_replay_does_not_consume_a_booking_token(self):
+        from django.test import override_settings
+        from . import throttling
+
+        throttling.reset_store()
+        self.addCleanup(throttling.reset_store)
+        with override_settings(THROTTLE_RATES={"booking:user": "1/h"}):
+            self.assertEqual(self.book("booking-3").status_code, status.HTTP_201_CREATED)
+            for _ in range(3):
+                retry = self.book("booking-3")
+                self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+                self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+            # Nouvelle clé ou clé réutilisée pour une autre requête : limitées
+            self.assertEqual(self.book("booking-4", hour=11).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertEqual(self.book("booking-3", hour=11).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_same_key_for_another_request_is_rejected(self):
+        self.assertEqual(self.book("booking-2", hour=10).status_code, status.HTTP_201_CREATED)
+        res = self.book("booking-2", hour=11)
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertIn("error", res.data)
+        # Même clé sur un autre scope : indépendante
+        self.assertEqual(self.pay("booking-2").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.book("x" * 256).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_payment_without_key_runs_every_time(self):
+        from .models import IdempotencyKey, NotificationOutbox
+
+        self.pay()
+        self.pay()
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.pay("pay-1")
+        res = self.pay("pay-1")
+        self.assertEqual(res.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(NotificationOutbox.objects.count(), 3)
+
+    def test_server_error_releases_the_key(self):
+        from unittest import mock
+        from .models import IdempotencyKey
+
+        with mock.patch("appointments.views.create_notification", side_effect=RuntimeError("panne")):
+            self.assertEqual(self.pay("pay-2").status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        res = self.pay("pay-2")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Idempotent-Replayed", res.headers)
+        self.assertEqual(IdempotencyKey.objects.get().response_status, 200)
+
+    def test_concurrent_duplicate_waits_for_the_first_response(self):
+        from unittest import mock
+        from django.test import override_settings
+        from .models import IdempotencyKey, NotificationOutbox
+
+        first = self.pay("pay-3")
+        stored = IdempotencyKey.objects.get()
+        # Première requête encore en cours
+        IdempotencyKey.objects.filter(pk=stored.pk).update(response_status=None, response_body=None)
+
+        def first_request_finishes(seconds):
+            IdempotencyKey.objects.filter(pk=stored.pk).update(response_status=200, response_body=first.data)
+
+        with mock.patch("appointments.idempotency.time.sleep", side_effect=first_request_finishes) as sleep:
+            res = self.pay("pay-3")
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+        IdempotencyKey.objects.filter(pk=stored.pk).update(response_status=None, response_body=None)
+        with override_settings(IDEMPOTENCY_WAIT_SECONDS=0):
+            self.assertEqual(self.pay("pay-3").status_code, status.HTTP_409_CONFLICT)
+        # Attente plafonnée quel que soit le réglage
+        clock = iter(range(0, 1000))
+        with override_settings(IDEMPOTENCY_WAIT_SECONDS=60), mock.patch(
+            "appointments.idempotency.time.monotonic", side_effect=lambda: next(clock)
+        ), mock.patch("appointments.idempotency.time.sleep") as sleep:
+            self.assertEqual(self.pay("pay-3").status_code, status.HTTP_409_CONFLICT)
+        self.assertLessEqual(sleep.call_count, 2)
+
+        # Réservation abandonnée (processus tué) : reprise
+        IdempotencyKey.objects.filter(pk=stored.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        res = self.pay("pay-3")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Idempotent-Replayed", res.headers)
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+
+    def test_expired_keys_are_reused_and_purged(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import IdempotencyKey
+
+        self.pay("pay-4")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        res = self.pay("pay-4")
+        self.assertNotIn("Idempotent-Replayed", res.headers)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+        now = timezone.now()
+        IdempotencyKey.objects.bulk_create(
+            IdempotencyKey(
+                user=self.user, scope="payment", key=f"old-{i}", fingerprint="0" * 64,
+                response_status=200, response_body={}, expires_at=now - timedelta(hours=1),
+            )
+            for i in range(5)
+        )
+        out = StringIO()
+        call_command("purge_idempotency_keys", "--chunk-size", "2", stdout=out)
+        self.assertIn("5 clés d'idempotence expirées supprimées en 3 lots", out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["pay-4"])
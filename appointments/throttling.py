@@ -0,0 +1,214 @@
+# appointments/throttling.py
+"""
+Limitation de débit par seau à jetons (token bucket).
+
+Chaque vue limitée déclare `throttle_scope` ("login", "register",
+"booking") et ses throttles (IPThrottle, UserThrottle). Le débit de chaque
+couple vient de THROTTLE_RATES["<scope>:ip"] / ["<scope>:user"] :
+- "10/min" : seau de 10 jetons, rempli de 10 jetons par minute ;
+- {"rate": "10/min", "burst": 20} : idem avec une rafale de 20 ;
+- absent ou None : pas de limite.
+UserThrottle limite l'utilisateur authentifié ou, sur une vue anonyme,
+l'identifiant envoyé (`throttle_user_field`, l'email du login).
+
+Un refus coûte une lecture du seau : la vue (authenticate et son hachage
+PBKDF2, écritures...) n'est pas exécutée ; DRF répond 429 avec Retry-After.
+L'IP est celle de DRF selon REST_FRAMEWORK["NUM_PROXIES"] : REMOTE_ADDR avec
+0 (défaut), sinon l'adresse ajoutée à X-Forwarded-For par le dernier proxy ;
+un X-Forwarded-For envoyé par le client ne change pas de seau.
+
+Les seaux sont dans un store (THROTTLE_STORE) :
+- "memory" : (défaut) dictionnaire du processus, borné à THROTTLE_MEMORY_MAX_KEYS ;
+- "cache"  : cache Django THROTTLE_CACHE, partagé entre workers si le cache
+  l'est (Redis, Memcached, DatabaseCache sur SQLite...) ; lecture puis
+  écriture non atomiques : en rafale concurrente, quelques requêtes de plus
+  peuvent passer ;
+- chemin.vers.Store.
+Compteurs de requêtes acceptées / refusées par "<scope>:<type>" : `stats()`,
+exposés à l'équipe par /throttles/stats/.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def parse_rate(rate):
+    """(capacité, jetons par seconde) ou None ("10/min", {"rate": "10/min", "burst": 20})."""
+    if not rate:
+        return None
+    burst = None
+    if isinstance(rate, dict):
+        burst = rate.get("burst")
+        rate = rate["rate"]
+    count, _, period = str(rate).partition("/")
+    count = int(count)
+    seconds = PERIODS[period.strip().lower()]
+    return (int(burst or count), count / seconds)
+
+
+def get_rate(key):
+    return parse_rate(getattr(settings, "THROTTLE_RATES", {}).get(key))
+
+
+# -----------------------------
+# Stores
+# -----------------------------
+def refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def take(tokens, rate):
+    """(accepté, jetons restants, attente en secondes avant le prochain jeton)."""
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryStore:
+    name = "memory"
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or getattr(settings, "THROTTLE_MEMORY_MAX_KEYS", 100000)
+        self._lock = threading.Lock()
+        # clé -> (jetons, mise à jour) ; les seaux les moins récents sortent en premier
+        self._buckets = OrderedDict()
+        self._counters = Counter()
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            allowed, tokens, wait = take(refill(tokens, updated, now, capacity, rate), rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # Seau évincé : repart plein (au pire un peu plus permissif)
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def incr(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def counters(self, names):
+        with self._lock:
+            return {name: self._counters[name] for name in names}
+
+
+class CacheStore:
+    name = "cache"
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or getattr(settings, "THROTTLE_CACHE", "default")]
+
+    def consume(self, key, capacity, rate, now=None):
+        # Horloge murale : partagée entre processus
+        now = time.time() if now is None else now
+        tokens, updated = self.cache.get(key) or (capacity, now)
+        allowed, tokens, wait = take(refill(tokens, updated, now, capacity, rate), rate)
+        # Expiration quand le seau serait de nouveau plein
+        self.cache.set(key, (tokens, now), math.ceil((capacity - tokens) / rate) + 1)
+        return allowed, wait
+
+    def incr(self, counter):
+        key = f"throttle-count:{counter}"
+        if not self.cache.add(key, 1, None):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, 1, None)
+
+    def counters(self, names):
+        values = self.cache.get_many([f"throttle-count:{name}" for name in names])
+        return {name: values.get(f"throttle-count:{name}", 0) for name in names}
+
+
+STORES = {store.name: store for store in (MemoryStore, CacheStore)}
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        store = getattr(settings, "THROTTLE_STORE", MemoryStore.name)
+        if isinstance(store, str):
+            store = STORES.get(store) or import_string(store)
+        _store = store() if isinstance(store, type) else store
+    return _store
+
+
+def reset_store():
+    # Nouveau store au prochain appel (tests, changement de THROTTLE_STORE)
+    global _store
+    _store = None
+
+
+def stats():
+    """{"<scope>:<type>": {"allowed": n, "rejected": m}} des débits configurés."""
+    keys = sorted(getattr(settings, "THROTTLE_RATES", {}))
+    values = get_store().counters([f"{key}:{outcome}" for key in keys for outcome in ("allowed", "rejected")])
+    return {key: {outcome: values[f"{key}:{outcome}"] for outcome in ("allowed", "rejected")} for key in keys}
+
+
+# -----------------------------
+# Throttles DRF
+# -----------------------------
+class TokenBucketThrottle(BaseThrottle):
+    kind = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        # Déjà refusée par un throttle précédent : DRF répond 429, on ne vide pas les autres seaux
+        if getattr(request, "_token_bucket_rejected", False):
+            return True
+        scope = getattr(view, "throttle_scope", None)
+        rate = get_rate(f"{scope}:{self.kind}") if scope else None
+        if rate is None:
+            return True
+        ident = self.get_key(request, view)
+        if ident is None:
+            return True
+        store = get_store()
+        allowed, wait = store.consume(f"throttle:{scope}:{self.kind}:{ident}", *rate)
+        store.incr(f"{scope}:{self.kind}:{'allowed' if allowed else 'rejected'}")
+        if not allowed:
+            self.wait_seconds = wait
+            request._token_bucket_rejected = True
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class IPThrottle(TokenBucketThrottle):
+    kind = "ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    kind = "user"
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        field = getattr(view, "throttle_user_field", None)
+        value = request.data.get(field) if field and hasattr(request.data, "get") else None
+        if not value:
+            return None
+        # Valeur envoyée par le client : hachée (clé de cache courte, sans caractères interdits)
+        return "id-" + hashlib.sha256(str(value).strip().lower().encode()).hexdigest()[:32]
@@ -12,6 +12,7 @@ from .views import (
     LoginView,
     LogoutView,
     UserProfile,
+    ThrottleStats,
     # Appointments
     AppointmentList,
     CreateAppointment,
@@ -22,15 +23,28 @@ from .views import (
     # Profiles
     ClientProfile,
     EmployerList,
+    EmployerDetail,
+    EmployerNearby,
     EmployerProfile,
     EmployerUpdate,
     EmployerAvailability,
+    EmployerSlots,
+    EmployerReviews,
     # Services
     ServiceList,
+    ServiceSearch,
+    ServiceNearby,
+    Autocomplete,
     ServiceDetail,
+    ServiceEmployerSuggestions,
     # Notifications
     NotificationList,
     MarkNotificationRead,
+    MarkNotificationsRead,
+    ArchiveNotifications,
+    DeleteNotifications,
+    UnreadNotificationCount,
+    notification_stream,
     # Payments
     ProcessPayment,
 )
@@ -43,6 +57,7 @@ urlpatterns = [
     path("auth/login/", LoginView.as_view(), name="login"),
     path("auth/logout/", LogoutView.as_view(), name="logout"),
     path("auth/user/", UserProfile.as_view(), name="user_profile"),
+    path("throttles/stats/", ThrottleStats.as_view(), name="throttle_stats"),
 
     # 📅 Appointments
     path("appointments/", AppointmentList.as_view(), name="appointment_list"),
@@ -57,16 +72,29 @@ urlpatterns = [
 
     # 👷 Employer
     path("employers/", EmployerList.as_view(), name="employer_list"),
+    path("employers/nearby/", EmployerNearby.as_view(), name="employer_nearby"),
     path("employers/profile/", EmployerProfile.as_view(), name="employer_profile"),
     path("employers/update/", EmployerUpdate.as_view(), name="employer_update"),
+    path("employers/<int:pk>/", EmployerDetail.as_view(), name="employer_detail"),
     path("employers/<int:employer_id>/availabilities/", EmployerAvailability.as_view(), name="employer_availability"),
+    path("employers/<int:employer_id>/slots/", EmployerSlots.as_view(), name="employer_slots"),
+    path("employers/<int:employer_id>/reviews/", EmployerReviews.as_view(), name="employer_reviews"),
 
     # 🛠️ Services
     path("services/", ServiceList.as_view(), name="service_list"),
+    path("services/search/", ServiceSearch.as_view(), name="service_search"),
+    path("services/nearby/", ServiceNearby.as_view(), name="service_nearby"),
+    path("autocomplete/", Autocomplete.as_view(), name="autocomplete"),
     path("services/<int:pk>/", ServiceDetail.as_view(), name="service_detail"),
+    path("services/<int:pk>/employers/suggested/", ServiceEmployerSuggestions.as_view(), name="service_employer_suggestions"),
 
     # 🔔 Notifications
     path("notifications/", NotificationList.as_view(), name="notification_list"),
+    path("notifications/stream/", notification_stream, name="notification_stream"),
+    path("notifications/unread-count/", UnreadNotificationCount.as_view(), name="notification_unread_count"),
+    path("notifications/read/", MarkNotificationsRead.as_view(), name="notifications_read"),
+    path("notifications/archive/", ArchiveNotifications.as_view(), name="notifications_archive"),
+    path("notifications/delete/", DeleteNotifications.as_view(), name="notifications_delete"),
     path("notifications/<int:notification_id>/read/", MarkNotificationRead.as_view(), name="mark_notification_read"),
 
     # 💳 Payments
@@ -1,36 +1,49 @@
 # appointments/views.py
-from datetime import datetime
-import random
+from datetime import datetime, timedelta
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import DateTimeField
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.text import slugify
 
 from rest_framework import generics, status
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.generics import ListAPIView, RetrieveAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 
+from .authentication import ClaimsJWTAuthentication, ProfileRefreshToken, load_profile, load_user
 from .models import Appointment, Client, Employer, Service, Availability, Notification
+from . import assignment, autocomplete, booking, employer_search, geo, notifications, outbox, realtime, reviews, search, slots, throttling
+from .booking import BookingConflict
+from .fast_serializers import CompiledListMixin
+from .idempotency import ReplayBeforeThrottleMixin, idempotent
+from .pagination import AppointmentPagination, EmployerPagination, NotificationPagination, ReviewPagination
+from .prefetching import plan_queryset
 from .serializers import (
     AppointmentSerializer,
     AppointmentCreateSerializer,
     AppointmentReviewSerializer,
     ClientSerializer,
+    EmployerReviewSerializer,
     EmployerSerializer,
     EmployerUpdateSerializer,
     ServiceSerializer,
     AvailabilitySerializer,
+    AvailabilityScheduleSerializer,
     NotificationSerializer,
     UserSerializer,
 )
+from .throttling import IPThrottle, UserThrottle
 
 User = get_user_model()
 
@@ -39,36 +52,43 @@ User = get_user_model()
 # Utils
 # -----------------------------
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    # role / client_id / employer_id dans le jeton (voir authentication.py)
+    refresh = ProfileRefreshToken.for_user(user)
     return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 
 def create_notification(user, notification_type, title, message, appointment=None):
-    Notification.objects.create(
-        recipient=user,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        appointment=appointment,
-    )
+    # Mise en file dans la transaction de l'appelant ; la notification est créée par le worker (outbox.py)
+    outbox.enqueue(user, notification_type, title, message, appointment=appointment)
+
+
+# Borne haute exclusive d'un préfixe (après le dernier caractère possible)
+PREFIX_UPPER = "\U0010ffff"
+USERNAME_ATTEMPTS = 5
 
 
 def generate_unique_username(email=None, first_name="", last_name=""):
+    """
+    base, sinon base1, base2... (premier suffixe libre). Une seule requête :
+    les usernames commençant par `base` (intervalle sur l'index unique, là où
+    un LIKE ne l'utiliserait pas sous SQLite), suffixe calculé en mémoire.
+    Une inscription concurrente peut prendre le même nom : voir RegisterView.
+    """
     base = ""
     if email:
         base = email.split("@")[0]
     if not base:
         base = f"{first_name}.{last_name}".strip(".")
-    base = slugify(base) or "user"
+    base = slugify(base)[:140] or "user"
 
+    taken = set(
+        User.objects.filter(username__gte=base, username__lt=base + PREFIX_UPPER).values_list("username", flat=True)
+    )
     candidate = base
     i = 0
-    while User.objects.filter(username=candidate).exists():
+    while candidate in taken:
         i += 1
         candidate = f"{base}{i}"
-        if i > 9999:
-            candidate = f"{base}{random.randint(10000, 99999)}"
-            break
     return candidate
 
 
@@ -170,7 +190,8 @@ def normalize_appointment_payload(data):
 
 def auto_pick_employer_if_missing(data):
     """
-    Si employer absent, essaye de prendre le premier employeur actif lié au service.
+    Si employer absent, choisit un employeur actif du service, libre à la date
+    demandée, selon la stratégie d'affectation (voir assignment.py).
     (Mais Appointment.employer est obligatoire => si introuvable, on renverra 400)
     """
     if data.get("employer"):
@@ -187,13 +208,50 @@ def auto_pick_employer_if_missing(data):
     # Normalise le payload pour le serializer ModelSerializer attendu (PK)
     data["service"] = service_obj.id
 
-    employer = Employer.objects.filter(service=service_obj, is_active=True).first()
+    start = data.get("date") if isinstance(data.get("date"), datetime) else None
+    try:
+        duration = booking.resolve_duration(data.get("estimated_duration"), service_obj)
+    except (TypeError, ValueError):
+        duration = booking.resolve_duration(service=service_obj)
+
+    employer = assignment.pick_employer(service_obj.id, start, duration)
     if employer:
         data["employer"] = employer.id
 
     return data
 
 
+def parse_nearby_params(params, max_radius_km=200, default_limit=20):
+    """
+    (lat, lng, radius_km, limit) depuis ?lat=&lng=&radius_km=&limit=,
+    ou (None, message d'erreur).
+    """
+    try:
+        lat = float(params["lat"])
+        lng = float(params["lng"])
+        radius_km = float(params.get("radius_km") or 10)
+        limit = int(params.get("limit") or default_limit)
+    except (KeyError, ValueError):
+        return None, "Paramètres lat, lng (et radius_km, limit) numériques requis."
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None, "Coordonnées hors limites."
+    if not 0 < radius_km <= max_radius_km:
+        return None, f"radius_km doit être compris entre 0 et {max_radius_km}."
+    limit = max(1, min(limit, getattr(settings, "API_MAX_PAGE_SIZE", 100)))
+    return (lat, lng, radius_km, limit), None
+
+
+def nearby_response(request, queryset, serializer_class, params):
+    # queryset -> [(pk, distance)] triés, puis une requête (planifiée) pour les objets
+    lat, lng, radius_km, limit = params
+    hits = geo.nearby(queryset, lat, lng, radius_km, limit=limit)
+    objects = plan_queryset(queryset.model.objects.filter(pk__in=[pk for pk, _ in hits]), serializer_class).in_bulk()
+    data = serializer_class([objects[pk] for pk, _ in hits], many=True, context={"request": request}).data
+    for item, (_, distance) in zip(data, hits):
+        item["distance_km"] = round(distance, 3)
+    return Response({"lat": lat, "lng": lng, "radius_km": radius_km, "results": data})
+
+
 def user_appointments_queryset(user):
     qs = Appointment.objects.all().order_by("-date")
 
@@ -214,6 +272,8 @@ def user_appointments_queryset(user):
 # -----------------------------
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [IPThrottle]
+    throttle_scope = "register"
 
     def post(self, request):
         """
@@ -260,6 +320,7 @@ class RegisterView(APIView):
             role = "client"
 
         # Username auto
+        auto_username = not raw.get("username")
         username = raw.get("username") or generate_unique_username(
             email=email,
             first_name=raw.get("first_name", "") or "",
@@ -286,51 +347,71 @@ class RegisterView(APIView):
             "password": password,
         }
 
-        serializer = UserSerializer(data=user_data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            with transaction.atomic():
-                user = serializer.save()
-
-                full_name = f"{user.first_name} {user.last_name}".strip()
-                display_name = full_name or user.username
-
-                if role == "client":
-                    Client.objects.create(
-                        user=user,
-                        name=display_name,
-                        email=user.email,
-                        phone=phone or "",
-                        address=address or None,
-                    )
-                else:
-                    service_obj = resolve_service(service_value)
-                    if service_value and not service_obj:
-                        return Response({"service_type": ["Service introuvable."]}, status=status.HTTP_400_BAD_REQUEST)
-
-                    Employer.objects.create(
-                        user=user,
-                        name=display_name,
-                        email=user.email,
-                        phone=phone or "",
-                        service=service_obj,
-                        description=service_description or None,
-                    )
-
-            tokens = get_tokens_for_user(user)
+            # Username généré pris entre-temps par une inscription concurrente :
+            # nouveau calcul puis nouvel essai
+            for _ in range(USERNAME_ATTEMPTS):
+                serializer = UserSerializer(data=user_data)
+                if serializer.is_valid():
+                    try:
+                        return self.create_account(serializer, role, phone, address, service_value, service_description)
+                    except IntegrityError:
+                        if not auto_username or not User.objects.filter(username=user_data["username"]).exists():
+                            raise
+                elif not auto_username or set(serializer.errors) != {"username"}:
+                    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                user_data["username"] = generate_unique_username(
+                    email=email, first_name=user_data["first_name"], last_name=user_data["last_name"]
+                )
             return Response(
-                {"user": UserSerializer(user).data, "refresh": tokens["refresh"], "access": tokens["access"]},
-                status=status.HTTP_201_CREATED,
+                {"username": ["Nom d'utilisateur indisponible, réessayez."]}, status=status.HTTP_409_CONFLICT
             )
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def create_account(self, serializer, role, phone, address, service_value, service_description):
+        with transaction.atomic():
+            user = serializer.save()
+
+            full_name = f"{user.first_name} {user.last_name}".strip()
+            display_name = full_name or user.username
+
+            if role == "client":
+                Client.objects.create(
+                    user=user,
+                    name=display_name,
+                    email=user.email,
+                    phone=phone or "",
+                    address=address or None,
+                )
+            else:
+                service_obj = resolve_service(service_value)
+                if service_value and not service_obj:
+                    return Response({"service_type": ["Service introuvable."]}, status=status.HTTP_400_BAD_REQUEST)
+
+                Employer.objects.create(
+                    user=user,
+                    name=display_name,
+                    email=user.email,
+                    phone=phone or "",
+                    service=service_obj,
+                    description=service_description or None,
+                )
+
+        tokens = get_tokens_for_user(user)
+        return Response(
+            {"user": UserSerializer(user).data, "refresh": tokens["refresh"], "access": tokens["access"]},
+            status=status.HTTP_201_CREATED,
+        )
+
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    # Par IP et par email visé : refusé avant authenticate (PBKDF2)
+    throttle_classes = [IPThrottle, UserThrottle]
+    throttle_scope = "login"
+    throttle_user_field = "email"
 
     def post(self, request):
         email = request.data.get("email")
@@ -361,7 +442,7 @@ class LogoutView(APIView):
             return Response({"error": "Refresh token requis."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            token = RefreshToken(refresh_token)
+            token = ProfileRefreshToken(refresh_token)
             try:
                 token.blacklist()
             except Exception:
@@ -371,26 +452,42 @@ class LogoutView(APIView):
             return Response({"error": "Token invalide"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ThrottleStats(APIView):
+    """
+    GET /throttles/stats/ (staff)
+    Requêtes acceptées / refusées par débit configuré (voir throttling.py).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        store = throttling.get_store()
+        return Response({"store": getattr(store, "name", type(store).__name__), "rates": throttling.stats()})
+
+
 # -----------------------------
 # 📅 APPOINTMENTS
 # -----------------------------
-class AppointmentList(ListAPIView):
+class AppointmentList(CompiledListMixin, ListAPIView):
     """
     GET /appointments/
     """
     permission_classes = [IsAuthenticated]
     serializer_class = AppointmentSerializer
+    pagination_class = AppointmentPagination
 
     def get_queryset(self):
-        return user_appointments_queryset(self.request.user)
+        return plan_queryset(user_appointments_queryset(self.request.user), self.get_serializer())
 
 
-class CreateAppointment(APIView):
+class CreateAppointment(ReplayBeforeThrottleMixin, APIView):
     """
     POST /appointments/create/
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [IPThrottle, UserThrottle]
+    throttle_scope = "booking"
 
+    @idempotent("booking")
     def post(self, request):
         if not hasattr(request.user, "client"):
             return Response({"error": "Seuls les clients peuvent créer un rendez-vous."}, status=status.HTTP_403_FORBIDDEN)
@@ -404,20 +501,26 @@ class CreateAppointment(APIView):
 
             serializer = AppointmentCreateSerializer(data=data)
             if serializer.is_valid():
-                appointment = serializer.save(client=request.user.client)
-
-                create_notification(
-                    user=appointment.employer.user,
-                    notification_type="appointment_request",
-                    title="Nouvelle demande de rendez-vous",
-                    message=f"Un nouveau rendez-vous a été demandé par {appointment.client.name}",
-                    appointment=appointment,
-                )
+                # Rendez-vous et événement de notification dans la même transaction
+                with transaction.atomic():
+                    appointment = serializer.save(client=request.user.client)
+                    # Relu avec client / prestataire : request.user.client peut être le profil partiel du jeton
+                    appointment = plan_queryset(Appointment.objects.filter(pk=appointment.pk), AppointmentSerializer).get()
+
+                    create_notification(
+                        user=appointment.employer.user,
+                        notification_type="appointment_request",
+                        title="Nouvelle demande de rendez-vous",
+                        message=f"Un nouveau rendez-vous a été demandé par {appointment.client.name}",
+                        appointment=appointment,
+                    )
 
                 return Response(AppointmentSerializer(appointment).data, status=status.HTTP_201_CREATED)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        except BookingConflict as conflict:
+            return Response({"date": [conflict.message]}, status=status.HTTP_400_BAD_REQUEST)
         except AttributeError:
             return Response({"error": "Le client associé à cet utilisateur est introuvable."}, status=status.HTTP_400_BAD_REQUEST)
         except ValidationError as ve:
@@ -431,7 +534,7 @@ class AppointmentDetail(RetrieveUpdateDestroyAPIView):
     serializer_class = AppointmentSerializer
 
     def get_queryset(self):
-        return user_appointments_queryset(self.request.user)
+        return plan_queryset(user_appointments_queryset(self.request.user), self.get_serializer())
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -441,26 +544,27 @@ class AppointmentDetail(RetrieveUpdateDestroyAPIView):
 
         serializer = self.get_serializer(instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        with transaction.atomic():
+            self.perform_update(serializer)
 
-        instance.refresh_from_db()
+            instance.refresh_from_db()
 
-        if instance.status == "accepté":
-            create_notification(
-                user=instance.client.user,
-                notification_type="appointment_accepted",
-                title="Rendez-vous accepté",
-                message=f"Votre rendez-vous avec {instance.employer.name} a été accepté",
-                appointment=instance,
-            )
-        elif instance.status == "refusé":
-            create_notification(
-                user=instance.client.user,
-                notification_type="appointment_rejected",
-                title="Rendez-vous refusé",
-                message=f"Votre rendez-vous avec {instance.employer.name} a été refusé",
-                appointment=instance,
-            )
+            if instance.status == "accepté":
+                create_notification(
+                    user=instance.client.user,
+                    notification_type="appointment_accepted",
+                    title="Rendez-vous accepté",
+                    message=f"Votre rendez-vous avec {instance.employer.name} a été accepté",
+                    appointment=instance,
+                )
+            elif instance.status == "refusé":
+                create_notification(
+                    user=instance.client.user,
+                    notification_type="appointment_rejected",
+                    title="Rendez-vous refusé",
+                    message=f"Votre rendez-vous avec {instance.employer.name} a été refusé",
+                    appointment=instance,
+                )
 
         return Response(serializer.data)
 
@@ -476,14 +580,15 @@ class AppointmentReview(APIView):
             appointment = user_appointments_queryset(request.user).get(id=pk)
             serializer = AppointmentReviewSerializer(appointment, data=request.data)
             if serializer.is_valid():
-                serializer.save()
-                create_notification(
-                    user=appointment.employer.user,
-                    notification_type="review_received",
-                    title="Nouvel avis reçu",
-                    message=f"Vous avez reçu un nouvel avis de {appointment.client.name}",
-                    appointment=appointment,
-                )
+                with transaction.atomic():
+                    serializer.save()
+                    create_notification(
+                        user=appointment.employer.user,
+                        notification_type="review_received",
+                        title="Nouvel avis reçu",
+                        message=f"Vous avez reçu un nouvel avis de {appointment.client.name}",
+                        appointment=appointment,
+                    )
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Appointment.DoesNotExist:
@@ -508,9 +613,14 @@ class AddReview(generics.UpdateAPIView):
         if feedback is None or rating is None:
             return Response({"error": "Les champs 'feedback' et 'rating' sont obligatoires."}, status=status.HTTP_400_BAD_REQUEST)
 
-        instance.feedback = feedback
-        instance.rating = rating
-        instance.save()
+        try:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
+            return Response({"rating": ["La note doit être entre 1 et 5."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        reviews.submit_review(instance, rating, feedback)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -522,28 +632,30 @@ class AppointmentPayment(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent("payment")
     def post(self, request, pk):
         try:
-            appointment = user_appointments_queryset(request.user).get(pk=pk)
+            appointment = plan_queryset(user_appointments_queryset(request.user), AppointmentSerializer).get(pk=pk)
 
-            if not hasattr(request.user, "client") or request.user != appointment.client.user:
+            if not hasattr(request.user, "client") or request.user.pk != appointment.client.user_id:
                 return Response({"error": "Vous n'êtes pas autorisé à effectuer ce paiement"}, status=status.HTTP_403_FORBIDDEN)
 
             payment_method = request.data.get("payment_method")
             if payment_method not in dict(Appointment.PAYMENT_CHOICES):
                 return Response({"error": "Mode de paiement invalide"}, status=status.HTTP_400_BAD_REQUEST)
 
-            appointment.payment_method = payment_method
-            appointment.is_paid = True
-            appointment.save()
+            with transaction.atomic():
+                appointment.payment_method = payment_method
+                appointment.is_paid = True
+                appointment.save()
 
-            create_notification(
-                user=appointment.employer.user,
-                notification_type="payment_received",
-                title="Paiement reçu",
-                message=f"Le paiement pour le rendez-vous avec {appointment.client.name} a été reçu",
-                appointment=appointment,
-            )
+                create_notification(
+                    user=appointment.employer.user,
+                    notification_type="payment_received",
+                    title="Paiement reçu",
+                    message=f"Le paiement pour le rendez-vous avec {appointment.client.name} a été reçu",
+                    appointment=appointment,
+                )
 
             return Response({"message": "Paiement enregistré avec succès", "appointment": AppointmentSerializer(appointment).data})
         except Appointment.DoesNotExist:
@@ -559,6 +671,7 @@ class ProcessPayment(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @idempotent("payment")
     def post(self, request, appointment_id=None):
         try:
             resolved_appointment_id = (
@@ -573,16 +686,17 @@ class ProcessPayment(APIView):
 
             payment_method = request.data.get("payment_method")
             if payment_method == "carte":
-                appointment.is_paid = True
-                appointment.save()
-
-                create_notification(
-                    user=appointment.employer.user,
-                    notification_type="payment_received",
-                    title="Paiement reçu",
-                    message=f"Le paiement pour le rendez-vous avec {appointment.client.name} a été reçu",
-                    appointment=appointment,
-                )
+                with transaction.atomic():
+                    appointment.is_paid = True
+                    appointment.save()
+
+                    create_notification(
+                        user=appointment.employer.user,
+                        notification_type="payment_received",
+                        title="Paiement reçu",
+                        message=f"Le paiement pour le rendez-vous avec {appointment.client.name} a été reçu",
+                        appointment=appointment,
+                    )
                 return Response({"message": "Paiement traité avec succès"})
 
             return Response({"message": "Paiement en espèces à effectuer sur place"})
@@ -598,22 +712,59 @@ class ClientProfile(generics.RetrieveUpdateAPIView):
     serializer_class = ClientSerializer
 
     def get_object(self):
-        if not hasattr(self.request.user, "client"):
+        client = load_profile(self.request.user, "client")
+        if client is None:
             raise PermissionDenied("Profil client introuvable.")
-        return self.request.user.client
+        return client
 
 
-class EmployerList(ListAPIView):
+class EmployerList(CompiledListMixin, ListAPIView):
+    """
+    GET /employers/?service=&min_rate=&max_rate=&min_rating=&verified=&city=&category=&free_at=&sort=
+    Voir employer_search.py pour les filtres et les tris.
+    """
     permission_classes = [AllowAny]
     queryset = Employer.objects.filter(is_active=True)
     serializer_class = EmployerSerializer
+    pagination_class = EmployerPagination
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        service_id = self.request.query_params.get("service", None)
-        if service_id:
-            queryset = queryset.filter(service_id=service_id)
-        return queryset
+        params = self.request.query_params
+        sort = employer_search.get_sort(params)
+        self.paginator.ordering = employer_search.SORTS[sort]
+        self.paginator.cursor_scope = sort
+        queryset = plan_queryset(super().get_queryset(), self.get_serializer())
+        return employer_search.filter_employers(queryset, params)
+
+
+class EmployerDetail(RetrieveAPIView):
+    """
+    GET /employers/<pk>/
+    Fiche publique d'un prestataire actif (page prestataire du frontend).
+    """
+    permission_classes = [AllowAny]
+    queryset = Employer.objects.filter(is_active=True)
+    serializer_class = EmployerSerializer
+
+    def get_queryset(self):
+        return plan_queryset(super().get_queryset(), self.get_serializer())
+
+
+class EmployerNearby(APIView):
+    """
+    GET /employers/nearby/?lat=&lng=&radius_km=10&limit=20[&service=]
+    Prestataires actifs dans le rayon, du plus proche au plus lointain.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params, error = parse_nearby_params(request.query_params)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Employer.objects.filter(is_active=True)
+        if request.query_params.get("service"):
+            queryset = queryset.filter(service_id=request.query_params["service"])
+        return nearby_response(request, queryset, EmployerSerializer, params)
 
 
 class EmployerUpdate(generics.RetrieveUpdateAPIView):
@@ -621,9 +772,10 @@ class EmployerUpdate(generics.RetrieveUpdateAPIView):
     serializer_class = EmployerUpdateSerializer
 
     def get_object(self):
-        if not hasattr(self.request.user, "employer"):
+        employer = load_profile(self.request.user, "employer")
+        if employer is None:
             raise PermissionDenied("Profil employeur introuvable.")
-        return self.request.user.employer
+        return employer
 
 
 class EmployerProfile(generics.RetrieveUpdateAPIView):
@@ -631,9 +783,10 @@ class EmployerProfile(generics.RetrieveUpdateAPIView):
     serializer_class = EmployerSerializer
 
     def get_object(self):
-        if not hasattr(self.request.user, "employer"):
+        employer = load_profile(self.request.user, "employer")
+        if employer is None:
             raise PermissionDenied("Profil employeur introuvable.")
-        return self.request.user.employer
+        return employer
 
 
 class EmployerAvailability(APIView):
@@ -662,6 +815,110 @@ class EmployerAvailability(APIView):
         except Employer.DoesNotExist:
             return Response({"error": "Employeur non trouvé"}, status=status.HTTP_404_NOT_FOUND)
 
+    def put(self, request, employer_id):
+        """
+        Remplace tout le planning hebdomadaire en une transaction.
+        Corps: [{day_of_week, start_time, end_time, is_available}, ...]
+        (ou {"availabilities": [...]}).
+        """
+        if not hasattr(request.user, "employer") or request.user.employer.id != employer_id:
+            return Response({"error": "Non autorisé."}, status=status.HTTP_403_FORBIDDEN)
+
+        employer = request.user.employer
+        rows = request.data.get("availabilities") if isinstance(request.data, dict) else request.data
+
+        serializer = AvailabilityScheduleSerializer(
+            Availability.objects.filter(employer=employer),
+            data=rows,
+            many=True,
+            context={"employer": employer},
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        schedule = serializer.save()
+        return Response(AvailabilitySerializer(schedule, many=True).data)
+
+
+class EmployerSlots(APIView):
+    """
+    GET /employers/<employer_id>/slots/?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=30&duration=60
+    Créneaux réellement réservables (heure locale Europe/Paris), groupés par jour.
+    """
+    permission_classes = [IsAuthenticated]
+    max_days = 90
+
+    def get(self, request, employer_id):
+        employer = Employer.objects.filter(id=employer_id, is_active=True).values("service__duration").first()
+        if employer is None:
+            return Response({"error": "Employeur non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        today = timezone.localdate()
+        start = parse_date(params["start"]) if params.get("start") else today
+        end = parse_date(params["end"]) if params.get("end") else None
+        if start is None or (params.get("end") and end is None):
+            return Response({"error": "Dates invalides (format YYYY-MM-DD)."}, status=status.HTTP_400_BAD_REQUEST)
+        start = max(start, today)
+        end = end or start + timedelta(days=13)
+        if end < start or (end - start).days >= self.max_days:
+            return Response(
+                {"error": f"La période doit être comprise entre 1 et {self.max_days} jours."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            granularity = int(params.get("granularity") or 30)
+            duration = int(params.get("duration") or employer["service__duration"] or 0) or None
+        except ValueError:
+            return Response({"error": "granularity et duration doivent être des entiers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not 5 <= granularity <= 240:
+            return Response({"error": "granularity doit être entre 5 et 240 minutes."}, status=status.HTTP_400_BAD_REQUEST)
+        if duration is not None and duration <= 0:
+            return Response({"error": "duration doit être positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        duration = booking.resolve_duration(duration)
+        days = slots.free_slots(employer_id, start, end, granularity=granularity, duration=duration)
+        return Response(
+            {
+                "employer": employer_id,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "granularity": granularity,
+                "duration": duration,
+                "timezone": timezone.get_default_timezone_name(),
+                "days": days,
+            }
+        )
+
+
+class EmployerReviews(ListAPIView):
+    """
+    GET /employers/<employer_id>/reviews/?cursor=...
+    Fil public des avis (du plus récent au plus ancien) + histogramme des notes.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = EmployerReviewSerializer
+    pagination_class = ReviewPagination
+
+    def get_queryset(self):
+        return reviews.employer_reviews(self.kwargs["employer_id"])
+
+    def list(self, request, *args, **kwargs):
+        employer = Employer.objects.filter(pk=kwargs["employer_id"]).only(*Employer.RATING_FIELDS).first()
+        if employer is None:
+            return Response({"error": "Employeur non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = super().list(request, *args, **kwargs)
+        response.data = {
+            "employer": employer.pk,
+            "average_rating": employer.average_rating,
+            "total_reviews": employer.total_reviews,
+            "histogram": employer.rating_histogram(),
+            **response.data,
+        }
+        return response
+
 
 # -----------------------------
 # 🛠️ SERVICES
@@ -671,6 +928,80 @@ class ServiceList(ListAPIView):
     queryset = Service.objects.filter(is_active=True)
     serializer_class = ServiceSerializer
 
+    def get_queryset(self):
+        return plan_queryset(super().get_queryset(), self.get_serializer())
+
+
+class ServiceSearch(APIView):
+    """
+    GET /services/search/?q=plomberie&location=paris&category=&min_price=&max_price=&limit=20&offset=0
+    Recherche plein texte côté serveur (voir search.py), résultats classés.
+    """
+    permission_classes = [AllowAny]
+    default_limit = 20
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limit = int(params.get("limit") or self.default_limit)
+            offset = max(0, int(params.get("offset") or 0))
+            min_price = float(params["min_price"]) if params.get("min_price") else None
+            max_price = float(params["max_price"]) if params.get("max_price") else None
+        except ValueError:
+            return Response({"error": "Paramètres numériques invalides."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, getattr(settings, "API_MAX_PAGE_SIZE", 100)))
+
+        # limit + 1 : savoir s'il existe une page suivante sans COUNT
+        ids = search.search_service_ids(
+            params.get("q", ""),
+            location=params.get("location", ""),
+            limit=limit + 1,
+            offset=offset,
+            category=params.get("category") or None,
+            min_price=min_price,
+            max_price=max_price,
+        )
+        has_next, ids = len(ids) > limit, ids[:limit]
+
+        services = plan_queryset(Service.objects.filter(pk__in=ids), ServiceSerializer).in_bulk()
+        serializer = ServiceSerializer([services[pk] for pk in ids if pk in services], many=True, context={"request": request})
+
+        next_link = None
+        if has_next:
+            next_link = replace_query_param(request.build_absolute_uri(), "offset", offset + limit)
+        return Response({"query": params.get("q", ""), "next": next_link, "results": serializer.data})
+
+
+class Autocomplete(APIView):
+    """
+    GET /autocomplete/?q=plom&limit=8
+    Suggestions (services, catégories, villes, prestataires vérifiés) dont un
+    mot commence par q, servies par l'index en mémoire (voir autocomplete.py).
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit") or autocomplete.DEFAULT_LIMIT)
+        except ValueError:
+            return Response({"error": "Paramètre limit invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"query": query, "results": autocomplete.suggest(query, limit)})
+
+
+class ServiceNearby(APIView):
+    """
+    GET /services/nearby/?lat=&lng=&radius_km=10&limit=20
+    Services actifs dans le rayon, du plus proche au plus lointain.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params, error = parse_nearby_params(request.query_params)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        return nearby_response(request, Service.objects.filter(is_active=True), ServiceSerializer, params)
+
 
 class ServiceDetail(RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
@@ -678,15 +1009,54 @@ class ServiceDetail(RetrieveUpdateDestroyAPIView):
     serializer_class = ServiceSerializer
 
 
+class ServiceEmployerSuggestions(APIView):
+    """
+    GET /services/<pk>/employers/suggested/?date=YYYY-MM-DDTHH:MM&duration=60&limit=3
+    Meilleurs prestataires libres pour ce créneau (stratégie d'affectation).
+    """
+    permission_classes = [IsAuthenticated]
+    max_limit = 10
+
+    def get(self, request, pk):
+        service = Service.objects.filter(pk=pk, is_active=True).first()
+        if service is None:
+            return Response({"error": "Service non trouvé"}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        start = None
+        if params.get("date"):
+            start = normalize_appointment_payload({"date": params["date"], "time": params.get("time")}).get("date")
+            if not isinstance(start, datetime):
+                return Response({"error": "Date invalide."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = int(params.get("limit") or 3)
+            duration = booking.resolve_duration(int(params.get("duration") or 0), service)
+        except ValueError:
+            return Response({"error": "limit et duration doivent être des entiers."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+
+        candidates = assignment.candidates(service.id, start, duration)
+        employers = list(plan_queryset(candidates, EmployerSerializer)[:limit])
+        data = EmployerSerializer(employers, many=True, context={"request": request}).data
+        for item, employer in zip(data, employers):
+            item["upcoming_bookings"] = employer.upcoming_bookings
+        return Response(data)
+
+
 # -----------------------------
 # 🔔 NOTIFICATIONS
 # -----------------------------
 class NotificationList(ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificationPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user).order_by("-created_at")
+        # Boîte de réception par défaut ; ?archived=1 : notifications archivées
+        archived = truthy(self.request.query_params.get("archived"))
+        queryset = Notification.objects.filter(recipient=self.request.user, archived_at__isnull=not archived)
+        return plan_queryset(queryset.order_by("-created_at"), self.get_serializer())
 
 
 class MarkNotificationRead(APIView):
@@ -696,13 +1066,125 @@ class MarkNotificationRead(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, notification_id):
-        try:
-            notification = Notification.objects.get(id=notification_id, recipient=request.user)
-            notification.is_read = True
-            notification.save()
-            return Response({"message": "Notification marquée comme lue"})
-        except Notification.DoesNotExist:
+        # UPDATE ... WHERE is_read = False + décrément du compteur (notifications.mark_read)
+        if notifications.mark_read(request.user, notifications.select(request.user, ids=[notification_id])):
+            realtime.unread_changed(request.user.pk)
+        elif not Notification.objects.filter(id=notification_id, recipient=request.user).exists():
             return Response({"error": "Notification non trouvée"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"message": "Notification marquée comme lue"})
+
+
+def parse_bulk_selection(user, data, max_ids=1000):
+    """
+    Sélection d'une action groupée : {"ids": [...]} ou {"all": true},
+    optionnellement {"before": ISO 8601}. (queryset, None) ou (None, message d'erreur).
+    """
+    everything = truthy(data.get("all"))
+    ids = data.get("ids")
+    if everything == (ids is not None):
+        return None, "Indiquer soit ids (liste), soit all=true."
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or len(ids) > max_ids:
+            return None, f"ids doit être une liste de 1 à {max_ids} identifiants."
+        try:
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return None, "ids doit contenir des entiers."
+
+    before = None
+    if data.get("before"):
+        before = parse_datetime(str(data["before"]).replace(" ", "+"))
+        if before is None:
+            return None, "before doit être une date/heure ISO 8601."
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before, timezone.get_current_timezone())
+    return notifications.select(user, ids=ids, before=before), None
+
+
+class NotificationBulkAction(APIView):
+    """
+    POST {"ids": [1, 2]} | {"all": true} [, "before": "2025-01-01T00:00"]
+    Une requête UPDATE / DELETE quelle que soit la sélection ; le compteur
+    de non lues reste cohérent (notifications.py). `operation(user, queryset)`
+    retourne le nombre de notifications modifiées.
+    """
+    permission_classes = [IsAuthenticated]
+    operation = None
+    result_key = None
+
+    def post(self, request):
+        queryset, error = parse_bulk_selection(request.user, request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        count = self.operation(request.user, queryset)
+        if count:
+            realtime.unread_changed(request.user.pk)
+        request.user.refresh_from_db(fields=["unread_notifications"])
+        return Response({self.result_key: count, "unread_count": request.user.unread_notifications})
+
+
+class MarkNotificationsRead(NotificationBulkAction):
+    """POST /notifications/read/ : marque lues (notifications non archivées)."""
+    operation = staticmethod(notifications.mark_read)
+    result_key = "updated"
+
+
+class ArchiveNotifications(NotificationBulkAction):
+    """POST /notifications/archive/ : retire de la boîte de réception."""
+    operation = staticmethod(notifications.archive)
+    result_key = "archived"
+
+
+class DeleteNotifications(NotificationBulkAction):
+    """POST /notifications/delete/ : suppression définitive."""
+    operation = staticmethod(notifications.delete)
+    result_key = "deleted"
+
+
+class UnreadNotificationCount(APIView):
+    """
+    GET /notifications/unread-count/
+    Compteur dénormalisé (User.unread_notifications) : aucune requête sur Notification.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"count": request.user.unread_notifications})
+
+
+def stream_user(request):
+    """Utilisateur du jeton JWT (en-tête Authorization ou ?token=, EventSource n'envoie pas d'en-têtes)."""
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get("token")
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def notification_stream(request):
+    """
+    GET /notifications/stream/?token=<access>
+    Flux SSE des notifications et du compteur de non lues (voir realtime.py).
+    Reprise : en-tête Last-Event-ID (ou ?last_event_id=).
+    """
+    user = await sync_to_async(stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"error": "Authentification requise."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    raw_last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_event_id = int(raw_last_id) if raw_last_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(realtime.event_stream(user.pk, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 # -----------------------------
@@ -713,4 +1195,5 @@ class UserProfile(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        # Utilisateur partiel du jeton (authentication.py) : chargé en entier
+        return load_user(self.request.user)
\ No newline at end of file
@@ -1,9 +1,10 @@
 // frontend/src/components/common/AppointmentCalendar.jsx
-import React, { useMemo, useState } from "react";
+import React, { useEffect, useMemo, useState } from "react";
 import { Box, Paper, Typography, Grid, Button, Chip, Fade } from "@mui/material";
 import { alpha } from "@mui/material/styles";
 import { format, addDays, isSameDay } from "date-fns";
 import { fr } from "date-fns/locale";
+import { employerAPI } from "../../services/api";
 
 const DEFAULT_TIME_SLOTS = ["09:00", "10:00", "11:00", "12:00", "14:00", "15:00", "16:00", "17:00"];
 
@@ -11,11 +12,49 @@ const AppointmentCalendar = ({ onSelectDateTime, provider, timeSlots = DEFAULT_T
   const [selectedDate, setSelectedDate] = useState(null);
   const [selectedTime, setSelectedTime] = useState("");
 
+  // Créneaux réellement libres calculés par le serveur : { "YYYY-MM-DD": ["09:00", ...] }
+  const [serverSlots, setServerSlots] = useState(null);
+
   const availableDates = useMemo(
     () => Array.from({ length: 7 }, (_, i) => addDays(new Date(), i)),
     []
   );
 
+  useEffect(() => {
+    if (!provider?.id) {
+      setServerSlots(null);
+      return undefined;
+    }
+
+    let cancelled = false;
+    employerAPI
+      .getSlots(provider.id, {
+        start: format(availableDates[0], "yyyy-MM-dd"),
+        end: format(availableDates[availableDates.length - 1], "yyyy-MM-dd"),
+      })
+      .then((data) => {
+        if (cancelled) return;
+        const byDate = {};
+        (data?.days ?? []).forEach((day) => {
+          byDate[day.date] = day.slots;
+        });
+        setServerSlots(byDate);
+      })
+      .catch(() => {
+        if (!cancelled) setServerSlots(null); // repli sur les créneaux par défaut
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [provider?.id, availableDates]);
+
+  const slotsForSelectedDate = selectedDate
+    ? serverSlots
+      ? serverSlots[format(selectedDate, "yyyy-MM-dd")] ?? []
+      : timeSlots
+    : [];
+
   const handleDateSelect = (date) => {
     setSelectedDate(date);
     setSelectedTime("");
@@ -96,8 +135,14 @@ const AppointmentCalendar = ({ onSelectDateTime, provider, timeSlots = DEFAULT_T
                 Créneaux horaires disponibles
               </Typography>
 
+              {slotsForSelectedDate.length === 0 && (
+                <Typography variant="body2" color="text.secondary">
+                  Aucun créneau libre ce jour-là.
+                </Typography>
+              )}
+
               <Grid container spacing={1}>
-                {timeSlots.map((time) => {
+                {slotsForSelectedDate.map((time) => {
                   const active = selectedTime === time;
 
                   return (
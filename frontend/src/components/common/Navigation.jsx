@@ -55,6 +55,8 @@ const Navigation = () => {
 
   const [notifications, setNotifications] = useState([]);
   const [notifLoading, setNotifLoading] = useState(false);
+  // Compteur serveur (/notifications/unread-count/ puis SSE) ; null tant qu'inconnu
+  const [serverUnread, setServerUnread] = useState(null);
 
   const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
 
@@ -114,9 +116,44 @@ const Navigation = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [user]);
 
+  // Notifications poussées en temps réel (plus de polling) ; EventSource se
+  // reconnecte seul et renvoie Last-Event-ID pour récupérer les manquées.
+  useEffect(() => {
+    if (!user || typeof EventSource === "undefined") return undefined;
+
+    notificationAPI
+      .unreadCount()
+      .then((data) => setServerUnread((current) => current ?? data?.count ?? null))
+      .catch(() => {});
+
+    const source = notificationAPI.stream();
+    source.addEventListener("notification", (e) => {
+      try {
+        const notification = JSON.parse(e.data);
+        setNotifications((prev) =>
+          prev.some((n) => n.id === notification.id) ? prev : [notification, ...prev]
+        );
+      } catch {
+        // trame ignorée
+      }
+    });
+    source.addEventListener("unread", (e) => {
+      try {
+        setServerUnread(JSON.parse(e.data).count);
+      } catch {
+        // trame ignorée
+      }
+    });
+
+    return () => {
+      source.close();
+      setServerUnread(null);
+    };
+  }, [user]);
+
   const unreadCount = useMemo(
-    () => notifications.filter((n) => n && n.is_read === false).length,
-    [notifications]
+    () => serverUnread ?? notifications.filter((n) => n && n.is_read === false).length,
+    [notifications, serverUnread]
   );
 
   const openUserMenu = (e) => setAnchorUserMenu(e.currentTarget);
@@ -134,7 +171,19 @@ const Navigation = () => {
   const handleMarkRead = async (id) => {
     try {
       await notificationAPI.markRead(id);
+      const wasUnread = notifications.some((n) => n.id === id && n.is_read === false);
       setNotifications((prev) => prev.map((n) => (n.id === id ? { ...n, is_read: true } : n)));
+      if (wasUnread) setServerUnread((count) => (count === null ? count : Math.max(count - 1, 0)));
+    } catch {
+      // no-op
+    }
+  };
+
+  const handleMarkAllRead = async () => {
+    try {
+      const data = await notificationAPI.markAllRead();
+      setNotifications((prev) => prev.map((n) => ({ ...n, is_read: true })));
+      setServerUnread(data?.unread_count ?? 0);
     } catch {
       // no-op
     }
@@ -410,6 +459,9 @@ const Navigation = () => {
                   )}
 
                   <Divider />
+                  {unreadCount > 0 && (
+                    <MenuItem onClick={handleMarkAllRead}>Tout marquer comme lu</MenuItem>
+                  )}
                   <MenuItem
                     onClick={() => {
                       closeNotifMenu();
@@ -29,7 +29,7 @@ import {
   EventNote as EventNoteIcon,
 } from "@mui/icons-material";
 
-import { appointmentAPI } from "../services/api";
+import { appointmentAPI, fetchNextPage, toPage } from "../services/api";
 import { useAuth } from "../contexts/AuthContext";
 
 const toDateLabel = (raw) => {
@@ -58,7 +58,9 @@ const Appointments = () => {
   const { user, loading: authLoading } = useAuth();
 
   const [appointments, setAppointments] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
 
   const fromState = useMemo(() => ({ from: location.pathname }), [location.pathname]);
@@ -67,9 +69,9 @@ const Appointments = () => {
     try {
       setLoading(true);
       setError("");
-      const data = await appointmentAPI.list();
-      const list = Array.isArray(data) ? data : data?.results ?? [];
-      setAppointments(list);
+      const page = toPage(await appointmentAPI.list());
+      setAppointments(page.results);
+      setNextUrl(page.next);
     } catch (err) {
       if (err.status === 401) {
         navigate("/login", { state: fromState, replace: true });
@@ -81,6 +83,21 @@ const Appointments = () => {
     }
   };
 
+  // Liste paginée : page suivante ajoutée à la suite
+  const loadMore = async () => {
+    if (!nextUrl) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchNextPage(nextUrl);
+      setAppointments((prev) => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (err) {
+      setError(err.message || "Erreur lors du chargement des rendez-vous.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (authLoading) return;
     if (!user) {
@@ -247,6 +264,13 @@ const Appointments = () => {
                 })}
               </TableBody>
             </Table>
+            {nextUrl && (
+              <Box sx={{ display: "flex", justifyContent: "center", pt: 2 }}>
+                <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? "Chargement..." : "Charger plus"}
+                </Button>
+              </Box>
+            )}
           </Box>
         )}
       </Paper>
@@ -17,7 +17,7 @@ import FavoriteIcon from "@mui/icons-material/Favorite";
 import SearchIcon from "@mui/icons-material/Search";
 import ServiceCard from "../components/common/ServiceCard";
 import { useNavigate } from "react-router-dom";
-import { getServices } from "../services/api";
+import { fetchNextPage, getServices, toPage } from "../services/api";
 
 const FAVORITES_KEY = "favorites_services";
 
@@ -35,7 +35,9 @@ const Favorites = () => {
   });
 
   const [services, setServices] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
 
   useEffect(() => {
@@ -44,9 +46,9 @@ const Favorites = () => {
         setLoading(true);
         setError("");
 
-        const data = await getServices();
-        const list = Array.isArray(data) ? data : data?.results ?? [];
-        setServices(list);
+        const page = toPage(await getServices());
+        setServices(page.results);
+        setNextUrl(page.next);
       } catch (err) {
         setError(err.message || "Impossible de charger les favoris.");
       } finally {
@@ -66,6 +68,21 @@ const Favorites = () => {
     return services.filter((s) => idSet.has(String(s.id)));
   }, [services, favoriteIds]);
 
+  // Liste paginée : les favoris des pages suivantes s'ajoutent à la suite
+  const loadMore = async () => {
+    if (!nextUrl) return;
+    try {
+      setLoadingMore(true);
+      const page = await fetchNextPage(nextUrl);
+      setServices((prev) => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (err) {
+      setError(err.message || "Impossible de charger les favoris.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const removeFavorite = (serviceId) => {
     setFavoriteIds((prev) => prev.filter((id) => String(id) !== String(serviceId)));
   };
@@ -160,6 +177,14 @@ const Favorites = () => {
           ))}
         </Grid>
       )}
+
+      {nextUrl && (
+        <Box sx={{ display: "flex", justifyContent: "center", mt: 3 }}>
+          <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+            {loadingMore ? "Chargement..." : "Charger plus"}
+          </Button>
+        </Box>
+      )}
     </Container>
   );
 };
@@ -30,10 +30,11 @@ import {
 import { alpha } from "@mui/material/styles";
 
 import ServiceCard from "../components/common/ServiceCard";
-import { getServices } from "../services/api";
+import { fetchNextPage, getServices, toPage } from "../services/api";
 import { useAuth } from "../contexts/AuthContext";
 
 const FAVORITES_KEY = "favorites_services";
+const POPULAR_STEP = 6;
 
 const Home = () => {
   const navigate = useNavigate();
@@ -43,7 +44,10 @@ const Home = () => {
   const [location, setLocation] = useState("");
 
   const [services, setServices] = useState([]);
+  const [nextUrl, setNextUrl] = useState(null);
+  const [visibleCount, setVisibleCount] = useState(POPULAR_STEP);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState("");
 
   const [favorites, setFavorites] = useState(() => {
@@ -56,15 +60,17 @@ const Home = () => {
     }
   });
 
-  const popularServices = useMemo(() => services.slice(0, 6), [services]);
+  const popularServices = useMemo(() => services.slice(0, visibleCount), [services, visibleCount]);
+  const hasMore = visibleCount < services.length || Boolean(nextUrl);
 
   const heroStats = useMemo(
     () => [
-      { label: "Services disponibles", value: services.length },
+      // Liste paginée : "50+" tant que toutes les pages ne sont pas chargées
+      { label: "Services disponibles", value: nextUrl ? `${services.length}+` : services.length },
       { label: "Favoris sauvegardés", value: favorites.length },
       { label: "Expérience", value: "Premium" },
     ],
-    [services.length, favorites.length]
+    [services.length, nextUrl, favorites.length]
   );
 
   useEffect(() => {
@@ -81,9 +87,10 @@ const Home = () => {
       setLoading(true);
       setError("");
 
-      const data = await getServices();
-      const list = Array.isArray(data) ? data : data?.results ?? [];
-      setServices(list);
+      const page = toPage(await getServices());
+      setServices(page.results);
+      setNextUrl(page.next);
+      setVisibleCount(POPULAR_STEP);
     } catch (err) {
       setError(err.message || "Une erreur est survenue lors du chargement des services.");
     } finally {
@@ -91,6 +98,25 @@ const Home = () => {
     }
   };
 
+  // Affiche les services suivants ; page suivante chargée quand celle en mémoire est épuisée
+  const loadMore = async () => {
+    const wanted = visibleCount + POPULAR_STEP;
+    if (wanted > services.length && nextUrl) {
+      try {
+        setLoadingMore(true);
+        const page = await fetchNextPage(nextUrl);
+        setServices((prev) => [...prev, ...page.results]);
+        setNextUrl(page.next);
+      } catch (err) {
+        setError(err.message || "Une erreur est survenue lors du chargement des services.");
+        return;
+      } finally {
+        setLoadingMore(false);
+      }
+    }
+    setVisibleCount(wanted);
+  };
+
   const handleSearch = (e) => {
     e.preventDefault();
     navigate("/search", {
@@ -386,6 +412,14 @@ const Home = () => {
             ))}
           </Grid>
         )}
+
+        {hasMore && (
+          <Box sx={{ display: "flex", justifyContent: "center", mt: 3 }}>
+            <Button variant="outlined" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "Chargement..." : "Charger plus"}
+            </Button>
+          </Box>
+        )}
       </Container>
 
       <Box sx={{ py: 7 }}>
@@ -111,12 +111,12 @@ const ProviderDetail = () => {
       setLoading(true);
       setError("");
 
-      // 1) Récupérer la liste des prestataires puis trouver celui demandé
-      const employersRaw = await employerAPI.list();
-      const employers = Array.isArray(employersRaw) ? employersRaw : employersRaw?.results ?? [];
-      const current = employers.find((e) => String(e.id) === String(id));
-
-      if (!current) {
+      // 1) Fiche du prestataire demandé (liste paginée : ne pas le chercher dans la 1re page)
+      let current;
+      try {
+        current = await employerAPI.detail(id);
+      } catch (err) {
+        if (err.status !== 404) throw err;
         setProvider(null);
         setError("Prestataire introuvable.");
         return;
@@ -124,9 +124,8 @@ const ProviderDetail = () => {
 
       setProvider(current);
 
-      // 2) Services (pour réservation)
-      const servicesRaw = await serviceAPI.list();
-      const servicesList = Array.isArray(servicesRaw) ? servicesRaw : servicesRaw?.results ?? [];
+      // 2) Services (pour réservation) : toutes les pages
+      const servicesList = await serviceAPI.listAll();
       setServices(servicesList);
 
       // service par défaut
@@ -33,10 +33,13 @@ import {
 } from "@mui/icons-material";
 import { alpha } from "@mui/material/styles";
 
-import { getServices } from "../services/api";
+import { searchAPI, serviceAPI } from "../services/api";
 import ServiceCard from "../components/common/ServiceCard";
 
 const FAVORITES_KEY = "favorites_services";
+const SEARCH_DEBOUNCE_MS = 300;
+const SEARCH_LIMIT = 50;
+const SUGGEST_DEBOUNCE_MS = 120;
 
 const safeNumber = (v, fallback = 0) => {
   const n = Number(v);
@@ -64,6 +67,8 @@ const Search = () => {
     category: "",
   });
 
+  const [suggestions, setSuggestions] = useState([]);
+
   const [favorites, setFavorites] = useState(() => {
     try {
       const raw = localStorage.getItem(FAVORITES_KEY);
@@ -74,23 +79,55 @@ const Search = () => {
     }
   });
 
+  // Recherche côté serveur (plein texte, classée) : /services/search/
   useEffect(() => {
-    const fetchServices = async () => {
+    let cancelled = false;
+    const timer = setTimeout(async () => {
       try {
         setLoading(true);
         setError("");
-        const data = await getServices();
-        const list = Array.isArray(data) ? data : data?.results ?? [];
-        setAllServices(list);
+        const params = { q: filters.query, location: filters.location, limit: SEARCH_LIMIT };
+        if (filters.category) params.category = filters.category;
+        if (filters.minPrice !== "") params.min_price = filters.minPrice;
+        if (filters.maxPrice !== "") params.max_price = filters.maxPrice;
+
+        const data = await serviceAPI.search(params);
+        if (!cancelled) setAllServices(Array.isArray(data) ? data : data?.results ?? []);
       } catch (err) {
-        setError(err.message || "Une erreur est survenue lors du chargement des services");
+        if (!cancelled) setError(err.message || "Une erreur est survenue lors du chargement des services");
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
+    }, SEARCH_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
     };
+  }, [filters.query, filters.location, filters.category, filters.minPrice, filters.maxPrice]);
 
-    fetchServices();
-  }, []);
+  // Suggestions par préfixe (index en mémoire côté serveur) : /autocomplete/
+  useEffect(() => {
+    const q = filters.query.trim();
+    if (!q) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const data = await searchAPI.autocomplete(q);
+        if (!cancelled) setSuggestions(data?.results ?? []);
+      } catch {
+        if (!cancelled) setSuggestions([]);
+      }
+    }, SUGGEST_DEBOUNCE_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [filters.query]);
 
   useEffect(() => {
     const q = searchParams.get("q") ?? "";
@@ -128,50 +165,35 @@ const Search = () => {
     return Array.from(cats);
   }, [allServices]);
 
+  // Texte, lieu, catégorie et prix sont filtrés par le serveur ; seule la note reste locale
   const filteredServices = useMemo(() => {
-    const q = (filters.query || "").trim().toLowerCase();
-    const loc = (filters.location || "").trim().toLowerCase();
-    const minP = filters.minPrice === "" ? null : safeNumber(filters.minPrice, null);
-    const maxP = filters.maxPrice === "" ? null : safeNumber(filters.maxPrice, null);
     const minRating = safeNumber(filters.rating, 0);
-    const category = (filters.category || "").trim().toLowerCase();
+    if (!hasAnyRating || minRating <= 0) return allServices;
 
     return allServices.filter((s) => {
-      if (q) {
-        const hay = `${s?.name ?? ""} ${s?.description ?? ""} ${s?.icon ?? ""}`.toLowerCase();
-        if (!hay.includes(q)) return false;
-      }
-
-      if (loc) {
-        const hayLoc = `${s?.location ?? ""} ${s?.city ?? ""} ${s?.address ?? ""}`.toLowerCase();
-        if (hayLoc && !hayLoc.includes(loc)) return false;
-      }
-
-      if (category) {
-        const c = `${s?.category ?? s?.service_type ?? s?.type ?? ""}`.toLowerCase();
-        if (c && c !== category) return false;
-      }
-
-      if (hasAnyPrice) {
-        const price = safeNumber(s?.price, 0);
-        if (minP !== null && price < minP) return false;
-        if (maxP !== null && price > maxP) return false;
-      }
-
-      if (hasAnyRating) {
-        const r =
-          safeNumber(s?.rating, NaN) || safeNumber(s?.average_rating, NaN) || safeNumber(s?.avg_rating, NaN) || 0;
-        if (minRating > 0 && r < minRating) return false;
-      }
-
-      return true;
+      const r =
+        safeNumber(s?.rating, NaN) || safeNumber(s?.average_rating, NaN) || safeNumber(s?.avg_rating, NaN) || 0;
+      return r >= minRating;
     });
-  }, [allServices, filters, hasAnyPrice, hasAnyRating]);
+  }, [allServices, filters.rating, hasAnyRating]);
 
   const handleFilterChange = (field, value) => {
     setFilters((prev) => ({ ...prev, [field]: value }));
   };
 
+  const handleSuggestion = (suggestion) => {
+    setSuggestions([]);
+    if (suggestion.type === "service") {
+      navigate(`/services/${suggestion.id}`);
+    } else if (suggestion.type === "city") {
+      setFilters((prev) => ({ ...prev, query: "", location: suggestion.label }));
+    } else if (suggestion.type === "category") {
+      setFilters((prev) => ({ ...prev, query: "", category: suggestion.label }));
+    } else {
+      handleFilterChange("query", suggestion.label);
+    }
+  };
+
   const handleSearchSubmit = (e) => {
     e.preventDefault();
     const q = encodeURIComponent(filters.query || "");
@@ -297,6 +319,21 @@ const Search = () => {
             </Grid>
           </Grid>
         </form>
+
+        {suggestions.length > 0 && (
+          <Stack direction="row" spacing={1} useFlexGap flexWrap="wrap" sx={{ mt: 1.5 }}>
+            {suggestions.map((suggestion) => (
+              <Chip
+                key={`${suggestion.type}-${suggestion.id ?? suggestion.label}`}
+                size="small"
+                variant="outlined"
+                icon={suggestion.type === "city" ? <LocationIcon /> : <SearchIcon />}
+                label={suggestion.label}
+                onClick={() => handleSuggestion(suggestion)}
+              />
+            ))}
+          </Stack>
+        )}
       </Paper>
 
       <Grid container spacing={2.5}>
@@ -120,22 +120,8 @@ const ServiceDetails = () => {
   const getEmployerDesc = (e) =>
     e?.description || e?.bio || e?.user?.first_name || "Prestataire de service";
 
-  const employersForService = useMemo(() => {
-    if (!service) return [];
-
-    const sId = String(service.id);
-    const sName = String(service.name || "").toLowerCase();
-
-    const filtered = employers.filter((e) => {
-      if (e?.service && String(e.service) === sId) return true;
-      if (e?.service?.id && String(e.service.id) === sId) return true;
-      if (e?.category && String(e.category).toLowerCase() === sName) return true;
-      if (e?.service_name && String(e.service_name).toLowerCase() === sName) return true;
-      return false;
-    });
-
-    return filtered.length > 0 ? filtered : employers;
-  }, [employers, service]);
+  // Prestataires déjà filtrés par le serveur (?service=), les mieux notés d'abord
+  const employersForService = useMemo(() => (service ? employers : []), [employers, service]);
 
   const selectedEmployer = useMemo(() => {
     if (!selectedEmployerId) return employersForService[0] || null;
@@ -161,7 +147,7 @@ const ServiceDetails = () => {
 
         const [serviceData, employerList] = await Promise.all([
           serviceAPI.detail(id),
-          employerAPI.list(),
+          employerAPI.list({ service: id, sort: "rating" }),
         ]);
 
         setService(serviceData);
@@ -77,6 +77,40 @@ export const apiRequest = async (url, options = {}) => {
   }
 };
 
+// ✅ Idempotency-Key : une clé par action utilisateur, renvoyée telle quelle
+// si la même action est retentée (le serveur rejoue alors la première réponse)
+export const newIdempotencyKey = () =>
+  globalThis.crypto?.randomUUID?.() ||
+  `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+const idempotent = (key) => ({ headers: { "Idempotency-Key": key } });
+
+// ✅ Listes paginées (curseur) : { next, previous, results }
+// Normalise une réponse (paginée ou tableau) en { results, next }
+export const toPage = (data) =>
+  Array.isArray(data)
+    ? { results: data, next: null }
+    : { results: data?.results ?? [], next: data?.next || null };
+
+// Page suivante : "next" est une URL complète, renvoyée telle quelle
+export const fetchNextPage = async (nextUrl) => toPage(await apiRequest(nextUrl));
+
+// Suit les liens "next" jusqu'à la fin (ou maxPages) et renvoie un tableau.
+export const apiRequestAllPages = async (url, options = {}, maxPages = 20) => {
+  const items = [];
+  let nextUrl = url;
+  let pages = 0;
+
+  while (nextUrl && pages < maxPages) {
+    const page = toPage(await apiRequest(nextUrl, pages ? {} : options));
+    items.push(...page.results);
+    nextUrl = page.next;
+    pages += 1;
+  }
+
+  return items;
+};
+
 // ✅ URLs EXACTES backend (selon tes urls.py)
 export const AUTH_URLS = {
   REGISTER: `${API_VERSION}/auth/register/`,
@@ -87,10 +121,13 @@ export const AUTH_URLS = {
 
 export const SERVICE_URLS = {
   LIST: `${API_VERSION}/services/`,
+  SEARCH: `${API_VERSION}/services/search/`,
+  NEARBY: `${API_VERSION}/services/nearby/`,
   DETAIL: (id) => `${API_VERSION}/services/${id}/`,
   CREATE: `${API_VERSION}/services/`,
   UPDATE: (id) => `${API_VERSION}/services/${id}/`,
   DELETE: (id) => `${API_VERSION}/services/${id}/`,
+  SUGGESTED_EMPLOYERS: (id) => `${API_VERSION}/services/${id}/employers/suggested/`,
 };
 
 export const APPOINTMENT_URLS = {
@@ -108,17 +145,28 @@ export const CLIENT_URLS = {
 
 export const EMPLOYER_URLS = {
   LIST: `${API_VERSION}/employers/`,
+  NEARBY: `${API_VERSION}/employers/nearby/`,
   PROFILE: `${API_VERSION}/employers/profile/`,
   UPDATE: `${API_VERSION}/employers/update/`,
+  DETAIL: (id) => `${API_VERSION}/employers/${id}/`,
   AVAILABILITIES: (employerId) =>
     `${API_VERSION}/employers/${employerId}/availabilities/`,
+  SLOTS: (employerId) => `${API_VERSION}/employers/${employerId}/slots/`,
+  REVIEWS: (employerId) => `${API_VERSION}/employers/${employerId}/reviews/`,
 };
 
 export const NOTIFICATION_URLS = {
   LIST: `${API_VERSION}/notifications/`,
   MARK_READ: (id) => `${API_VERSION}/notifications/${id}/read/`,
+  STREAM: `${API_VERSION}/notifications/stream/`,
+  UNREAD_COUNT: `${API_VERSION}/notifications/unread-count/`,
+  BULK_READ: `${API_VERSION}/notifications/read/`,
+  BULK_ARCHIVE: `${API_VERSION}/notifications/archive/`,
+  BULK_DELETE: `${API_VERSION}/notifications/delete/`,
 };
 
+export const AUTOCOMPLETE_URL = `${API_VERSION}/autocomplete/`;
+
 export const PAYMENT_URLS = {
   PROCESS: (appointmentId) => `${API_VERSION}/payments/${appointmentId}/process/`,
 };
@@ -159,18 +207,27 @@ export const authAPI = {
 
 export const serviceAPI = {
   list: () => apiRequest(SERVICE_URLS.LIST),
+  // Tous les services (sélecteurs) : suit les pages
+  listAll: () => apiRequestAllPages(SERVICE_URLS.LIST),
   detail: (id) => apiRequest(SERVICE_URLS.DETAIL(id)),
+  // Recherche plein texte classée : { q, location, category, min_price, max_price, limit, offset }
+  search: (params = {}) => apiRequest(SERVICE_URLS.SEARCH, { params }),
+  // Autour de moi : { lat, lng, radius_km, limit } -> résultats triés avec distance_km
+  nearby: (params = {}) => apiRequest(SERVICE_URLS.NEARBY, { params }),
   create: (data) => apiRequest(SERVICE_URLS.CREATE, { method: "POST", data }),
   update: (id, data) =>
     apiRequest(SERVICE_URLS.UPDATE(id), { method: "PUT", data }),
   delete: (id) => apiRequest(SERVICE_URLS.DELETE(id), { method: "DELETE" }),
+  // Meilleurs prestataires libres : { date, duration, limit }
+  suggestedEmployers: (id, params = {}) =>
+    apiRequest(SERVICE_URLS.SUGGESTED_EMPLOYERS(id), { params }),
 };
 
 export const appointmentAPI = {
   list: () => apiRequest(APPOINTMENT_URLS.LIST),
 
-  create: (data) =>
-    apiRequest(APPOINTMENT_URLS.CREATE, { method: "POST", data }),
+  create: (data, idempotencyKey = newIdempotencyKey()) =>
+    apiRequest(APPOINTMENT_URLS.CREATE, { method: "POST", data, ...idempotent(idempotencyKey) }),
 
   detail: (id) => apiRequest(APPOINTMENT_URLS.DETAIL(id)),
 
@@ -184,8 +241,8 @@ export const appointmentAPI = {
   review: (id, data) =>
     apiRequest(APPOINTMENT_URLS.REVIEW(id), { method: "POST", data }),
 
-  pay: (id, data) =>
-    apiRequest(APPOINTMENT_URLS.PAYMENT(id), { method: "POST", data }),
+  pay: (id, data, idempotencyKey = newIdempotencyKey()) =>
+    apiRequest(APPOINTMENT_URLS.PAYMENT(id), { method: "POST", data, ...idempotent(idempotencyKey) }),
 
   addReview: (id, data) =>
     apiRequest(APPOINTMENT_URLS.ADD_REVIEW(id), { method: "PUT", data }),
@@ -214,7 +271,11 @@ export const userAPI = {
 };
 
 export const employerAPI = {
-  list: () => apiRequest(EMPLOYER_URLS.LIST),
+  // Filtres serveur : { service, min_rate, max_rate, min_rating, verified, city, category, free_at, sort }
+  list: (params = {}) => apiRequest(EMPLOYER_URLS.LIST, { params }),
+  detail: (id) => apiRequest(EMPLOYER_URLS.DETAIL(id)),
+  // Autour de moi : { lat, lng, radius_km, limit, service }
+  nearby: (params = {}) => apiRequest(EMPLOYER_URLS.NEARBY, { params }),
   getAvailabilities: (employerId) =>
     apiRequest(EMPLOYER_URLS.AVAILABILITIES(employerId)),
   setAvailabilities: (employerId, data) =>
@@ -222,17 +283,53 @@ export const employerAPI = {
       method: "POST",
       data,
     }),
+  // Remplace tout le planning hebdomadaire (une seule requête)
+  replaceAvailabilities: (employerId, availabilities) =>
+    apiRequest(EMPLOYER_URLS.AVAILABILITIES(employerId), {
+      method: "PUT",
+      data: availabilities,
+    }),
+  // { days: [{ date: "YYYY-MM-DD", slots: ["09:00", ...] }], ... }
+  getSlots: (employerId, params = {}) =>
+    apiRequest(EMPLOYER_URLS.SLOTS(employerId), { params }),
+  // { histogram, average_rating, total_reviews, next, results } ; suivre `next` pour la suite
+  getReviews: (employerId, params = {}) =>
+    apiRequest(EMPLOYER_URLS.REVIEWS(employerId), { params }),
 };
 
 export const notificationAPI = {
   list: () => apiRequest(NOTIFICATION_URLS.LIST),
   markRead: (id) =>
     apiRequest(NOTIFICATION_URLS.MARK_READ(id), { method: "POST" }),
+  // { count } : compteur serveur, sans télécharger les notifications
+  unreadCount: () => apiRequest(NOTIFICATION_URLS.UNREAD_COUNT),
+  // Actions groupées (une requête) : selection = { ids: [...] } ou { all: true }, + before optionnel
+  // -> { updated | archived | deleted, unread_count }
+  markManyRead: (selection) =>
+    apiRequest(NOTIFICATION_URLS.BULK_READ, { method: "POST", data: selection }),
+  markAllRead: () =>
+    apiRequest(NOTIFICATION_URLS.BULK_READ, { method: "POST", data: { all: true } }),
+  archive: (selection) =>
+    apiRequest(NOTIFICATION_URLS.BULK_ARCHIVE, { method: "POST", data: selection }),
+  remove: (selection) =>
+    apiRequest(NOTIFICATION_URLS.BULK_DELETE, { method: "POST", data: selection }),
+  // Flux SSE (EventSource n'envoie pas d'en-têtes : jeton en paramètre).
+  // Événements "notification" (nouvelle notification) et "unread" ({ count }).
+  stream: () => {
+    const token = localStorage.getItem("token");
+    const url = `${API_URL}${NOTIFICATION_URLS.STREAM}?token=${encodeURIComponent(token || "")}`;
+    return new EventSource(url);
+  },
+};
+
+export const searchAPI = {
+  // Suggestions par préfixe : { query, results: [{ type, label, id? }] }
+  autocomplete: (q, limit = 8) => apiRequest(AUTOCOMPLETE_URL, { params: { q, limit } }),
 };
 
 export const paymentAPI = {
-  process: (appointmentId, data = {}) =>
-    apiRequest(PAYMENT_URLS.PROCESS(appointmentId), { method: "POST", data }),
+  process: (appointmentId, data = {}, idempotencyKey = newIdempotencyKey()) =>
+    apiRequest(PAYMENT_URLS.PROCESS(appointmentId), { method: "POST", data, ...idempotent(idempotencyKey) }),
 };
 
 // ✅ utilisé par Search.jsx
@@ -3,6 +3,11 @@ ASGI config for nazek project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The notification stream (/api/v1/notifications/stream/, Server-Sent Events)
+is an async view: serve it through this module with an ASGI server
+(e.g. ``uvicorn nazek.asgi:application``) so that idle connections cost a
+coroutine each instead of a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
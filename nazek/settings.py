@@ -2,6 +2,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
@@ -92,6 +93,8 @@ CORS_ALLOWED_ORIGINS = os.getenv(
     "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173",
 ).split(",")
 CORS_ALLOW_CREDENTIALS = True
+# Idempotency-Key : envoyé par le frontend sur la réservation et le paiement
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
@@ -107,10 +110,95 @@ REST_FRAMEWORK = {
     "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT + claims de profil (appointments/authentication.py), repli en base si périmés
+        "appointments.authentication.ClaimsJWTAuthentication",
     ),
+    # Pagination keyset (curseur) : coût constant quelle que soit la page
+    "DEFAULT_PAGINATION_CLASS": "appointments.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.getenv("DJANGO_API_PAGE_SIZE", "50")),
+    # Proxys de confiance devant l'application (IP des throttles) : 0 = REMOTE_ADDR, X-Forwarded-For
+    # ignoré ; N = N-ième adresse en partant de la fin de X-Forwarded-For (ajoutée par le proxy)
+    "NUM_PROXIES": int(os.getenv("DJANGO_NUM_PROXIES", "0")),
 }
 
+# Plafond de ?page_size= accepté par les listes paginées
+API_MAX_PAGE_SIZE = int(os.getenv("DJANGO_API_MAX_PAGE_SIZE", "200"))
+
+# Réservations : durée par défaut (sans estimated_duration ni service.duration)
+# et durée maximale d'un rendez-vous (borne de la recherche de chevauchement)
+BOOKING_DEFAULT_DURATION_MINUTES = 60
+BOOKING_MAX_DURATION_MINUTES = 12 * 60
+# Horaires (heure locale, tous les jours) d'un prestataire sans disponibilités renseignées :
+# créneaux proposés (slots.py) et affectation automatique (assignment.py)
+BOOKING_DEFAULT_WORKING_HOURS = ("09:00", "18:00")
+# Affectation automatique: least_loaded | rating_weighted | round_robin | chemin.vers.Strategie
+BOOKING_ASSIGNMENT_STRATEGY = os.getenv("DJANGO_BOOKING_ASSIGNMENT_STRATEGY", "least_loaded")
+
+# Âge maximal (secondes) de l'index d'autocomplétion en mémoire avant reconstruction (0 = jamais)
+AUTOCOMPLETE_MAX_AGE = int(os.getenv("DJANGO_AUTOCOMPLETE_MAX_AGE", "300"))
+
+# Notifications : file (outbox) vidée par `manage.py process_outbox`
+# Canaux externes en plus de l'in-app : "email", "sms" ou chemin.vers.Canal (séparés par des virgules)
+NOTIFICATION_CHANNELS = [c.strip() for c in os.getenv("DJANGO_NOTIFICATION_CHANNELS", "").split(",") if c.strip()]
+NOTIFICATION_OUTBOX_BATCH_SIZE = 200
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5
+NOTIFICATION_OUTBOX_BACKOFF_SECONDS = 30
+NOTIFICATION_OUTBOX_BACKOFF_MAX_SECONDS = 3600
+NOTIFICATION_OUTBOX_LEASE_SECONDS = 300
+# Sans worker process_outbox : livraison juste après le commit, dans la requête
+NOTIFICATION_OUTBOX_INLINE = os.getenv("DJANGO_NOTIFICATION_OUTBOX_INLINE", "False").lower() == "true"
+# SMS : "console", "file" (une ligne JSON par SMS) ou chemin.vers.Backend
+NOTIFICATION_SMS_BACKEND = os.getenv("DJANGO_SMS_BACKEND", "console")
+NOTIFICATION_SMS_FILE_PATH = os.getenv("DJANGO_SMS_FILE_PATH", str(BASE_DIR / "sms.log"))
+# Email : console en développement, "django.core.mail.backends.filebased.EmailBackend" + EMAIL_FILE_PATH pour des fichiers
+EMAIL_BACKEND = os.getenv("DJANGO_EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_FILE_PATH = os.getenv("DJANGO_EMAIL_FILE_PATH", str(BASE_DIR / "sent_emails"))
+DEFAULT_FROM_EMAIL = os.getenv("DJANGO_DEFAULT_FROM_EMAIL", "Nazek <no-reply@nazek.local>")
+# Rétention (`manage.py purge_notifications`) : notifications lues ou archivées plus anciennes
+# que NOTIFICATION_RETENTION_DAYS, déplacées dans l'historique ("history") ou supprimées ("delete")
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("DJANGO_NOTIFICATION_RETENTION_DAYS", "90"))
+NOTIFICATION_RETENTION_MODE = os.getenv("DJANGO_NOTIFICATION_RETENTION_MODE", "history")
+NOTIFICATION_RETENTION_CHUNK_SIZE = 1000
+
+# Notifications temps réel (SSE, /notifications/stream/) : "database" (relecture périodique
+# des nouvelles notifications, couvre plusieurs processus), "local" ou chemin.vers.Backend
+REALTIME_BACKEND = os.getenv("DJANGO_REALTIME_BACKEND", "database")
+REALTIME_POLL_SECONDS = float(os.getenv("DJANGO_REALTIME_POLL_SECONDS", "1.0"))
+REALTIME_HEARTBEAT_SECONDS = 15
+REALTIME_REPLAY_LIMIT = 100
+
+# Limitation de débit (token bucket, appointments/throttling.py) : "<vue>:ip" / "<vue>:user"
+# -> "N/s|min|h|day" ou {"rate": "N/min", "burst": M} ; None = pas de limite
+THROTTLE_RATES = {
+    "login:ip": "20/min",
+    "login:user": {"rate": "5/min", "burst": 10},
+    "register:ip": "10/h",
+    "booking:user": "30/h",
+    "booking:ip": "120/h",
+}
+# "memory" (par processus) ou "cache" (THROTTLE_CACHE, partagé si CACHES l'est : Redis, DatabaseCache...)
+THROTTLE_STORE = os.getenv("DJANGO_THROTTLE_STORE", "memory")
+THROTTLE_CACHE = "default"
+THROTTLE_MEMORY_MAX_KEYS = 100000
+
+# Idempotency-Key (appointments/idempotency.py) : réponse rejouée pendant IDEMPOTENCY_TTL_SECONDS ;
+# un doublon concurrent attend la première requête au plus IDEMPOTENCY_WAIT_SECONDS (plafonné à 2 s, puis 409) ;
+# une réservation sans réponse depuis IDEMPOTENCY_LOCK_SECONDS est reprise
+IDEMPOTENCY_TTL_SECONDS = 86400
+IDEMPOTENCY_WAIT_SECONDS = 1
+IDEMPOTENCY_POLL_SECONDS = 0.05
+IDEMPOTENCY_LOCK_SECONDS = 60
+# Purge des clés expirées (`manage.py purge_idempotency_keys`)
+IDEMPOTENCY_PURGE_CHUNK_SIZE = 1000
+
+# Cache : sert aussi à invalider les claims de profil des jetons (appointments/authentication.py).
+# Mémoire locale par défaut ; en production, un cache partagé (Redis, Memcached, base) via CACHES.
+# Avec la mémoire locale, les claims ne sont utilisés que si le déploiement n'a qu'un processus
+AUTH_CLAIMS_SINGLE_PROCESS = os.getenv("DJANGO_AUTH_CLAIMS_SINGLE_PROCESS", "False").lower() == "true"
+
+# Purge des jetons expirés (`manage.py purge_tokens`)
+TOKEN_PURGE_CHUNK_SIZE = 1000
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),